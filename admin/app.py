@@ -1,80 +1,445 @@
-from flask import Flask, request, jsonify 
+from flask import Flask, request, jsonify, Response, url_for, redirect, stream_with_context
 import mysql.connector
 from db_config import db_config
 from flask_cors import CORS
-import bcrypt
 from mysql.connector import Error
-import base64
 from werkzeug.utils import secure_filename
+import csv
+import io
+import logging
 import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bakes_common import catalog_io, changes, events, inventory, jsonio, repository
+from bakes_common.auth import HasherBusy, PasswordHasher
+from bakes_common.cache import CatalogCache, ScopedCache, version_backend_from_env
+from bakes_common.db import ConnectionPool, PoolTimeout
+from bakes_common.pagination import (
+    PAGINATION_HEADERS, PaginationError, cursor_id, next_page_headers, parse_date_range, parse_fields, parse_page,
+    project,
+)
+from bakes_common.streaming import accepts_gzip, gzip_chunks
+from bakes_common.conditional import etag, not_modified, with_validators
+from bakes_common.config import dev_server_options
+from bakes_common.lifecycle import install_lifecycle
+from bakes_common.log import REQUEST_ID_HEADER, configure_logging
+from bakes_common.metrics import instrument_app
+from bakes_common.profiling import install_profiling
+from bakes_common.responses import install_compression, install_json
+from bakes_common.images import (
+    ImageStore, ImageTooLarge, default_store_root, send_stored_image,
+)
 
 app = Flask(__name__)
-CORS(app)  # This will enable CORS for all routes
+CORS(app, expose_headers=PAGINATION_HEADERS + [REQUEST_ID_HEADER])  # This will enable CORS for all routes
+
+# orjson-backed jsonify that takes Decimal/datetime as they come from MySQL,
+# and gzip/brotli for JSON and CSV bodies over COMPRESS_MIN_SIZE
+install_json(app)
+install_compression(app)
+
+# JSON log lines with request IDs, written off the request thread
+configure_logging(app)
+log = logging.getLogger('bakes.admin')
+
+# Shared pool instead of a fresh MySQL handshake per request
+db_pool = ConnectionPool(
+    db_config,
+    size=int(os.environ.get('DB_POOL_SIZE', 10)),
+    timeout=float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+)
+
+# Per-route latency, per-request query counts and pool gauges at /metrics
+# (METRICS_ENABLED=0 turns all of it off)
+metrics = instrument_app(app, 'admin', db_pool)
+
+# Opt-in profiles (X-Profile header / PROFILE_SAMPLE_RATE) and slow-query
+# log with EXPLAIN plans (SLOW_QUERY_MS)
+slow_query_log = install_profiling(app, 'admin', db_pool)
+
+# Uploaded images live on disk by content hash, not in the Products table
+image_store = ImageStore(default_store_root(), workers=int(os.environ.get('IMAGE_WORKERS', 2)))
+
+# Product list/detail served from memory; every product write invalidates it
+catalog_cache = CatalogCache(version_backend_from_env(), ttl=float(os.environ.get('CATALOG_CACHE_TTL', 300)))
+
+# Shared with the storefront: status changes drop the customer's cached history
+order_history_cache = ScopedCache(
+    version_backend_from_env('order-history'), ttl=float(os.environ.get('ORDER_HISTORY_CACHE_TTL', 300)))
+
+# Live order feed: one thread per worker tails the order_events outbox and
+# fans new events out to every open dashboard stream; started by create_app()
+order_feed = events.OrderFeed(
+    db_pool,
+    poll_interval=float(os.environ.get('ORDER_EVENTS_POLL_INTERVAL', 1)),
+    max_subscribers=int(os.environ.get('SSE_MAX_STREAMS', 8)),
+    retention=float(os.environ.get('ORDER_EVENTS_RETENTION', 86400)),
+)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
+# Product fields returned by the list/detail endpoints; the image itself is
+# served separately from /images/<hash>/<variant> (or /products/<id>/image
+# for rows still holding a legacy BLOB)
+PRODUCT_FIELDS = {
+    'product_id', 'name', 'description', 'price', 'category', 'quantity', 'status', 'image_url', 'thumbnail_url',
+}
+
+# Fields the admin orders list can project with ?fields=
+ORDER_FIELDS = {
+    'order_id': "Orders.order_id",
+    'customer_name': "Users.name AS customer_name",
+    'email': "Users.email",
+    'phone': "Users.phone",
+    'order_status': "Orders.order_status",
+    'total_price': "COALESCE(Orders.total_price, 0) AS total_price",
+    'payment_status': "Orders.payment_status",
+    'advance_payment': "COALESCE(Orders.advance_payment, 0) AS advance_payment",
+    'delivery_type': "Orders.delivery_type",
+    'delivery_address': "Orders.delivery_address",
+    'map_link': "Orders.map_link",
+    'created_at': "Orders.created_at",
+    # Items are aggregated by MySQL into one JSON array per order, so an
+    # order is one row instead of one row per item repeating the customer
+    'items': """(
+        SELECT JSON_ARRAYAGG(JSON_OBJECT(
+            'product_id', Order_Items.product_id,
+            'product_name', Products.name,
+            'quantity', Order_Items.quantity,
+            'item_price', Order_Items.price
+        ))
+        FROM Order_Items
+        LEFT JOIN Products ON Order_Items.product_id = Products.product_id
+        WHERE Order_Items.order_id = Orders.order_id
+    ) AS items""",
+}
+
+# Filterable Orders columns; each has an index led by the column
+ORDER_FILTERS = ('delivery_type', 'order_status', 'payment_status')
+
+ORDER_STATUSES = ["pending", "order confirmation", "baked", "shipped", "delivered"]
+PAYMENT_STATUSES = ["not paid", "advance paid", "full paid"]
+MAX_BULK_ORDERS = 500
+MAX_IMPORT_ERRORS = 1000  # Per-row errors listed in an import response
+
+# Each open stream holds a request thread, so streams are capped per worker
+# (SSE_MAX_STREAMS) and end after SSE_MAX_STREAM_SECONDS; EventSource
+# reconnects on its own and resumes from its last event id
+SSE_MAX_STREAM_SECONDS = float(os.environ.get('SSE_MAX_STREAM_SECONDS', 300))
+SSE_KEEPALIVE_SECONDS = 15  # Comment lines keep proxies from closing an idle stream
+SSE_RETRY_MS = 3000
+
+ORDER_EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+ORDER_EXPORT_WINDOW = 1000  # Orders read per pooled-connection checkout
+ORDER_EXPORT_ORDER_COLUMNS = (
+    'order_id', 'created_at', 'customer_name', 'email', 'order_status', 'payment_status', 'payment_method',
+    'delivery_type', 'total_price', 'advance_payment', 'balance_due',
+)
+ORDER_EXPORT_ITEM_COLUMNS = ('product_id', 'product_name', 'quantity', 'item_price', 'line_total')
+
+def build_orders_where(filters, created_from=None, created_to=None, after_id=None):
+    conditions, params = [], []
+    for field in ORDER_FILTERS:
+        if field in filters:
+            conditions.append(f"{field} = %s")
+            params.append(filters[field])
+
+    if created_from is not None:
+        conditions.append("created_at >= %s")
+        params.append(created_from)
+    if created_to is not None:
+        conditions.append("created_at < %s")
+        params.append(created_to)
+    if after_id is not None:
+        conditions.append("order_id < %s")
+        params.append(after_id)
+
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+def build_orders_query(columns, filters, created_from=None, created_to=None, after_id=None, limit=None):
+    """SQL and params for one page of the admin orders list, one row per order.
+
+    Filters and the page window apply to Orders only: the page of orders is
+    picked first (from the indexes created in migration 002) and only then
+    joined to its customer; items come from idx_order_items_order.
+    """
+    where, params = build_orders_where(filters, created_from, created_to, after_id)
+    page_query = f"SELECT * FROM Orders{where} ORDER BY order_id DESC"
+    if limit is not None:
+        page_query += " LIMIT %s"
+        params.append(limit)
+
+    query = f"""
+        SELECT 
+            {', '.join(columns)}
+        FROM 
+            ({page_query}) AS Orders
+        LEFT JOIN 
+            Users ON Orders.user_id = Users.user_id
+        ORDER BY 
+            Orders.order_id DESC
+    """
+    return query, params
+
+def build_next_page_query(filters, created_from=None, created_to=None, after_id=None, limit=None):
+    """First order_id of the following page; an index-only probe run before streaming."""
+    where, params = build_orders_where(filters, created_from, created_to, after_id)
+    params.append(limit)
+    return f"SELECT order_id FROM Orders{where} ORDER BY order_id DESC LIMIT 1 OFFSET %s", params
+
+def build_order_export_query(created_from=None, created_to=None, after_id=0, window=None):
+    """One window of the accounting export: the next ``window`` orders after
+    ``after_id`` in primary-key order, one row per item."""
+    conditions, params = ["order_id > %s"], [after_id]
+    if created_from is not None:
+        conditions.append("created_at >= %s")
+        params.append(created_from)
+    if created_to is not None:
+        conditions.append("created_at < %s")
+        params.append(created_to)
+    params.append(window)
+
+    query = f"""
+        SELECT
+            Orders.order_id, Orders.created_at, Users.name AS customer_name, Users.email,
+            Orders.order_status, Orders.payment_status, Orders.payment_method, Orders.delivery_type,
+            Orders.total_price, Orders.advance_payment,
+            Order_Items.product_id, Products.name AS product_name,
+            Order_Items.quantity, Order_Items.price AS item_price
+        FROM
+            (SELECT * FROM Orders WHERE {' AND '.join(conditions)} ORDER BY order_id LIMIT %s) AS Orders
+        LEFT JOIN Users ON Orders.user_id = Users.user_id
+        LEFT JOIN Order_Items ON Order_Items.order_id = Orders.order_id
+        LEFT JOIN Products ON Order_Items.product_id = Products.product_id
+        ORDER BY Orders.order_id, Order_Items.product_id
+    """
+    return query, params
+
+# bcrypt runs in a bounded process pool, off the request threads
+password_hasher = PasswordHasher(
+    workers=int(os.environ.get('BCRYPT_WORKERS', 2)),
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', 12)),
+    max_pending=int(os.environ.get('BCRYPT_MAX_PENDING', 2)),
+)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def with_image_url(product):
+    """JSON dict for a repository.Product, with URLs for its stored image."""
+    product = product._asdict()
+    has_image = product.pop('has_image')
+    digest = product.pop('image_hash')
+    if digest:
+        product['image_url'] = url_for('get_stored_image', digest=digest, variant='full', _external=True)
+        product['thumbnail_url'] = url_for('get_stored_image', digest=digest, variant='thumb', _external=True)
+    elif has_image:
+        product['image_url'] = product['thumbnail_url'] = url_for(
+            'get_product_image', product_id=product['product_id'], _external=True)
+    else:
+        product['image_url'] = product['thumbnail_url'] = None
+    return product
+
+def close_streaming_cursor(cursor):
+    try:
+        cursor.close()
+    except mysql.connector.Error:
+        pass  # Client went away mid-stream; the pool discards the connection
+
 def get_db_connection():
     try:
-        connection = mysql.connector.connect(**db_config)
-        return connection
+        return db_pool.get_connection()
     except mysql.connector.Error as err:
-        print(f"Error connecting to database: {err}")
+        log.error("Database connection failed", extra={'error': str(err)})
         return None
 
+@app.errorhandler(PaginationError)
+def handle_pagination_error(err):
+    return jsonify({"error": str(err)}), 400
+
+@app.errorhandler(HasherBusy)
+def handle_hasher_busy(err):
+    return jsonify({"error": str(err)}), 503
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(err):
+    return jsonify({"error": "Database busy, please retry"}), 503
+
+@app.errorhandler(events.FeedUnavailable)
+def handle_feed_unavailable(err):
+    return jsonify({"error": str(err)}), 503, {'Retry-After': str(SSE_RETRY_MS // 1000)}
+
+@app.route('/health/db', methods=['GET'])
+def db_pool_stats():
+    return jsonify(db_pool.stats())
+
+@app.route('/health/events', methods=['GET'])
+def order_feed_stats():
+    return jsonify(order_feed.stats())
+
+@app.route('/health/cache', methods=['GET'])
+def catalog_cache_stats():
+    return jsonify({"catalog": catalog_cache.stats(), "order_history": order_history_cache.stats()})
+
+def invalidate_order_history(connection, order_ids):
+    """Drop the storefront's cached history of the customers owning ``order_ids``."""
+    if not order_ids:
+        return
+    cursor = connection.cursor()
+    cursor.execute(
+        f"""SELECT DISTINCT Users.email FROM Orders JOIN Users ON Orders.user_id = Users.user_id
+            WHERE Orders.order_id IN ({', '.join(['%s'] * len(order_ids))})""",
+        list(order_ids)
+    )
+    for (email,) in cursor.fetchall():
+        order_history_cache.invalidate(email.lower())
+    cursor.close()
+
+def query_product(product_id):
+    connection = get_db_connection()
+    if connection is None:
+        return None
+
+    try:
+        return repository.get_product(connection, product_id)
+    finally:
+        connection.close()
+
+def query_products(category=None, after_id=None, limit=None):
+    connection = get_db_connection()
+    if connection is None:
+        return None
+
+    try:
+        return repository.list_products(connection, category=category, after_id=after_id, limit=limit)
+    finally:
+        connection.close()
+
 @app.route('/products', methods=['GET'])
 def get_products():
+    limit, page_cursor = parse_page(request.args)
+    after_id = cursor_id(page_cursor)
+    fields = parse_fields(request.args, PRODUCT_FIELDS)
+    category = request.args.get('category')
+
+    # Every product write bumps the catalog version, so a client holding the
+    # current one gets a 304 without a query
+    tag = etag('products', catalog_cache.version())
+    cached = not_modified(tag)
+    if cached is not None:
+        return cached
+
+    try:
+        products = catalog_cache.get_or_load(
+            ('products', category, after_id, limit),
+            lambda: query_products(category=category, after_id=after_id, limit=limit),
+        )
+    except mysql.connector.Error as err:
+        return jsonify({"error": str(err)}), 500
+    if products is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    next_cursor = None
+    if limit is not None and len(products) > limit:
+        products = products[:limit]
+        next_cursor = {'id': products[-1].product_id}
+
+    body = [project(with_image_url(product), fields) for product in products]
+    return with_validators(jsonify(body), tag), 200, next_page_headers(next_cursor)
+
+@app.route('/products/<int:product_id>', methods=['GET'])
+def get_product(product_id):
+    tag = etag('product', product_id, catalog_cache.version())
+    cached = not_modified(tag)
+    if cached is not None:
+        return cached
+
+    try:
+        product = catalog_cache.get_or_load(('product', product_id), lambda: query_product(product_id))
+    except mysql.connector.Error as err:
+        return jsonify({"error": str(err)}), 500
+
+    if not product:
+        return jsonify({"error": "Product not found"}), 404
+    return with_validators(jsonify(with_image_url(product)), tag)
+
+@app.route('/changes', methods=['GET'])
+def get_changes():
+    """Products and orders changed since ``since``, with deletions; see bakes_common/changes.py."""
+    limit, _ = parse_page(request.args, default_limit=changes.PAGE_SIZE, max_limit=changes.MAX_PAGE_SIZE)
+    since = request.args.get('since')
+    if since is not None:
+        if not since.isdigit():
+            return jsonify({"error": "since must be a non-negative integer"}), 400
+        since = int(since)
+
     connection = get_db_connection()
     if connection is None:
         return jsonify({"error": "Database connection failed"}), 500
 
     try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT product_id, name, description, price, category, quantity, image_data FROM Products")
-        products = cursor.fetchall()
-        
-        # Convert BLOB to base64 string
-        for product in products:
-            if product['image_data']:
-                product['image_data'] = base64.b64encode(product['image_data']).decode('utf-8')
-        
-        return jsonify(products)
+        if since is None:
+            # Starting point for a client about to do its full fetch
+            page = {'version': changes.settled_version(connection)}
+        else:
+            page = changes.load_changes(connection, since, limit, orders=True)
     except mysql.connector.Error as err:
         return jsonify({"error": str(err)}), 500
     finally:
-        cursor.close()
         connection.close()
 
-@app.route('/products/<int:product_id>', methods=['GET'])
-def get_product(product_id):
+    if 'products' in page:
+        page['products'] = [dict(with_image_url(product), version=version) for version, product in page['products']]
+        page['deleted'] = changes.deleted_for_json(page['deleted'])
+    response = jsonify(page)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/products/<int:product_id>/image', methods=['GET'])
+def get_product_image(product_id):
     connection = get_db_connection()
     if connection is None:
         return jsonify({"error": "Database connection failed"}), 500
 
     try:
         cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT product_id, name, description, price, category, quantity, image_data FROM Products WHERE product_id = %s", (product_id,))
-        product = cursor.fetchone()
-        
-        if product and product['image_data']:
-            product['image_data'] = base64.b64encode(product['image_data']).decode('utf-8')
-        
-        return jsonify(product) if product else (jsonify({"error": "Product not found"}), 404)
+        cursor.execute("SELECT image_hash FROM Products WHERE product_id = %s", (product_id,))
+        row = cursor.fetchone()
+        if not row:
+            return jsonify({"error": "Image not found"}), 404
+
+        digest = row['image_hash']
+        if not digest:
+            # A legacy BLOB not yet backfilled: move it into the store once, as
+            # backfill_images.py would, so no later request reads or hashes it
+            cursor.execute("SELECT image_data FROM Products WHERE product_id = %s", (product_id,))
+            image_data = cursor.fetchone()['image_data']
+            if image_data is None:
+                return jsonify({"error": "Image not found"}), 404
+            digest = image_store.save(io.BytesIO(image_data))
+            cursor.execute(
+                "UPDATE Products SET image_hash = %s, image_data = NULL WHERE product_id = %s AND image_hash IS NULL",
+                (digest, product_id),
+            )
+            connection.commit()
+            catalog_cache.invalidate()
+        return redirect(url_for('get_stored_image', digest=digest, variant='full'))
     except mysql.connector.Error as err:
         return jsonify({"error": str(err)}), 500
     finally:
         cursor.close()
         connection.close()
 
+@app.route('/images/<digest>/<variant>', methods=['GET'])
+def get_stored_image(digest, variant):
+    response = send_stored_image(image_store, digest, variant)
+    return response if response is not None else (jsonify({"error": "Image not found"}), 404)
+
 @app.route('/products', methods=['POST'])
 def add_product():
-    connection = get_db_connection()
-    if connection is None:
-        return jsonify({"error": "Database connection failed"}), 500
-
     if 'image' not in request.files:
         return jsonify({"error": "No image file provided"}), 400
     
@@ -89,31 +454,49 @@ def add_product():
         return jsonify({"error": "File size too large"}), 400
 
     try:
-        image_data = file.read()
+        price = float(request.form.get('price'))
+        quantity = float(request.form.get('quantity', 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "price and quantity must be numbers"}), 400
+
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
         cursor = connection.cursor()
         
+        # The row goes in first and the image is stored inside its transaction,
+        # so a failed INSERT never leaves an image nothing points to
         query = """
-        INSERT INTO Products (name, description, price, image_data, category, quantity)
-        VALUES (%s, %s, %s, %s, %s, %s)
+        INSERT INTO Products (name, description, price, category, quantity)
+        VALUES (%s, %s, %s, %s, %s)
         """
         
         values = (
             request.form.get('name'),
             request.form.get('description'),
-            float(request.form.get('price')),
-            image_data,
+            price,
             request.form.get('category'),
-            float(request.form.get('quantity', 0))
+            quantity
         )
         
         cursor.execute(query, values)
+        product_id = cursor.lastrowid
+        image_hash = image_store.save(file.stream, max_size=MAX_FILE_SIZE)
+        cursor.execute("UPDATE Products SET image_hash = %s WHERE product_id = %s", (image_hash, product_id))
         connection.commit()
+        catalog_cache.invalidate()
         
         return jsonify({
             "message": "Product added successfully",
-            "product_id": cursor.lastrowid
+            "product_id": product_id
         }), 201
+    except ImageTooLarge as err:
+        connection.rollback()
+        return jsonify({"error": str(err)}), 400
     except mysql.connector.Error as err:
+        connection.rollback()
         return jsonify({"error": str(err)}), 500
     finally:
         cursor.close()
@@ -146,9 +529,8 @@ def update_product(product_id):
         if 'image' in request.files:
             file = request.files['image']
             if file.filename != '' and allowed_file(file.filename):
-                image_data = file.read()
-                update_fields.append("image_data = %s")
-                values.append(image_data)
+                update_fields.append("image_hash = %s, image_data = NULL")
+                values.append(image_store.save(file.stream, max_size=MAX_FILE_SIZE))
         
         if not update_fields:
             return jsonify({"error": "No fields to update"}), 400
@@ -158,11 +540,20 @@ def update_product(product_id):
         values.append(product_id)
         
         cursor.execute(query, values)
+        updated = cursor.rowcount
+
+        # Hot products keep their stock in counter slots; re-split the new total
+        if 'quantity' in request.form:
+            slots = inventory.hot_slot_counts(connection, [product_id]).get(product_id)
+            if slots:
+                inventory.set_hot_stock(connection, product_id, float(request.form['quantity']), slots)
+
         connection.commit()
         
-        if cursor.rowcount == 0:
+        if updated == 0:
             return jsonify({"error": "Product not found"}), 404
         
+        catalog_cache.invalidate()
         return jsonify({"message": "Product updated successfully"})
     except mysql.connector.Error as err:
         return jsonify({"error": str(err)}), 500
@@ -172,11 +563,202 @@ def update_product(product_id):
         cursor.close()
         connection.close()
 
+def write_product_batch(connection, columns, batch, errors):
+    """Upsert one batch of import rows in a single transaction.
+
+    If the batch fails as a whole, its rows are replayed one at a time in
+    the same transaction so only the offending rows end up in ``errors``.
+    Returns the number of rows written.
+    """
+    statement = catalog_io.upsert_statement(columns)
+    cursor = connection.cursor()
+    try:
+        try:
+            cursor.executemany(statement, [values for _, values in batch])
+            written = batch
+        except mysql.connector.Error:
+            connection.rollback()
+            written = []
+            for line, values in batch:
+                try:
+                    cursor.execute(statement, values)
+                    written.append((line, values))
+                except mysql.connector.Error as err:
+                    errors.append({"line": line, "error": str(err)})
+
+        # Hot products keep their stock in counter slots; re-split the new totals
+        if 'product_id' in columns and 'quantity' in columns:
+            id_index, quantity_index = columns.index('product_id'), columns.index('quantity')
+            quantities = {values[id_index]: values[quantity_index] for _, values in written}
+            for product_id, slots in inventory.hot_slot_counts(connection, list(quantities)).items():
+                inventory.set_hot_stock(connection, product_id, quantities[product_id], slots)
+
+        connection.commit()
+        return len(written)
+    finally:
+        cursor.close()
+
+# Spreadsheet import: CSV or NDJSON, as a multipart 'file' or the raw body.
+# Rows with a product_id update that product (inserting it if missing);
+# rows without one are new products. Empty cells leave a column unchanged.
+@app.route('/products/bulk', methods=['POST'])
+def bulk_import_products():
+    upload = request.files.get('file')
+    try:
+        fmt = catalog_io.detect_format(
+            request.args.get('format'),
+            filename=upload.filename if upload else None,
+            content_type=upload.mimetype if upload else request.mimetype,
+        )
+    except catalog_io.ImportFormatError as err:
+        return jsonify({"error": str(err)}), 400
+
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    imported, errors = 0, []
+    batches = {}  # column tuple -> [(line, values), ...]
+    try:
+        for line, row in catalog_io.read_rows(upload.stream if upload else request.stream, fmt):
+            try:
+                if isinstance(row, catalog_io.RowError):
+                    raise row
+                cleaned = catalog_io.clean_row(row, image_exists=image_store.exists)
+            except catalog_io.RowError as err:
+                errors.append({"line": line, "error": str(err)})
+                continue
+
+            columns = tuple(column for column in catalog_io.COLUMNS if column in cleaned)
+            batch = batches.setdefault(columns, [])
+            batch.append((line, tuple(cleaned[column] for column in columns)))
+            if len(batch) >= catalog_io.BATCH_SIZE:
+                imported += write_product_batch(connection, columns, batches.pop(columns), errors)
+
+        for columns, batch in batches.items():
+            imported += write_product_batch(connection, columns, batch, errors)
+    except catalog_io.ImportFormatError as err:
+        return jsonify({"error": str(err), "imported": imported}), 400
+    except UnicodeDecodeError:
+        return jsonify({"error": "File must be UTF-8 encoded", "imported": imported}), 400
+    except mysql.connector.Error as err:
+        return jsonify({"error": str(err), "imported": imported}), 500
+    finally:
+        connection.close()
+        if imported:
+            catalog_cache.invalidate()
+
+    errors.sort(key=lambda error: error["line"])
+    return jsonify({
+        "message": f"Imported {imported} product(s)",
+        "imported": imported,
+        "error_count": len(errors),
+        "errors": errors[:MAX_IMPORT_ERRORS],
+    }), 200 if imported or not errors else 400
+
+@app.route('/products/export', methods=['GET'])
+def export_products():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in catalog_io.FORMATS:
+        return jsonify({"error": f"Unsupported format. Allowed values are: {', '.join(catalog_io.FORMATS)}"}), 400
+
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        # Unbuffered: the server hands rows over as the download proceeds
+        cursor = connection.cursor(buffered=False)
+        cursor.execute(f"SELECT {', '.join(catalog_io.COLUMNS)} FROM Products ORDER BY product_id")
+    except mysql.connector.Error as err:
+        connection.close()
+        return jsonify({"error": str(err)}), 500
+
+    def generate():
+        try:
+            yield catalog_io.export_header(fmt)
+            while True:
+                rows = cursor.fetchmany(catalog_io.BATCH_SIZE)
+                if not rows:
+                    break
+                yield catalog_io.encode_rows(rows, fmt)
+        finally:
+            close_streaming_cursor(cursor)
+            connection.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=catalog_io.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="products.{fmt}"'},
+    )
+
+# Mark a product as hot (flash sale): its stock is split over counter slots so
+# concurrent orders stop queueing on the single Products row lock
+@app.route('/products/<int:product_id>/hot', methods=['POST'])
+def enable_hot_product(product_id):
+    data = request.get_json(silent=True) or {}
+    slots = int(data.get('slots', inventory.DEFAULT_SLOTS))
+    if not 1 <= slots <= 64:
+        return jsonify({"error": "slots must be between 1 and 64"}), 400
+
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        if not inventory.enable_hot(connection, product_id, slots):
+            connection.rollback()
+            return jsonify({"error": "Product not found"}), 404
+        connection.commit()
+        return jsonify({"message": f"Product {product_id} stock split over {slots} slots"})
+    except mysql.connector.Error as err:
+        connection.rollback()
+        return jsonify({"error": str(err)}), 500
+    finally:
+        connection.close()
+
+@app.route('/products/<int:product_id>/hot', methods=['DELETE'])
+def disable_hot_product(product_id):
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        if not inventory.disable_hot(connection, product_id):
+            connection.rollback()
+            return jsonify({"error": "Product is not hot"}), 404
+        connection.commit()
+        catalog_cache.invalidate()
+        return jsonify({"message": f"Product {product_id} stock folded back into the product row"})
+    except mysql.connector.Error as err:
+        connection.rollback()
+        return jsonify({"error": str(err)}), 500
+    finally:
+        connection.close()
+
+@app.route('/inventory/reconcile', methods=['POST'])
+def reconcile_inventory():
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        released = inventory.release_expired(connection)
+        changed = inventory.reconcile(connection)
+        connection.commit()
+        catalog_cache.invalidate()
+        return jsonify({"released_products": sorted(released), "reconciled_products": changed})
+    except mysql.connector.Error as err:
+        connection.rollback()
+        return jsonify({"error": str(err)}), 500
+    finally:
+        connection.close()
+
 # Route to login as an admin
 @app.route('/login-admin', methods=['POST'])
 def login_admin():
     data = request.get_json()
-    print("Received data:", data)  # Debug: Print received data
+    log.debug("Admin login request", extra={'body': data})
 
     # Validate required fields
     required_fields = ['email', 'password']
@@ -191,125 +773,267 @@ def login_admin():
     if not connection:
         return jsonify({"error": "Database connection failed"}), 500
 
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM admins WHERE email = %s", (email,))
-    admin = cursor.fetchone()
+    try:
+        admin = repository.find_admin_by_email(connection, email)
+    finally:
+        # Don't hold a pooled connection while bcrypt runs
+        connection.close()
 
     if not admin:
-        cursor.close()
-        connection.close()
         return jsonify({"error": "Admin not found"}), 404
 
     # Verify the password
-    stored_hashed_password = admin['password_hash'].encode('utf-8')
-    if bcrypt.checkpw(password.encode('utf-8'), stored_hashed_password):
-        cursor.close()
-        connection.close()
-        return jsonify({"message": "Admin login successful"}), 200
-    else:
-        cursor.close()
-        connection.close()
+    if not password_hasher.check(password, admin.password_hash):
         return jsonify({"error": "Invalid password"}), 401
 
+    # Upgrade hashes made with an older cost factor while we have the password
+    if password_hasher.needs_rehash(admin.password_hash):
+        connection = get_db_connection()
+        if connection:
+            try:
+                with repository.transaction(connection):
+                    repository.set_admin_password_hash(connection, email, password_hasher.hash(password))
+            except mysql.connector.Error as err:
+                # The login itself succeeded; retry the upgrade next time
+                log.warning("Password rehash failed", extra={'error': str(err)})
+            finally:
+                connection.close()
+
+    return jsonify({"message": "Admin login successful"}), 200
+
+ORDER_STREAM_BATCH = 200
+# Without ?limit= a page still stops here; clients follow X-Next-Cursor
+ORDERS_PAGE_SIZE = 100
+
+def encode_order(row, fields):
+    """JSON text for one order row; the items array from MySQL is spliced in as-is."""
+    items = row.pop('items', None)
+    order = project(row, [field for field in fields if field != 'items'] if fields else None)
+    body = jsonio.dumps(order)
+    if fields is None or 'items' in fields:
+        if isinstance(items, bytes):
+            items = items.decode('utf-8')
+        body = body[:-1] + (', ' if order else '') + '"items": ' + (items or '[]') + '}'
+    return body
+
 @app.route('/orders', methods=['GET'])
 def get_orders():
+    limit, page_cursor = parse_page(request.args, default_limit=ORDERS_PAGE_SIZE)
+    after_id = cursor_id(page_cursor)
+    fields = parse_fields(request.args, ORDER_FIELDS)
+    created_from, created_to = parse_date_range(request.args)
+
+    # Status columns are stored lowercase (migration 002), so the filter
+    # values are normalized here rather than the columns in SQL
+    filters = {
+        field: request.args[field].strip().lower()
+        for field in ORDER_FILTERS if field in request.args
+    }
+
+    # order_id drives the keyset, so it is always selected
+    columns = [ORDER_FIELDS[field] for field in (fields or ORDER_FIELDS) if field != 'order_id']
+    columns.insert(0, ORDER_FIELDS['order_id'])
+
     connection = get_db_connection()
     if connection is None:
         return jsonify({"error": "Database connection failed"}), 500
 
     try:
-        cursor = connection.cursor(dictionary=True)
-        
-        # Base query without any filters
-        query = """
-            SELECT 
-                Orders.order_id,
-                Users.name AS customer_name,
-                Users.email,
-                Users.phone,
-                Orders.order_status,
-                Orders.total_price,
-                Orders.payment_status,
-                Orders.advance_payment,
-                Orders.delivery_type,
-                Orders.delivery_address,
-                Orders.map_link,
-                Products.name AS product_name,
-                Order_Items.quantity,
-                Order_Items.price AS item_price
-            FROM 
-                Orders
-            LEFT JOIN 
-                Users ON Orders.user_id = Users.user_id
-            LEFT JOIN 
-                Order_Items ON Orders.order_id = Order_Items.order_id
-            LEFT JOIN 
-                Products ON Order_Items.product_id = Products.product_id
-        """
+        # The next-page cursor goes out in the headers, before any row is
+        # streamed, so probe for the first order of the following page now
+        next_cursor = None
+        if limit is not None:
+            probe = connection.cursor(buffered=True)
+            probe.execute(*build_next_page_query(
+                filters, created_from=created_from, created_to=created_to, after_id=after_id, limit=limit))
+            row = probe.fetchone()
+            probe.close()
+            if row is not None:
+                # Keyset is "order_id < cursor", so the next page starts at row[0]
+                next_cursor = {'id': row[0] + 1}
 
-        params = []
-        
-        # Print received parameters for debugging
-        print("Received filter parameters:", request.args)
-
-        # Only add WHERE clause if filters are present
-        if request.args:
-            query += " WHERE 1=1"
-
-            if 'delivery_type' in request.args:
-                delivery_type = request.args['delivery_type'].lower()
-                query += " AND LOWER(COALESCE(Orders.delivery_type, '')) = %s"
-                params.append(delivery_type)
-                print(f"Adding delivery_type filter: {delivery_type}")
-
-            if 'order_status' in request.args:
-                order_status = request.args['order_status'].lower()
-                query += " AND LOWER(COALESCE(Orders.order_status, 'pending')) = %s"
-                params.append(order_status)
-                print(f"Adding order_status filter: {order_status}")
-
-            if 'payment_status' in request.args:
-                payment_status = request.args['payment_status'].lower()
-                query += " AND LOWER(COALESCE(Orders.payment_status, 'not paid')) = %s"
-                params.append(payment_status)
-                print(f"Adding payment_status filter: {payment_status}")
-
-        # Print final query and parameters for debugging
-        print("Executing query:", query)
-        print("With parameters:", params)
+        query, params = build_orders_query(
+            columns, filters, created_from=created_from, created_to=created_to, after_id=after_id, limit=limit)
 
+        log.debug("Orders query", extra={'sql': query, 'params': params})
+
+        # Unbuffered: rows are pulled from the server batch by batch while
+        # the response streams, so memory stays flat for a month of orders
+        cursor = connection.cursor(dictionary=True, buffered=False)
         cursor.execute(query, params)
-        orders = cursor.fetchall()
-        
-        # Convert None values to defaults and format numeric values
-        for order in orders:
-            order['order_status'] = order['order_status'] or 'pending'
-            order['payment_status'] = order['payment_status'] or 'not paid'
-            order['delivery_type'] = order['delivery_type'] or ''
-            
-            # Format numeric values
-            order['total_price'] = float(order['total_price']) if order['total_price'] else 0.00
-            order['advance_payment'] = float(order['advance_payment']) if order['advance_payment'] else 0.00
-            order['item_price'] = float(order['item_price']) if order['item_price'] else 0.00
-        
-        # Print number of orders found
-        print(f"Found {len(orders)} orders matching filters")
-        
-        return jsonify(orders)
     except mysql.connector.Error as err:
-        print(f"Database error: {err}")
-        return jsonify({"error": str(err)}), 500
-    finally:
-        cursor.close()
         connection.close()
+        log.error("Orders query failed", extra={'error': str(err)})
+        return jsonify({"error": str(err)}), 500
+
+    def generate():
+        try:
+            yield '['
+            first = True
+            while True:
+                rows = cursor.fetchmany(ORDER_STREAM_BATCH)
+                if not rows:
+                    break
+                chunk = ','.join(encode_order(row, fields) for row in rows)
+                yield chunk if first else ',' + chunk
+                first = False
+            yield ']'
+        finally:
+            close_streaming_cursor(cursor)
+            connection.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/json',
+        headers=next_page_headers(next_cursor),
+    )
+
+def export_order_fields(row):
+    """Order-level export values for a row of build_order_export_query()."""
+    total = row['total_price'] or 0
+    advance = row['advance_payment'] or 0
+    order = {column: row.get(column) for column in ORDER_EXPORT_ORDER_COLUMNS}
+    order.update(
+        created_at=row['created_at'].strftime('%Y-%m-%d %H:%M:%S') if row['created_at'] else None,
+        total_price=total,
+        advance_payment=advance,
+        balance_due=total - advance,
+    )
+    return order
+
+def export_item_fields(row):
+    if row['product_id'] is None:
+        return None  # Order without items (LEFT JOIN)
+    return {
+        'product_id': row['product_id'],
+        'product_name': row['product_name'],
+        'quantity': row['quantity'],
+        'item_price': row['item_price'],
+        'line_total': row['quantity'] * row['item_price'],
+    }
+
+def generate_order_export(fmt, created_from, created_to):
+    """Yield export text window by window.
+
+    Each window of ORDER_EXPORT_WINDOW orders is read through its own
+    pooled connection on an unbuffered cursor, and the connection goes back
+    to the pool before the next window. A long export therefore never pins
+    a connection that other admin requests are waiting for. CSV has one line
+    per item, with the order columns repeated. NDJSON has one object per
+    order, with its items nested.
+    """
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(ORDER_EXPORT_ORDER_COLUMNS + ORDER_EXPORT_ITEM_COLUMNS)
+        yield buffer.getvalue()
+
+    after_id = 0
+    while True:
+        connection = db_pool.get_connection()
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        try:
+            cursor.execute(*build_order_export_query(
+                created_from, created_to, after_id=after_id, window=ORDER_EXPORT_WINDOW))
+            orders_seen = 0
+            current = None  # NDJSON order still collecting items
+            while True:
+                rows = cursor.fetchmany(ORDER_STREAM_BATCH)
+                if not rows:
+                    break
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in rows:
+                    if row['order_id'] != after_id:
+                        after_id = row['order_id']
+                        orders_seen += 1
+                        if fmt == 'ndjson' and current is not None:
+                            buffer.write(jsonio.dumps(current) + '\n')
+                        current = dict(export_order_fields(row), items=[])
+                    item = export_item_fields(row)
+                    if fmt == 'csv':
+                        item = item or {}
+                        writer.writerow(
+                            [current[column] for column in ORDER_EXPORT_ORDER_COLUMNS]
+                            + [item.get(column) for column in ORDER_EXPORT_ITEM_COLUMNS]
+                        )
+                    elif item is not None:
+                        current['items'].append(item)
+                yield buffer.getvalue()
+            # Windows end on an order boundary, so the last order is complete
+            if fmt == 'ndjson' and current is not None:
+                yield jsonio.dumps(current) + '\n'
+        finally:
+            close_streaming_cursor(cursor)
+            connection.close()
+
+        if orders_seen < ORDER_EXPORT_WINDOW:
+            break
+
+# Month-end reconciliation: every order in [from, to), streamed (gzip when
+# the client accepts it) in constant memory
+@app.route('/orders/export', methods=['GET'])
+def export_orders():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ORDER_EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format. Allowed values are: {', '.join(ORDER_EXPORT_FORMATS)}"}), 400
+    created_from, created_to = parse_date_range(request.args)
+
+    filename = '-'.join(['orders'] + [request.args[name] for name in ('from', 'to') if request.args.get(name)])
+    headers = {
+        'Content-Disposition': f'attachment; filename="{secure_filename(filename)}.{fmt}"',
+        'Vary': 'Accept-Encoding',
+    }
+    body = generate_order_export(fmt, created_from, created_to)
+    if accepts_gzip(request):
+        body = gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+
+    return Response(stream_with_context(body), mimetype=ORDER_EXPORT_FORMATS[fmt], headers=headers)
+
+@app.route('/orders/events', methods=['GET'])
+def stream_order_events():
+    """Server-Sent Events: order-created, order-status-changed and order-payment-changed.
+
+    EventSource sends ``Last-Event-ID`` when it reconnects and the stream
+    resumes after that event; ``?last_event_id=`` does the same for a first
+    connection. Without either the stream starts with the next event.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id is not None:
+        if not last_event_id.isdigit():
+            return jsonify({"error": "last_event_id must be a non-negative integer"}), 400
+        last_event_id = int(last_event_id)
+
+    lifecycle = app.extensions.get('lifecycle')
+    if lifecycle is not None and lifecycle.draining:
+        raise events.FeedUnavailable("Shutting down, please reconnect")
+    subscription = order_feed.subscribe(last_event_id)
+
+    def generate():
+        deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            batch = subscription.get(SSE_KEEPALIVE_SECONDS)
+            if batch is None:
+                break  # Fell behind or the feed stopped; the client resumes from its last id
+            yield ''.join(events.format_sse(event) for event in batch) if batch else ": keep-alive\n\n"
+            if lifecycle is not None and lifecycle.draining:
+                break
+
+    # No stream_with_context: an open stream must not hold up the shutdown
+    # drain, and the generator needs nothing from the request
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # nginx would otherwise buffer the stream
+    })
+    # Also runs when the client leaves before the first chunk
+    response.call_on_close(lambda: order_feed.unsubscribe(subscription))
+    return response
 
 @app.route('/update_status', methods=['PUT'])
 def update_order_status():
     """Update order status to 'shipped' or 'delivered' in MySQL"""
-    connection = get_db_connection()
-    if connection is None:
-        return jsonify({"error": "Database connection failed"}), 500
-
     data = request.json
     order_id = data.get("order_id")
     new_status = data.get("new_status")
@@ -319,11 +1043,19 @@ def update_order_status():
     if new_status not in allowed_statuses:
         return jsonify({"error": "Invalid status. Allowed: 'shipped', 'delivered'"}), 400
 
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
     try:
         cursor = connection.cursor()
         query = "UPDATE Orders SET order_status = %s WHERE order_id = %s"
         cursor.execute(query, (new_status, order_id))
+        if cursor.rowcount > 0:
+            events.publish(connection, events.ORDER_STATUS_CHANGED, order_id, {"order_status": new_status})
         connection.commit()
+        order_feed.wake()
+        invalidate_order_history(connection, [order_id])
 
         if cursor.rowcount == 0:
             return jsonify({"error": "Order not found"}), 404
@@ -344,13 +1076,18 @@ def delete_product(product_id):
     try:
         cursor = connection.cursor()
         cursor.execute("DELETE FROM Products WHERE product_id = %s", (product_id,))
-        connection.commit()
-        
         if cursor.rowcount == 0:
+            connection.rollback()
             return jsonify({"error": "Product not found"}), 404
+        # A hot product's counter slots go with it, in the same transaction
+        # (product row first, the lock order enable_hot uses)
+        cursor.execute("DELETE FROM inventory_slots WHERE product_id = %s", (product_id,))
+        connection.commit()
             
+        catalog_cache.invalidate()
         return jsonify({"message": "Product deleted successfully"})
     except mysql.connector.Error as err:
+        connection.rollback()
         return jsonify({"error": str(err)}), 500
     finally:
         cursor.close()
@@ -358,23 +1095,26 @@ def delete_product(product_id):
 
 @app.route('/orders/<int:order_id>/status', methods=['PUT'])
 def update_order_status_endpoint(order_id):
-    connection = get_db_connection()
-    if connection is None:
-        return jsonify({"error": "Database connection failed"}), 500
-
     data = request.json
     new_status = data.get('status')
     
     # Validate the new status
-    allowed_statuses = ["pending", "order confirmation", "baked", "shipped", "delivered"]
-    if not new_status or new_status not in allowed_statuses:
-        return jsonify({"error": f"Invalid status. Allowed values are: {', '.join(allowed_statuses)}"}), 400
+    if not new_status or new_status not in ORDER_STATUSES:
+        return jsonify({"error": f"Invalid status. Allowed values are: {', '.join(ORDER_STATUSES)}"}), 400
+
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"error": "Database connection failed"}), 500
 
     try:
         cursor = connection.cursor()
         query = "UPDATE Orders SET order_status = %s WHERE order_id = %s"
         cursor.execute(query, (new_status, order_id))
+        if cursor.rowcount > 0:
+            events.publish(connection, events.ORDER_STATUS_CHANGED, order_id, {"order_status": new_status})
         connection.commit()
+        order_feed.wake()
+        invalidate_order_history(connection, [order_id])
         
         if cursor.rowcount > 0:
             return jsonify({"success": True, "message": "Order status updated successfully"})
@@ -389,23 +1129,26 @@ def update_order_status_endpoint(order_id):
 
 @app.route('/orders/<int:order_id>/payment-status', methods=['PUT'])
 def update_payment_status(order_id):
-    connection = get_db_connection()
-    if connection is None:
-        return jsonify({"error": "Database connection failed"}), 500
-
     data = request.json
     new_status = data.get('payment_status')
     
     # Validate the new status
-    allowed_statuses = ["not paid", "advance paid", "full paid"]
-    if not new_status or new_status not in allowed_statuses:
-        return jsonify({"error": f"Invalid status. Allowed values are: {', '.join(allowed_statuses)}"}), 400
+    if not new_status or new_status not in PAYMENT_STATUSES:
+        return jsonify({"error": f"Invalid status. Allowed values are: {', '.join(PAYMENT_STATUSES)}"}), 400
+
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"error": "Database connection failed"}), 500
 
     try:
         cursor = connection.cursor()
         query = "UPDATE Orders SET payment_status = %s WHERE order_id = %s"
         cursor.execute(query, (new_status, order_id))
+        if cursor.rowcount > 0:
+            events.publish(connection, events.ORDER_PAYMENT_CHANGED, order_id, {"payment_status": new_status})
         connection.commit()
+        order_feed.wake()
+        invalidate_order_history(connection, [order_id])
         
         if cursor.rowcount > 0:
             return jsonify({"success": True, "message": "Payment status updated successfully"})
@@ -418,5 +1161,114 @@ def update_payment_status(order_id):
         cursor.close()
         connection.close()
 
+@app.route('/orders/status', methods=['PUT'])
+def bulk_update_order_status():
+    """Set ``status`` and/or ``payment_status`` on many orders in one transaction.
+
+    Body: ``{"order_ids": [...], "status": ..., "payment_status": ...}``.
+    Returns one result per requested order: updated, unchanged or not_found.
+    """
+    data = request.get_json(silent=True) or {}
+    order_ids = data.get('order_ids')
+    new_status = data.get('status')
+    new_payment_status = data.get('payment_status')
+
+    if not isinstance(order_ids, list) or not order_ids:
+        return jsonify({"error": "order_ids must be a non-empty list"}), 400
+    if len(order_ids) > MAX_BULK_ORDERS:
+        return jsonify({"error": f"At most {MAX_BULK_ORDERS} orders per request"}), 400
+    if any(isinstance(order_id, bool) or not isinstance(order_id, int) for order_id in order_ids):
+        return jsonify({"error": "order_ids must be integers"}), 400
+    if new_status is None and new_payment_status is None:
+        return jsonify({"error": "Provide status and/or payment_status"}), 400
+    if new_status is not None and new_status not in ORDER_STATUSES:
+        return jsonify({"error": f"Invalid status. Allowed values are: {', '.join(ORDER_STATUSES)}"}), 400
+    if new_payment_status is not None and new_payment_status not in PAYMENT_STATUSES:
+        return jsonify({"error": f"Invalid payment status. Allowed values are: {', '.join(PAYMENT_STATUSES)}"}), 400
+
+    order_ids = list(dict.fromkeys(order_ids))
+    placeholders = ', '.join(['%s'] * len(order_ids))
+    assignments, values = [], []
+    if new_status is not None:
+        assignments.append("order_status = %s")
+        values.append(new_status)
+    if new_payment_status is not None:
+        assignments.append("payment_status = %s")
+        values.append(new_payment_status)
+
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = connection.cursor()
+        # Lock the rows first so the per-order results reflect exactly what
+        # the single UPDATE below changes
+        cursor.execute(
+            f"SELECT order_id, order_status, payment_status FROM Orders "
+            f"WHERE order_id IN ({placeholders}) FOR UPDATE",
+            order_ids
+        )
+        current = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        changed = [
+            order_id for order_id, (order_status, payment_status) in current.items()
+            if (new_status is not None and order_status != new_status)
+            or (new_payment_status is not None and payment_status != new_payment_status)
+        ]
+        if changed:
+            cursor.execute(
+                f"UPDATE Orders SET {', '.join(assignments)} "
+                f"WHERE order_id IN ({', '.join(['%s'] * len(changed))})",
+                values + changed
+            )
+            events.publish_many(connection, [
+                (events.ORDER_STATUS_CHANGED, order_id, {"order_status": new_status})
+                for order_id in changed if new_status is not None and current[order_id][0] != new_status
+            ] + [
+                (events.ORDER_PAYMENT_CHANGED, order_id, {"payment_status": new_payment_status})
+                for order_id in changed
+                if new_payment_status is not None and current[order_id][1] != new_payment_status
+            ])
+        connection.commit()
+        cursor.close()
+        order_feed.wake()
+        invalidate_order_history(connection, changed)
+    except mysql.connector.Error as err:
+        connection.rollback()
+        return jsonify({"error": str(err)}), 500
+    finally:
+        connection.close()
+
+    changed = set(changed)
+    results = [
+        {
+            "order_id": order_id,
+            "result": "updated" if order_id in changed else "unchanged" if order_id in current else "not_found",
+        }
+        for order_id in order_ids
+    ]
+    return jsonify({
+        "success": True,
+        "updated": len(changed),
+        "not_found": len(order_ids) - len(current),
+        "results": results,
+    })
+
+def create_app():
+    """The admin app, ready to serve; the entry point for wsgi.py and ``python app.py``."""
+    if 'lifecycle' not in app.extensions:
+        order_feed.start()
+        # Closers run in reverse, so the pool closes after everything using it
+        lifecycle = install_lifecycle(app, drain_timeout=float(os.environ.get('SHUTDOWN_DRAIN_TIMEOUT', 5)))
+        lifecycle.on_shutdown('db pool', db_pool.close_all)
+        lifecycle.on_shutdown('image store', image_store.shutdown)
+        lifecycle.on_shutdown('password hasher', password_hasher.shutdown)
+        lifecycle.on_shutdown('order feed', order_feed.stop)
+        if slow_query_log is not None:
+            lifecycle.on_shutdown('slow query log', slow_query_log.shutdown)
+    return app
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    # Development server only; production runs gunicorn (see gunicorn.conf.py)
+    create_app().run(**dev_server_options(5001))
\ No newline at end of file
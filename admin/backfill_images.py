@@ -0,0 +1,39 @@
+"""Move legacy Products.image_data BLOBs into the content-addressed image store.
+
+Run once after applying migrations/001_product_image_hash.sql:
+
+    python backfill_images.py
+
+Rows are processed one at a time so only a single image is in memory.
+"""
+import io
+
+from app import db_pool, image_store
+
+
+def backfill():
+    connection = db_pool.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT product_id FROM Products WHERE image_hash IS NULL AND image_data IS NOT NULL")
+        product_ids = [row['product_id'] for row in cursor.fetchall()]
+
+        for product_id in product_ids:
+            cursor.execute("SELECT image_data FROM Products WHERE product_id = %s", (product_id,))
+            image_data = cursor.fetchone()['image_data']
+            digest = image_store.save(io.BytesIO(image_data))
+            cursor.execute(
+                "UPDATE Products SET image_hash = %s, image_data = NULL WHERE product_id = %s",
+                (digest, product_id)
+            )
+            connection.commit()
+            print(f"Product {product_id}: stored as {digest}")
+        cursor.close()
+    finally:
+        connection.close()
+        # Let queued thumbnail jobs finish before exiting
+        image_store.shutdown(wait=True)
+
+
+if __name__ == '__main__':
+    backfill()
@@ -1,6 +1,9 @@
-db_config = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'Thrisha',  # Add your MySQL password here
-    'database': 'bakes_db'
-} 
\ No newline at end of file
+import os
+import sys
+
+# One definition for both apps and the scripts, overridable with DB_HOST,
+# DB_PORT, DB_USER, DB_PASSWORD and DB_NAME (see bakes_common/config.py)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bakes_common.config import db_config_from_env  # noqa: E402
+
+db_config = db_config_from_env()
@@ -815,6 +815,39 @@ function showMessage(message, type) {
     }
 }
 
+// Set status and/or payment status on many orders with one request;
+// resolves to the per-order results
+function updateOrdersInBulk(orderIds, changes) {
+    return fetch('http://localhost:5001/orders/status', {
+        method: 'PUT',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ order_ids: orderIds, ...changes })
+    })
+    .then(response => response.json().then(data => {
+        if (!response.ok) {
+            throw new Error(data.error || `HTTP error! status: ${response.status}`);
+        }
+        return data;
+    }));
+}
+
+// Live order feed. EventSource reconnects on its own and sends the id of
+// the last event it saw, so the server replays whatever was missed; a
+// 'reset' event means too much was missed and the list should be reloaded
+function subscribeToOrderEvents(handlers) {
+    const source = new EventSource('http://localhost:5001/orders/events');
+    ['order-created', 'order-status-changed', 'order-payment-changed', 'reset'].forEach(type => {
+        source.addEventListener(type, event => {
+            if (handlers[type]) {
+                handlers[type](JSON.parse(event.data));
+            }
+        });
+    });
+    return source;
+}
+
 // Function to toggle status dropdown
 function toggleStatusDropdown(element) {
     const dropdown = element.nextElementSibling;
@@ -919,15 +952,59 @@ function updatePaymentStatus(selectElement) {
     });
 }
 
+// GET /orders returns one object per order with its items nested; the
+// orders table shows one row per item
+function flattenOrders(orders) {
+    return orders.flatMap(order => {
+        const items = order.items && order.items.length ? order.items : [{}];
+        return items.map(item => ({ ...order, ...item }));
+    });
+}
+
+// GET /orders answers one page at a time, newest first; the
+// X-Next-Cursor header names the next page and is absent on the last one
+const ORDERS_PAGE_SIZE = 100;
+
+function fetchOrdersPage(filters, after) {
+    const params = new URLSearchParams(filters);
+    params.set('limit', ORDERS_PAGE_SIZE);
+    if (after) {
+        params.set('after', after);
+    }
+    return fetch(`http://localhost:5001/orders?${params.toString()}`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return response.json().then(orders => ({ orders, next: response.headers.get('X-Next-Cursor') }));
+        });
+}
+
+// Shows the "Load more orders" button while there is a next page
+function showLoadMoreOrders(next, onClick) {
+    let button = document.getElementById('loadMoreOrders');
+    if (!button) {
+        const table = document.getElementById('ordersTableBody').closest('table');
+        button = document.createElement('button');
+        button.id = 'loadMoreOrders';
+        button.textContent = 'Load more orders';
+        table.insertAdjacentElement('afterend', button);
+    }
+    button.style.display = next ? '' : 'none';
+    button.onclick = () => onClick(next);
+}
+
 // Update the fetchOrders function to include payment status dropdown
-function fetchOrders() {
-    fetch('http://localhost:5001/orders')
-        .then(response => response.json())
-        .then(orders => {
+function fetchOrders(after) {
+    fetchOrdersPage({}, after)
+        .then(({ orders, next }) => {
             const tbody = document.getElementById('ordersTableBody');
-            tbody.innerHTML = '';
+            if (!after) {
+                tbody.innerHTML = '';
+            }
+            showLoadMoreOrders(next, fetchOrders);
             
-            orders.forEach(order => {
+            flattenOrders(orders).forEach(order => {
                 const tr = document.createElement('tr');
                 // Get payment status with fallback to 'not paid' if undefined
                 const paymentStatus = order.payment_status || 'not paid';
@@ -0,0 +1,6 @@
+"""Code shared by the admin app (admin/app.py) and the storefront app
+(user project/app.py).
+
+Both apps put the repository root on ``sys.path`` before importing from here,
+so this package works without being installed.
+"""
@@ -0,0 +1,116 @@
+"""Session tokens and off-thread password hashing.
+
+Login verifies the password once with bcrypt and hands back a signed
+session token. Later requests present it as ``Authorization: Bearer
+<token>``; checking it is an HMAC comparison (constant time, done by
+itsdangerous), so neither bcrypt nor the database is involved.
+
+bcrypt itself runs in a small process pool. A burst of logins can then use
+at most ``workers`` cores. A request thread waits on its hash, so at most
+``max_pending`` logins per worker are in flight; that has to stay below the
+worker's thread count, or logins would occupy every thread and starve the
+product and order routes. It is never below ``workers``, which would leave a
+bcrypt process idle. A login that finds every slot taken waits up to
+``wait`` seconds for one, then gets 503 instead of queueing further. Hashes
+made with fewer rounds than ``rounds`` are upgraded on the next successful
+login.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from flask import request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+DEFAULT_TOKEN_TTL = 7 * 24 * 3600  # seconds
+
+
+class HasherBusy(Exception):
+    """Too many password hashes queued; routes answer 503."""
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def hash_rounds(hashed):
+    """Cost factor of a ``$2b$12$...`` hash."""
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+class PasswordHasher:
+    def __init__(self, workers=2, rounds=12, max_pending=None, wait=0.5):
+        self.workers = workers
+        self.rounds = rounds
+        self.max_pending = max(workers, max_pending or 0)
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Created on first use so importing the app never starts processes.
+        # forkserver: forking this multithreaded worker (log writer, sweeper,
+        # feed threads) could copy a lock some other thread holds
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('forkserver'))
+            return self._executor
+
+    def _run(self, fn, *args):
+        # A hash takes a fraction of a second, so a slot usually frees up
+        # before the wait runs out
+        if not self._slots.acquire(timeout=self.wait):
+            raise HasherBusy("Too many login attempts in progress, please retry")
+        try:
+            return self._pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def check(self, password, hashed):
+        return self._run(_checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def hash(self, password):
+        return self._run(_hashpw, password.encode('utf-8'), self.rounds).decode('utf-8')
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(hashed) < self.rounds
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+class SessionTokens:
+    def __init__(self, secret_key, salt, ttl=DEFAULT_TOKEN_TTL):
+        # Distinct salts keep storefront tokens from being accepted by the
+        # admin app and vice versa, even with a shared secret
+        self._serializer = URLSafeTimedSerializer(secret_key, salt=salt)
+        self.ttl = ttl
+
+    def issue(self, claims):
+        return self._serializer.dumps(claims)
+
+    def verify(self, token):
+        """Claims of a valid token, or None if it is forged or expired."""
+        try:
+            return self._serializer.loads(token, max_age=self.ttl)
+        except (BadSignature, SignatureExpired):
+            return None
+
+    def from_request(self):
+        header = request.headers.get('Authorization', '')
+        if not header.startswith('Bearer '):
+            return None
+        return self.verify(header[len('Bearer '):].strip())
@@ -0,0 +1,240 @@
+"""Read-through caches for the product catalog and customer order history.
+
+Entries live in process memory and are tagged with a version. Every write
+path calls ``invalidate()``, which bumps the version; a reader that sees a
+new version drops its local entries and reloads from MySQL once. The
+version lives in a backend so that both apps (and every worker of each) see
+each other's writes:
+
+* ``local``  - in-process only; fine for a single worker
+* ``file``   - a small file on the shared host disk (default)
+* ``redis``  - ``INCR`` on a Redis key, for workers spread over machines
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalVersion:
+    def __init__(self):
+        # Start from the clock so a restarted process never repeats a
+        # version (and an ETag built from it) handed out before
+        self._start = time.time_ns()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope=None):
+        return self._versions.get(scope, self._start)
+
+    def bump(self, scope=None):
+        with self._lock:
+            self._versions[scope] = self._versions.get(scope, self._start) + 1
+            return self._versions[scope]
+
+
+class FileVersion:
+    """Version shared by every process on the host through a tiny file.
+
+    Scoped versions (one per customer, say) live in files next to it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path):
+            self.bump()
+
+    def _path(self, scope):
+        if scope is None:
+            return self.path
+        digest = hashlib.sha1(str(scope).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(f'{self.path}.d', digest)
+
+    def get(self, scope=None):
+        try:
+            with open(self._path(scope)) as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self, scope=None):
+        # A nanosecond timestamp is unique per bump, so concurrent writers
+        # never need a read-modify-write cycle
+        version = time.time_ns()
+        path = self._path(scope)
+        if scope is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}'
+        with open(tmp_path, 'w') as f:
+            f.write(str(version))
+        os.replace(tmp_path, path)
+        return version
+
+
+class RedisVersion:
+    def __init__(self, url, key='bakes:catalog:version'):
+        import redis  # Optional dependency, only needed for this backend
+
+        self._client = redis.Redis.from_url(url)
+        self.key = key
+
+    def _key(self, scope):
+        return self.key if scope is None else f'{self.key}:{scope}'
+
+    def get(self, scope=None):
+        return int(self._client.get(self._key(scope)) or 0)
+
+    def bump(self, scope=None):
+        return self._client.incr(self._key(scope))
+
+
+def version_backend_from_env(name='catalog'):
+    """Version backend chosen by ``CACHE_BACKEND`` (local, file or redis)."""
+    backend = os.environ.get('CACHE_BACKEND', 'file')
+    if backend == 'local':
+        return LocalVersion()
+    if backend == 'redis':
+        return RedisVersion(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'), key=f'bakes:{name}:version')
+    directory = os.environ.get('CACHE_VERSION_DIR', tempfile.gettempdir())
+    return FileVersion(os.path.join(directory, f'bakes-{name}.version'))
+
+
+class CatalogCache:
+    def __init__(self, version_backend=None, ttl=300, max_entries=1024):
+        self.version_backend = version_backend or LocalVersion()
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._version = self.version_backend.get()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _sync_version(self, version):
+        if version != self._version:
+            self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+        return version
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for ``key`` or call ``loader()`` and cache it.
+
+        The cached object is shared between requests: copy rows before
+        modifying them.
+        """
+        # Backend read happens outside the lock; it may be file or network I/O
+        version = self.version_backend.get()
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader()
+
+        with self._lock:
+            # Skip storing if a write landed while we were loading
+            if value is not None and self._version == version:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def version(self):
+        """Current catalog version, shared by every app and worker; changes on every write."""
+        return self.version_backend.get()
+
+    def invalidate(self):
+        """Call after any write to products (catalog edits and stock changes)."""
+        version = self.version_backend.bump()
+        with self._lock:
+            self._entries.clear()
+            self._version = version
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self._version,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class ScopedCache:
+    """Cache whose entries are invalidated per scope, e.g. per customer.
+
+    Placing an order only drops that customer's cached history; everyone
+    else's stays warm.
+    """
+
+    def __init__(self, version_backend=None, ttl=300, max_entries=4096):
+        self.version_backend = version_backend or LocalVersion()
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (scope, key) -> (expires_at, version, value)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_load(self, scope, key, loader):
+        version = self.version_backend.get(scope)
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is not None and entry[0] > time.monotonic() and entry[1] == version:
+                self._entries.move_to_end((scope, key))
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        value = loader()
+
+        if value is not None:
+            with self._lock:
+                self._entries[(scope, key)] = (time.monotonic() + self.ttl, version, value)
+                self._entries.move_to_end((scope, key))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def version(self, scope):
+        return self.version_backend.get(scope)
+
+    def invalidate(self, scope):
+        self.version_backend.bump(scope)
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
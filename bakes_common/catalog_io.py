@@ -0,0 +1,176 @@
+"""Streaming CSV / NDJSON import and export of the product catalog.
+
+The catalog is maintained in spreadsheets. An import file is read one row at
+a time, so a 5,000-line upload is never held in memory. Each row is
+validated on its own, and a bad row is reported with its line number instead
+of failing the whole file. The app writes valid rows in batches of
+``executemany`` upserts. An export goes the other way: rows come off an
+unbuffered cursor and are written out as they arrive. An exported file can
+be edited and imported again unchanged.
+"""
+import csv
+import io
+import json
+import re
+from decimal import Decimal, InvalidOperation
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Columns an import may set; the export writes exactly these
+COLUMNS = ('product_id', 'name', 'description', 'price', 'category', 'quantity', 'status', 'image_hash')
+REQUIRED = ('name', 'price')
+PRODUCT_STATUSES = ('in_stock', 'out_of_stock')
+
+BATCH_SIZE = 500
+
+_DIGEST_RE = re.compile(r'[0-9a-f]{64}')
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole can't be read (unknown format, bad CSV header)."""
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(explicit=None, filename=None, content_type=None):
+    if explicit:
+        if explicit not in FORMATS:
+            raise ImportFormatError(f"Unsupported format. Allowed values are: {', '.join(FORMATS)}")
+        return explicit
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension in ('ndjson', 'jsonl'):
+            return 'ndjson'
+        if extension == 'csv':
+            return 'csv'
+    content_type = (content_type or '').split(';')[0].strip()
+    for fmt, mimetype in FORMATS.items():
+        if content_type == mimetype:
+            return fmt
+    raise ImportFormatError("Can't tell the file format; pass ?format=csv or ?format=ndjson")
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row)`` from a binary stream; ``row`` may be a RowError."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        unknown = set(reader.fieldnames or ()) - set(COLUMNS)
+        if not reader.fieldnames or unknown:
+            raise ImportFormatError(
+                f"Unknown CSV column(s): {', '.join(sorted(unknown))}" if unknown else "Empty CSV file")
+        for row in reader:
+            if None in row:
+                yield reader.line_num, RowError("Row has more cells than the header")
+            else:
+                # An empty cell leaves the column as it is
+                yield reader.line_num, {key: value for key, value in row.items() if value not in ('', None)}
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, RowError("Invalid JSON")
+                continue
+            if not isinstance(row, dict):
+                yield line_number, RowError("Each line must be a JSON object")
+                continue
+            unknown = set(row) - set(COLUMNS)
+            if unknown:
+                yield line_number, RowError(f"Unknown column(s): {', '.join(sorted(unknown))}")
+                continue
+            yield line_number, {key: value for key, value in row.items() if value is not None}
+
+
+def _number(value, column, cast):
+    try:
+        number = cast(str(value).strip())
+        valid = number >= 0 and number != float('inf')  # Also false for a float NaN
+    except (ValueError, InvalidOperation):  # Comparing a Decimal NaN raises
+        raise RowError(f"{column} must be a number")
+    if not valid:
+        raise RowError(f"{column} must be a non-negative number")
+    return number
+
+
+def clean_row(row, image_exists=None):
+    """Validate one raw row; returns ``{column: value}`` for the columns it sets."""
+    missing = [column for column in REQUIRED if column not in row]
+    if missing:
+        raise RowError(f"Missing required column(s): {', '.join(missing)}")
+
+    cleaned = {}
+    if 'product_id' in row:
+        product_id = row['product_id']
+        if isinstance(product_id, str) and product_id.strip().isdigit():
+            product_id = int(product_id)
+        if isinstance(product_id, bool) or not isinstance(product_id, int) or product_id <= 0:
+            raise RowError("product_id must be a positive integer")
+        cleaned['product_id'] = product_id
+
+    name = str(row['name']).strip()
+    if not name:
+        raise RowError("name must not be empty")
+    cleaned['name'] = name
+    cleaned['price'] = _number(row['price'], 'price', Decimal)
+    if 'quantity' in row:
+        cleaned['quantity'] = _number(row['quantity'], 'quantity', float)
+
+    for column in ('description', 'category'):
+        if column in row:
+            cleaned[column] = str(row[column])
+
+    if 'status' in row:
+        if row['status'] not in PRODUCT_STATUSES:
+            raise RowError(f"status must be one of: {', '.join(PRODUCT_STATUSES)}")
+        cleaned['status'] = row['status']
+
+    if 'image_hash' in row:
+        digest = str(row['image_hash']).lower()
+        if not _DIGEST_RE.fullmatch(digest) or (image_exists is not None and not image_exists(digest)):
+            raise RowError("image_hash does not name a stored image")
+        cleaned['image_hash'] = digest
+
+    return cleaned
+
+
+def upsert_statement(columns):
+    """INSERT for a set of columns that updates the row when product_id exists."""
+    updates = ', '.join(f"{column} = VALUES({column})" for column in columns if column != 'product_id')
+    return (
+        f"INSERT INTO Products ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON DUPLICATE KEY UPDATE {updates}"
+    )
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def export_header(fmt):
+    if fmt != 'csv':
+        return ''
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(COLUMNS)
+    return buffer.getvalue()
+
+
+def encode_rows(rows, fmt):
+    """One chunk of export output for a batch of row tuples in COLUMNS order."""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    return ''.join(
+        json.dumps(dict(zip(COLUMNS, row)), default=_json_default) + '\n'
+        for row in rows
+    )
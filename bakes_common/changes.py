@@ -0,0 +1,129 @@
+"""Delta sync: the products and orders written since a client's last version.
+
+Migration 005 stamps every product and order write with a change_version
+taken from the change_log sequence. Deletes leave tombstones in
+change_log. A client syncs like this:
+
+1. ``GET /changes`` with no ``since`` returns the current ``version``
+2. it fetches the full list once (GET /products, GET /orders)
+3. it polls ``GET /changes?since=<version>`` and applies each page in
+   version order (deletions carry their version too), continuing while
+   ``has_more`` is true
+
+The version handed back never moves past changes younger than
+``CHANGES_SETTLE_SECONDS``. A transaction that took its version earlier
+but commits later is not skipped; the next poll sees it, and may send a
+recent row twice, which clients apply idempotently.
+"""
+import os
+from functools import lru_cache
+
+from bakes_common import repository
+
+SETTLE_SECONDS = float(os.environ.get('CHANGES_SETTLE_SECONDS', 2))
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+
+ORDER_CHANGE_COLUMNS = (
+    "order_id, user_id, order_status, payment_status, total_price, advance_payment, delivery_type, updated_at"
+)
+ORDER_CHANGE_NAMES = ['version'] + [column.strip() for column in ORDER_CHANGE_COLUMNS.split(',')]
+
+# Built once: a prepared cursor only skips re-preparing when it gets the same
+# string object back (see bakes_common.db.PreparedStatement)
+SETTLED_VERSION_SQL = ("SELECT version FROM change_log WHERE changed_at < NOW(3) - INTERVAL %s MICROSECOND "
+                       "ORDER BY version DESC LIMIT 1")
+TOMBSTONES_SQL = ("SELECT version, entity_id FROM change_log "
+                  "WHERE entity = %s AND deleted AND version > %s ORDER BY version LIMIT %s")
+
+
+def settled_version(connection, settle=SETTLE_SECONDS):
+    """Highest change version older than the settle window (0 before any change)."""
+    # Walks the primary key down from the newest change; only the last
+    # few seconds of writes are read
+    cursor = connection.prepared(SETTLED_VERSION_SQL)
+    cursor.execute(SETTLED_VERSION_SQL, (int(settle * 1_000_000),))
+    rows = cursor.fetchall()
+    return rows[0][0] if rows else 0
+
+
+@lru_cache(maxsize=None)
+def orders_changed_sql(for_user):
+    sql = f"SELECT change_version, {ORDER_CHANGE_COLUMNS} FROM orders WHERE change_version > %s"
+    if for_user:
+        sql += " AND user_id = %s"
+    return sql + " ORDER BY change_version LIMIT %s"
+
+
+def _orders_changed_since(connection, version, limit, user_id=None):
+    sql = orders_changed_sql(user_id is not None)
+    params = [version] if user_id is None else [version, user_id]
+    params.append(limit)
+    cursor = connection.prepared(sql)
+    cursor.execute(sql, params)
+    return [(row[0], dict(zip(ORDER_CHANGE_NAMES, row))) for row in cursor.fetchall()]
+
+
+def _tombstones_since(connection, entity, version, limit):
+    cursor = connection.prepared(TOMBSTONES_SQL)
+    cursor.execute(TOMBSTONES_SQL, (entity, version, limit))
+    return cursor.fetchall()
+
+
+def load_changes(connection, since, limit=PAGE_SIZE, orders=False, order_user_id=None, settle=SETTLE_SECONDS):
+    """One page of changes after ``since``.
+
+    ``orders`` adds order changes, limited to ``order_user_id``'s orders when
+    given (order tombstones are only included for the unrestricted feed).
+    ``settle=None`` reads through to the newest change without holding the
+    version back, for a reader that keeps its own resume point.
+    Returns a dict with the page's ``version`` (the next ``since``),
+    ``has_more``, ``products`` as ``(version, Product)`` pairs, ``orders`` as
+    dicts, and ``deleted`` ``(version, id)`` pairs per entity. A product can be
+    updated and deleted within one page, so apply them in version order.
+    """
+    changes = [('product', version, product)
+               for version, product in repository.products_changed_since(connection, since, limit + 1)]
+    changes += [('product_deleted', version, product_id)
+                for version, product_id in _tombstones_since(connection, 'product', since, limit + 1)]
+    if orders:
+        changes += [('order', version, order)
+                    for version, order in _orders_changed_since(connection, since, limit + 1, order_user_id)]
+        if order_user_id is None:
+            changes += [('order_deleted', version, order_id)
+                        for version, order_id in _tombstones_since(connection, 'order', since, limit + 1)]
+
+    # Each source was cut at limit + 1, so the first ``limit`` of the merge
+    # are exactly the next ``limit`` changes overall
+    changes.sort(key=lambda change: change[1])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    version = since
+    if changes:
+        version = changes[-1][1]
+        if settle is not None:
+            version = min(version, max(since, settled_version(connection, settle)))
+            # Held back by the settle window: the client waits for its next poll
+            has_more = has_more and version == changes[-1][1]
+
+    page = {'version': version, 'has_more': has_more, 'products': [], 'orders': [],
+            'deleted': {'products': [], 'orders': []}}
+    for kind, change_version, value in changes:
+        if kind == 'product':
+            page['products'].append((change_version, value))
+        elif kind == 'order':
+            page['orders'].append(value)
+        elif kind == 'product_deleted':
+            page['deleted']['products'].append((change_version, value))
+        else:
+            page['deleted']['orders'].append((change_version, value))
+    return page
+
+
+def deleted_for_json(deleted):
+    """``page['deleted']`` as ``{"version": ..., "product_id"/"order_id": ...}`` objects for GET /changes."""
+    return {
+        'products': [{'version': version, 'product_id': product_id} for version, product_id in deleted['products']],
+        'orders': [{'version': version, 'order_id': order_id} for version, order_id in deleted['orders']],
+    }
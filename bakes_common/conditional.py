@@ -0,0 +1,44 @@
+"""Conditional GET: validators from data versions, 304 before the query runs.
+
+A route works out its ETag from something cheap: the catalog version
+(zero queries), a customer's order-history version, or a row's updated_at
+fetched by primary key. It calls ``not_modified()`` before doing any real
+work and returns the 304 when there is one. Otherwise it builds the body
+as usual and passes the response through ``with_validators()``.
+
+ETags are weak. The same data is served gzip'd, brotli'd or plain, so the
+representations are equal in meaning but not byte-identical.
+``If-None-Match`` takes precedence over ``If-Modified-Since``, as
+RFC 9110 requires.
+"""
+from flask import Response, request
+
+# Clients keep the copy but revalidate before every use
+REVALIDATE = 'no-cache'
+PRIVATE_REVALIDATE = 'private, no-cache'
+
+
+def etag(*parts):
+    return '-'.join(str(part) for part in parts)
+
+
+def with_validators(response, tag, last_modified=None, cache_control=REVALIDATE):
+    response.set_etag(tag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def not_modified(tag, last_modified=None, cache_control=REVALIDATE):
+    """A 304 response when the client already holds this version, else None."""
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(tag)
+    elif last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have whole seconds
+        fresh = int(last_modified.timestamp()) <= int(request.if_modified_since.timestamp())
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return with_validators(Response(status=304), tag, last_modified, cache_control)
@@ -0,0 +1,51 @@
+"""Settings read from the environment, shared by both apps and the scripts.
+
+Each setting falls back to the old development default when the variable
+is unset, so ``python app.py`` on a laptop works without any of them.
+
+    DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME   MySQL connection
+    HOST, PORT, FLASK_DEBUG                           development server only
+    SECRET_KEY                                        signs storefront session tokens; required unless FLASK_DEBUG=1
+"""
+import os
+
+_FALSE = ('0', 'false', 'no', 'off', '')
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in _FALSE
+
+
+def db_config_from_env():
+    return {
+        'host': os.environ.get('DB_HOST', 'localhost'),
+        'port': int(os.environ.get('DB_PORT', 3306)),
+        'user': os.environ.get('DB_USER', 'root'),
+        'password': os.environ.get('DB_PASSWORD', 'Thrisha'),
+        'database': os.environ.get('DB_NAME', 'bakes_db'),
+    }
+
+
+def secret_key_from_env():
+    """``SECRET_KEY``; only a debug run may fall back to a fixed development key.
+
+    A known key would let anyone sign a session token for any user.
+    """
+    secret_key = os.environ.get('SECRET_KEY')
+    if secret_key:
+        return secret_key
+    if env_bool('FLASK_DEBUG'):
+        return 'dev-secret-change-me'
+    raise RuntimeError("SECRET_KEY is not set; set it (or FLASK_DEBUG=1 for local development)")
+
+
+def dev_server_options(default_port, default_host='127.0.0.1'):
+    """Keyword arguments for ``app.run()``. The debugger and reloader are off unless FLASK_DEBUG=1."""
+    return {
+        'host': os.environ.get('HOST', default_host),
+        'port': int(os.environ.get('PORT', default_port)),
+        'debug': env_bool('FLASK_DEBUG'),
+    }
@@ -0,0 +1,277 @@
+"""Bounded MySQL connection pool shared by both Flask apps.
+
+Connections are opened lazily, pinged on checkout (and reconnected if the
+server dropped them) and handed back to the pool when the route calls
+``connection.close()``, so existing route code keeps working unchanged.
+"""
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+
+
+# Server-side statements kept per connection (MySQL caps the total with
+# max_prepared_stmt_count); the repository only has a few dozen
+MAX_PREPARED_PER_CONNECTION = 64
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became free within the checkout timeout."""
+
+
+class TimedCursor:
+    """Cursor proxy reporting every execute to the pool's query observers.
+
+    Each observer is called as ``observer(statement, params, seconds, many)``.
+    """
+
+    def __init__(self, cursor, observers):
+        self._cursor = cursor
+        self._observers = observers
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _report(self, operation, params, started, many):
+        elapsed = time.perf_counter() - started
+        for observer in self._observers:
+            observer(operation, params, elapsed, many)
+
+    def execute(self, operation, params=(), *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            self._report(operation, params, started, False)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._report(operation, seq_params, started, True)
+
+
+class PreparedStatement:
+    """A prepared cursor bound to the statement text it was prepared with.
+
+    ``MySQLCursorPrepared.execute`` only reuses its server-side statement
+    when it is handed the very same string object again; an equal string
+    built anew closes the statement and prepares it once more. ``execute``
+    therefore always passes the text cached for this statement.
+    """
+
+    def __init__(self, cursor, sql):
+        self._cursor = cursor
+        self.sql = sql
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, operation, params=()):
+        if operation is not self.sql and operation != self.sql:
+            raise ValueError("A prepared statement can only run the SQL it was prepared with")
+        return self._cursor.execute(self.sql, params)
+
+
+class PooledConnection:
+    """Proxy around a real MySQL connection; ``close()`` returns it to the pool."""
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._connection.cursor(*args, **kwargs)
+        observers = self._pool.query_observers
+        return TimedCursor(cursor, observers) if observers else cursor
+
+    def prepared(self, sql):
+        """Cursor holding ``sql`` as a server-side prepared statement.
+
+        The statement is prepared the first time this physical connection
+        runs it and reused on every later checkout. Callers must fetch all
+        rows before the connection runs anything else.
+        """
+        statements = self._pool._statements_for(self._connection)
+        cursor = statements.get(sql)
+        if cursor is None:
+            if len(statements) >= MAX_PREPARED_PER_CONNECTION:
+                self._pool._forget_statements(self._connection)
+                statements = self._pool._statements_for(self._connection)
+            cursor = statements[sql] = PreparedStatement(self.cursor(prepared=True), sql)
+        return cursor
+
+    def close(self):
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        self._pool._release(connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, db_config, size=10, timeout=5.0, ping_interval=30.0):
+        self.db_config = dict(db_config)
+        self.size = size
+        self.timeout = timeout
+        # Connections idle for less than this are assumed healthy and not pinged
+        self.ping_interval = ping_interval
+        # Called after each cursor execute (see TimedCursor); registered by
+        # bakes_common.metrics and .profiling. Empty means cursors are not wrapped
+        self.query_observers = []
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (connection, last_used) pairs
+        # Prepared-statement cursors per physical connection; dropped
+        # whenever that connection is closed or reconnected
+        self._statements = {}
+        self._opened = 0
+        self._in_use = 0
+        self._waiting = 0
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._reconnects = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+    def get_connection(self, timeout=None):
+        """Check out a connection, waiting up to ``timeout`` seconds for one."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        with self._lock:
+            while not self._idle and self._opened >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No database connection available after {timeout:.1f}s")
+                self._waiting += 1
+                try:
+                    self._lock.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if self._idle:
+                connection, last_used = self._idle.pop()
+            else:
+                connection, last_used = None, None
+                self._opened += 1
+            self._in_use += 1
+
+        try:
+            if connection is None:
+                connection = mysql.connector.connect(**self.db_config)
+            elif time.monotonic() - last_used >= self.ping_interval:
+                self._check_health(connection)
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._checkouts += 1
+            self._checkout_time_total += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+        return PooledConnection(self, connection)
+
+    def _check_health(self, connection):
+        try:
+            connection.ping(reconnect=False)
+        except mysql.connector.Error:
+            # Stale connection (server restart, wait_timeout); reconnect in place.
+            # Its prepared statements died with the old session
+            self._forget_statements(connection)
+            connection.reconnect(attempts=2, delay=0)
+            with self._lock:
+                self._reconnects += 1
+
+    def _release(self, connection):
+        try:
+            # A streamed response abandoned by its client leaves rows unread;
+            # draining them could take minutes, so drop the connection instead
+            if connection.unread_result:
+                healthy = False
+            else:
+                # Never hand out a connection with an open transaction
+                if connection.in_transaction:
+                    connection.rollback()
+                healthy = True
+        except mysql.connector.Error:
+            healthy = False
+
+        with self._lock:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((connection, time.monotonic()))
+            else:
+                self._opened -= 1
+            self._lock.notify()
+
+        if not healthy:
+            self._forget_statements(connection)
+            try:
+                connection.close()
+            except mysql.connector.Error:
+                pass
+
+    def _statements_for(self, connection):
+        with self._lock:
+            return self._statements.setdefault(connection, {})
+
+    def _forget_statements(self, connection):
+        with self._lock:
+            statements = self._statements.pop(connection, None)
+        for cursor in (statements or {}).values():
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+
+    def close_all(self):
+        """Close every idle connection; checked-out ones close when released."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+            self._opened -= len(idle)
+        for connection, _ in idle:
+            self._forget_statements(connection)
+            try:
+                connection.close()
+            except mysql.connector.Error:
+                pass
+
+    def stats(self):
+        with self._lock:
+            checkouts = self._checkouts
+            return {
+                "size": self.size,
+                "opened": self._opened,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "reconnects": self._reconnects,
+                "checkout_ms_avg": round(self._checkout_time_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "checkout_ms_max": round(self._checkout_time_max * 1000, 3),
+            }
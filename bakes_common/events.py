@@ -0,0 +1,311 @@
+"""Order events for the admin live feed (GET /orders/events).
+
+Writers call ``publish()`` inside the transaction that changes the order.
+It adds a row to the ``order_events`` outbox (migration 006), so an event
+exists exactly when its change committed. New storefront orders reach the
+admin workers this way without a broker between the two apps.
+
+Each admin worker runs one ``OrderFeed``. Its thread polls the outbox
+every ``poll_interval`` seconds, or at once after ``wake()``, and fans the
+new events out to the worker's open streams. Open dashboards cost MySQL one
+primary-key range read per poll, however many there are.
+
+The feed keeps the last ``buffer_size`` events in memory. A client that
+reconnects with ``Last-Event-ID`` gets what it missed from that buffer, or
+from the outbox if it was away longer. If it missed more than
+``REPLAY_LIMIT`` events it gets a ``reset`` event instead and should
+reload the list. A subscriber that falls ``queue_size`` events behind is
+disconnected; its EventSource reconnects and resumes from its last id.
+
+AUTO_INCREMENT ids are taken at insert but become visible at commit, so a
+poll can see id 12 before id 11. The feed waits up to ``gap_wait``
+seconds for a missing id before moving past it (a rolled-back insert
+leaves a hole for good). Events therefore go out in id order, and a
+resumed stream does not skip one.
+"""
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+from bakes_common import jsonio
+
+ORDER_CREATED = 'order-created'
+ORDER_STATUS_CHANGED = 'order-status-changed'
+ORDER_PAYMENT_CHANGED = 'order-payment-changed'
+RESET = 'reset'  # The client missed too much and should reload
+
+POLL_BATCH = 500
+REPLAY_LIMIT = 1000
+PRUNE_INTERVAL = 600  # seconds
+PRUNE_BATCH = 1000
+
+INSERT_SQL = "INSERT INTO order_events (type, order_id, data) VALUES (%s, %s, %s)"
+SELECT_SQL = "SELECT id, type, order_id, data FROM order_events WHERE id > %s AND id <= %s ORDER BY id LIMIT %s"
+
+log = logging.getLogger(__name__)
+
+# ``data`` is the JSON payload as text, ready for the data: line
+Event = namedtuple('Event', 'id type order_id data')
+
+
+class FeedUnavailable(Exception):
+    pass
+
+
+def publish(connection, event_type, order_id, data):
+    """Record an event in the caller's transaction; it goes out once that commits."""
+    publish_many(connection, [(event_type, order_id, data)])
+
+
+def publish_many(connection, events):
+    """Record ``(type, order_id, data)`` events in one multi-row INSERT."""
+    if not events:
+        return
+    cursor = connection.cursor()
+    cursor.executemany(
+        INSERT_SQL,
+        [(event_type, order_id, jsonio.dumps(dict(data, order_id=order_id))) for event_type, order_id, data in events]
+    )
+    cursor.close()
+
+
+def format_sse(event):
+    # Encoded JSON has no raw newlines, so the payload fits one data: line
+    return f"id: {event.id}\nevent: {event.type}\ndata: {event.data}\n\n"
+
+
+def read_events(connection, after, up_to, limit):
+    """Outbox events with ``after < id <= up_to``, oldest first."""
+    cursor = connection.prepared(SELECT_SQL)
+    cursor.execute(SELECT_SQL, (after, up_to, limit))
+    return [
+        Event(event_id, event_type, order_id, data.decode('utf-8') if isinstance(data, (bytes, bytearray)) else data)
+        for event_id, event_type, order_id, data in cursor.fetchall()
+    ]
+
+
+class Subscription:
+    """One open stream: events queued by the feed, drained by ``get()``."""
+
+    def __init__(self, limit):
+        self._limit = limit
+        self._events = deque()
+        self._ready = threading.Condition()
+        self._queued_up_to = 0
+        self.closed = False
+
+    def _replay(self, events, up_to):
+        with self._ready:
+            self._events.extend(events)
+            self._queued_up_to = up_to
+            self._ready.notify_all()
+
+    def _offer(self, events):
+        """Queue live events; False (and closed) once the subscriber is too far behind."""
+        with self._ready:
+            if self.closed:
+                return True
+            fresh = [event for event in events if event.id > self._queued_up_to]
+            if not fresh:
+                return True
+            if len(self._events) + len(fresh) > self._limit:
+                self.closed = True
+                self._ready.notify_all()
+                return False
+            self._events.extend(fresh)
+            self._queued_up_to = fresh[-1].id
+            self._ready.notify_all()
+            return True
+
+    def get(self, timeout):
+        """Queued events, ``[]`` after ``timeout`` seconds without any, or None once closed."""
+        with self._ready:
+            if not self._events and not self.closed:
+                self._ready.wait(timeout)
+            if self._events:
+                events = list(self._events)
+                self._events.clear()
+                return events
+            return None if self.closed else []
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+
+
+class OrderFeed:
+    """Background thread tailing ``order_events`` for this worker's streams."""
+
+    def __init__(self, pool, poll_interval=1.0, idle_interval=5.0, buffer_size=2000, queue_size=500,
+                 max_subscribers=8, gap_wait=2.0, retention=86400):
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.idle_interval = idle_interval  # No streams open: only keep the buffer warm
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.gap_wait = gap_wait
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=buffer_size)
+        self._last_id = None  # Highest id handed out; None until the first poll
+        self._floor = None    # The buffer holds every event in (floor, last_id]
+        self._gap_since = None
+        self._subscribers = set()
+        self._next_prune = 0.0
+        self._dropped = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='order-feed', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(self.idle_interval + 1)
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, set()
+        for subscription in subscribers:
+            subscription.close()
+
+    def wake(self):
+        """Poll now rather than at the next interval (call after committing an event)."""
+        self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "last_event_id": self._last_id,
+                "buffered": len(self._buffer),
+                "dropped": self._dropped,
+            }
+
+    def subscribe(self, last_event_id=None):
+        """A subscription starting after ``last_event_id`` (or now), with the missed events queued."""
+        replayed = []
+        start = last_event_id
+        while True:
+            with self._lock:
+                if self._last_id is None or self._stop.is_set():
+                    raise FeedUnavailable("Live order feed is not ready")
+                if len(self._subscribers) >= self.max_subscribers:
+                    raise FeedUnavailable("Too many live order streams")
+                if start is None:
+                    start = self._last_id
+                if start >= self._floor:
+                    subscription = Subscription(self.queue_size)
+                    subscription._replay(replayed + [event for event in self._buffer if event.id > start],
+                                         max(start, self._last_id))
+                    self._subscribers.add(subscription)
+                    return subscription
+                floor = self._floor
+
+            # Away longer than the buffer reaches back: read the rest from
+            # the outbox, then check the buffer again
+            connection = self.pool.get_connection()
+            try:
+                missed = read_events(connection, start, floor, REPLAY_LIMIT + 1 - len(replayed))
+            finally:
+                connection.close()
+            if len(replayed) + len(missed) > REPLAY_LIMIT:
+                return self._subscribe_reset()
+            replayed += missed
+            start = floor
+
+    def _subscribe_reset(self):
+        with self._lock:
+            if self._stop.is_set() or len(self._subscribers) >= self.max_subscribers:
+                raise FeedUnavailable("Too many live order streams")
+            subscription = Subscription(self.queue_size)
+            subscription._replay([Event(self._last_id, RESET, None, '{}')], self._last_id)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+        subscription.close()
+
+    def poll(self):
+        """Hand new outbox events to the subscribers; returns how many went out."""
+        connection = self.pool.get_connection()
+        try:
+            if self._last_id is None:
+                cursor = connection.cursor()
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM order_events")
+                (last_id,) = cursor.fetchone()
+                cursor.close()
+                with self._lock:
+                    self._last_id = self._floor = last_id
+                return 0
+            events = read_events(connection, self._last_id, 2 ** 63 - 1, POLL_BATCH)
+            if time.monotonic() >= self._next_prune:
+                self._prune(connection)
+        finally:
+            connection.close()
+
+        events = self._in_order(events)
+        if not events:
+            return 0
+        with self._lock:
+            for event in events:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self._floor = self._buffer[0].id
+                self._buffer.append(event)
+            self._last_id = events[-1].id
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            if not subscription._offer(events):
+                with self._lock:
+                    self._subscribers.discard(subscription)
+                    self._dropped += 1
+                log.warning("Dropped a live order stream that fell behind")
+        return len(events)
+
+    def _in_order(self, events):
+        """The events that can go out now: those before the first id gap still within ``gap_wait``."""
+        ready, expected = [], self._last_id + 1
+        for event in events:
+            if event.id != expected:
+                now = time.monotonic()
+                if self._gap_since is None:
+                    self._gap_since = now
+                if now - self._gap_since < self.gap_wait:
+                    break
+            self._gap_since = None
+            ready.append(event)
+            expected = event.id + 1
+        return ready
+
+    def _prune(self, connection):
+        self._next_prune = time.monotonic() + PRUNE_INTERVAL
+        cursor = connection.cursor()
+        try:
+            while True:
+                cursor.execute(
+                    "DELETE FROM order_events WHERE created_at < NOW(3) - INTERVAL %s SECOND LIMIT %s",
+                    (int(self.retention), PRUNE_BATCH)
+                )
+                connection.commit()
+                if cursor.rowcount < PRUNE_BATCH:
+                    break
+        finally:
+            cursor.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception:  # Keep polling; the next run retries
+                log.exception("Order feed poll failed")
+            busy = self._subscribers or self._gap_since is not None
+            self._wake.wait(self.poll_interval if busy else self.idle_interval)
@@ -0,0 +1,146 @@
+"""Helpers for storing and serving product images as plain HTTP resources.
+
+Uploads go into a content-addressed store on disk instead of the
+``Products`` table: each image lives under the SHA-256 of its bytes, so the
+same photo uploaded twice is stored once, and its URLs never change and can
+be cached forever. Resized variants are generated in the background.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import send_file
+
+# Magic-number prefixes for the upload types the admin app accepts
+_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+CHUNK_SIZE = 64 * 1024
+
+# Longest edge in pixels for each generated variant; 'original' is the upload
+VARIANTS = {
+    'thumb': 160,
+    'card': 480,
+    'full': 1200,
+}
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_DIGEST_RE = re.compile(r'[0-9a-f]{64}')
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def sniff_content_type(data, default='application/octet-stream'):
+    for signature, content_type in _SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    return default
+
+
+def iter_chunks(data, chunk_size=CHUNK_SIZE):
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
+
+
+class ImageStore:
+    def __init__(self, root, workers=2):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variants')
+
+    def _dir(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def path(self, digest, variant='original'):
+        """Path of a stored variant, falling back to the original until it exists."""
+        directory = self._dir(digest)
+        if variant != 'original':
+            candidate = os.path.join(directory, f'{variant}.jpg')
+            if os.path.exists(candidate):
+                return candidate
+        return os.path.join(directory, 'original')
+
+    def exists(self, digest):
+        return os.path.exists(os.path.join(self._dir(digest), 'original'))
+
+    def save(self, stream, max_size=None):
+        """Copy an upload stream into the store chunk by chunk; returns its digest."""
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise ImageTooLarge("File size too large")
+                    hasher.update(chunk)
+                    tmp.write(chunk)
+
+            digest = hasher.hexdigest()
+            if self.exists(digest):
+                os.unlink(tmp_path)  # Same bytes already stored
+            else:
+                os.makedirs(self._dir(digest), exist_ok=True)
+                os.replace(tmp_path, os.path.join(self._dir(digest), 'original'))
+                self._executor.submit(self.generate_variants, digest)
+            return digest
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def generate_variants(self, digest):
+        try:
+            from PIL import Image
+        except ImportError:
+            return  # Without Pillow every variant is served from the original
+
+        with Image.open(os.path.join(self._dir(digest), 'original')) as original:
+            image = original.convert('RGB')
+        for variant, edge in VARIANTS.items():
+            target = os.path.join(self._dir(digest), f'{variant}.jpg')
+            if os.path.exists(target):
+                continue
+            resized = image.copy()
+            resized.thumbnail((edge, edge))
+            # Write then rename so readers never see a half-written file
+            tmp_path = f'{target}.tmp'
+            resized.save(tmp_path, 'JPEG', quality=85, optimize=True, progressive=True)
+            os.replace(tmp_path, target)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def send_stored_image(store, digest, variant):
+    """Response for /images/<digest>/<variant>; stored bytes never change."""
+    if variant != 'original' and variant not in VARIANTS:
+        return None
+    if not _DIGEST_RE.fullmatch(digest) or not store.exists(digest):
+        return None
+
+    path = store.path(digest, variant)
+    with open(path, 'rb') as f:
+        mimetype = sniff_content_type(f.read(16))
+    response = send_file(path, mimetype=mimetype, etag=f'{digest}-{os.path.basename(path)}', conditional=True)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def default_store_root():
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    return os.environ.get('IMAGE_STORE_DIR', os.path.join(repo_root, 'media', 'products'))
@@ -0,0 +1,362 @@
+"""Checkout reservations and slotted stock counters for hot products.
+
+Normally an order decrements its product's row in ``products``. When a
+festival special gets hundreds of orders at once, every order queues for the
+lock on that one row. An admin can mark such a product *hot*. Its sellable
+stock then moves into N rows of ``inventory_slots``. Each order takes stock
+from a randomly chosen slot, so concurrent orders mostly lock different rows.
+``products.quantity`` always means "stock still available"; for hot products
+it is refreshed from the sum of the slots by ``reconcile()``.
+
+A reservation takes stock out of the counters when checkout starts and holds
+it for a short TTL. ``place_order()`` confirms it inside the order
+transaction. Reservations that are never confirmed are returned to stock by
+``release_expired()``, which the sweeper thread calls periodically.
+
+Every function here takes a connection and runs inside the caller's
+transaction, except ``reserve()`` and the sweeper, which own theirs.
+"""
+import logging
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+DEFAULT_SLOTS = 8
+DEFAULT_TTL = 600  # seconds
+
+log = logging.getLogger(__name__)
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id):
+        super().__init__(f"Insufficient stock for product ID {product_id}")
+        self.product_id = product_id
+
+
+class ReservationExpired(Exception):
+    def __init__(self, reservation_id):
+        super().__init__(f"Reservation {reservation_id} has expired or was already used")
+        self.reservation_id = reservation_id
+
+
+class InvalidCart(ValueError):
+    """A malformed cart line; routes answer 400."""
+
+
+def _positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def cart_quantities(items):
+    """``{product_id: quantity}`` summed over cart lines (a product may be on several)."""
+    if not isinstance(items, list) or not items:
+        raise InvalidCart("Order must contain at least one item")
+    quantities = {}
+    for item in items:
+        if not isinstance(item, dict) or 'product_id' not in item or 'quantity' not in item:
+            raise InvalidCart("Each item needs a product_id and a quantity")
+        product_id, quantity = item['product_id'], item['quantity']
+        if not _positive_int(product_id):
+            raise InvalidCart("product_id must be a positive integer")
+        if not _positive_int(quantity):
+            raise InvalidCart(f"Quantity for product ID {product_id} must be a positive integer")
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def hot_slot_counts(connection, product_ids):
+    """{product_id: number of slots} for the hot products among ``product_ids``."""
+    if not product_ids:
+        return {}
+    cursor = connection.cursor()
+    cursor.execute(
+        f"SELECT product_id, COUNT(*) FROM inventory_slots WHERE product_id IN ({_placeholders(product_ids)}) "
+        f"GROUP BY product_id",
+        list(product_ids)
+    )
+    counts = dict(cursor.fetchall())
+    cursor.close()
+    return counts
+
+
+def take_from_slots(connection, product_id, quantity, slots):
+    """Decrement a hot product's counters; returns ``[(slot, quantity), ...]``."""
+    cursor = connection.cursor()
+    try:
+        # Fast path: one conditional decrement on a random slot, so concurrent
+        # buyers spread over different rows
+        order = list(range(slots))
+        random.shuffle(order)
+        for slot in order:
+            cursor.execute(
+                "UPDATE inventory_slots SET quantity = quantity - %s "
+                "WHERE product_id = %s AND slot = %s AND quantity >= %s",
+                (quantity, product_id, slot, quantity)
+            )
+            if cursor.rowcount == 1:
+                return [(slot, quantity)]
+
+        # No single slot holds enough: lock them all and take greedily
+        cursor.execute(
+            "SELECT slot, quantity FROM inventory_slots WHERE product_id = %s ORDER BY slot FOR UPDATE",
+            (product_id,)
+        )
+        rows = cursor.fetchall()
+        if sum(available for _, available in rows) < quantity:
+            raise InsufficientStock(product_id)
+
+        taken, remaining = [], quantity
+        for slot, available in rows:
+            if remaining == 0:
+                break
+            amount = min(available, remaining)
+            if amount > 0:
+                taken.append((slot, amount))
+                remaining -= amount
+        cursor.executemany(
+            "UPDATE inventory_slots SET quantity = quantity - %s WHERE product_id = %s AND slot = %s",
+            [(amount, product_id, slot) for slot, amount in taken]
+        )
+        return taken
+    finally:
+        cursor.close()
+
+
+def take_from_product(connection, product_id, quantity):
+    """Conditional decrement of a regular (not hot) product row."""
+    cursor = connection.cursor()
+    cursor.execute(
+        """UPDATE products
+           SET quantity = quantity - %s,
+               status = IF(quantity <= 0, 'out_of_stock', status)
+           WHERE product_id = %s AND quantity >= %s""",
+        (quantity, product_id, quantity)
+    )
+    updated = cursor.rowcount
+    cursor.close()
+    if updated != 1:
+        raise InsufficientStock(product_id)
+
+
+def give_back(connection, product_id, slot, quantity):
+    cursor = connection.cursor()
+    if slot is not None:
+        cursor.execute(
+            "UPDATE inventory_slots SET quantity = quantity + %s WHERE product_id = %s AND slot = %s",
+            (quantity, product_id, slot)
+        )
+    # The product row owns the stock if it never was hot or is no longer hot
+    if slot is None or cursor.rowcount == 0:
+        cursor.execute(
+            "UPDATE products SET quantity = quantity + %s, status = 'in_stock' WHERE product_id = %s",
+            (quantity, product_id)
+        )
+    cursor.close()
+
+
+def reserve(pool, quantities, ttl=DEFAULT_TTL):
+    """Hold stock for ``{product_id: quantity}``; returns ``(reservation_id, expires_at)``.
+
+    Raises InsufficientStock (nothing is held in that case).
+    """
+    reservation_id = uuid.uuid4().hex
+    expires_at = datetime.now() + timedelta(seconds=ttl)
+    product_ids = sorted(quantities)
+
+    connection = pool.get_connection()
+    try:
+        slot_counts = hot_slot_counts(connection, product_ids)
+        rows = []
+        for product_id in product_ids:
+            quantity = quantities[product_id]
+            if product_id in slot_counts:
+                for slot, amount in take_from_slots(connection, product_id, quantity, slot_counts[product_id]):
+                    rows.append((reservation_id, product_id, slot, amount, expires_at))
+            else:
+                take_from_product(connection, product_id, quantity)
+                rows.append((reservation_id, product_id, None, quantity, expires_at))
+
+        cursor = connection.cursor()
+        cursor.executemany(
+            "INSERT INTO inventory_reservations (reservation_id, product_id, slot, quantity, expires_at) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            rows
+        )
+        cursor.close()
+        connection.commit()
+        return reservation_id, expires_at
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def confirm(connection, reservation_id, order_id, quantities):
+    """Attach a held reservation to ``order_id`` inside the order transaction.
+
+    Returns ``{product_id: quantity}`` already covered by the reservation;
+    the caller takes only the rest from stock. Held stock beyond what the
+    order needs goes back to stock.
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT id, product_id, slot, quantity FROM inventory_reservations "
+        "WHERE reservation_id = %s AND status = 'held' AND expires_at > NOW() FOR UPDATE",
+        (reservation_id,)
+    )
+    rows = cursor.fetchall()
+    if not rows:
+        cursor.close()
+        raise ReservationExpired(reservation_id)
+
+    covered = {}
+    for _, product_id, slot, quantity in rows:
+        needed = quantities.get(product_id, 0) - covered.get(product_id, 0)
+        used = max(0, min(quantity, needed))
+        if used:
+            covered[product_id] = covered.get(product_id, 0) + used
+        if quantity > used:
+            give_back(connection, product_id, slot, quantity - used)
+
+    cursor.execute(
+        "UPDATE inventory_reservations SET status = 'confirmed', order_id = %s WHERE reservation_id = %s",
+        (order_id, reservation_id)
+    )
+    cursor.close()
+    return covered
+
+
+def _release(connection, condition, params):
+    cursor = connection.cursor()
+    cursor.execute(
+        f"SELECT id, product_id, slot, quantity FROM inventory_reservations "
+        f"WHERE status = 'held' AND {condition} FOR UPDATE SKIP LOCKED",
+        params
+    )
+    rows = cursor.fetchall()
+    for _, product_id, slot, quantity in rows:
+        give_back(connection, product_id, slot, quantity)
+    if rows:
+        ids = [row[0] for row in rows]
+        cursor.execute(
+            f"UPDATE inventory_reservations SET status = 'released' WHERE id IN ({_placeholders(ids)})",
+            ids
+        )
+    cursor.close()
+    return {row[1] for row in rows}
+
+
+def release(connection, reservation_id):
+    """Cancel a held reservation; returns the product ids whose stock changed."""
+    return _release(connection, "reservation_id = %s", (reservation_id,))
+
+
+def release_expired(connection):
+    return _release(connection, "expires_at <= NOW()", ())
+
+
+def set_hot_stock(connection, product_id, quantity, slots):
+    """Spread ``quantity`` units of a hot product evenly over ``slots`` counters."""
+    base, extra = divmod(int(quantity), slots)
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM inventory_slots WHERE product_id = %s", (product_id,))
+    cursor.executemany(
+        "INSERT INTO inventory_slots (product_id, slot, quantity) VALUES (%s, %s, %s)",
+        [(product_id, slot, base + (1 if slot < extra else 0)) for slot in range(slots)]
+    )
+    cursor.close()
+
+
+def enable_hot(connection, product_id, slots=DEFAULT_SLOTS):
+    """Move a product's available stock into slotted counters."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT quantity FROM products WHERE product_id = %s FOR UPDATE", (product_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None:
+        return False
+    set_hot_stock(connection, product_id, row[0], slots)
+    return True
+
+
+def disable_hot(connection, product_id):
+    """Fold the counters back into ``products.quantity``."""
+    reconcile(connection, [product_id])
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM inventory_slots WHERE product_id = %s", (product_id,))
+    removed = cursor.rowcount
+    cursor.close()
+    return removed > 0
+
+
+def reconcile(connection, product_ids=None):
+    """Write the slot totals of hot products back to ``products``."""
+    query = """
+        UPDATE products p
+        JOIN (
+            SELECT product_id, SUM(quantity) AS available
+            FROM inventory_slots
+            {where}
+            GROUP BY product_id
+        ) s ON s.product_id = p.product_id
+        SET p.quantity = s.available,
+            p.status = IF(s.available > 0, 'in_stock', 'out_of_stock')
+    """
+    params = []
+    where = ''
+    if product_ids:
+        where = f"WHERE product_id IN ({_placeholders(product_ids)})"
+        params = list(product_ids)
+    cursor = connection.cursor()
+    cursor.execute(query.format(where=where), params)
+    changed = cursor.rowcount
+    cursor.close()
+    return changed
+
+
+class InventorySweeper:
+    """Background thread releasing expired reservations and reconciling counters."""
+
+    def __init__(self, pool, interval=5.0, on_change=None):
+        self.pool = pool
+        self.interval = interval
+        self.on_change = on_change
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='inventory-sweeper', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+
+    def sweep(self):
+        connection = self.pool.get_connection()
+        try:
+            released = release_expired(connection)
+            changed = reconcile(connection)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        if (released or changed) and self.on_change is not None:
+            self.on_change()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:  # Keep sweeping; the next run retries
+                log.exception("Inventory sweep failed")
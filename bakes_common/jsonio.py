@@ -0,0 +1,55 @@
+"""JSON encoding for responses and streamed bodies.
+
+orjson is used when it is installed; it is several times faster than the
+json module and serializes datetimes itself. Decimals (every price and
+total from MySQL) go through ``default``. The fallback encoder produces the
+same output, so a route never has to convert its rows first:
+
+* ``Decimal`` becomes a JSON number
+* ``datetime`` / ``date`` become ISO 8601 strings (``2024-05-01T14:30:00``)
+* ``bytes`` (JSON columns from MySQL) are decoded as UTF-8 text
+
+``JSON_BACKEND=std`` forces the json module, to compare the two.
+"""
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # Optional: pip install orjson
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None and os.environ.get('JSON_BACKEND', 'orjson') != 'std' else 'std'
+
+
+def default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if BACKEND == 'orjson':
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj):
+        return orjson.dumps(obj, default=default, option=_OPTIONS)
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=default, option=_OPTIONS).decode('utf-8')
+
+    loads = orjson.loads
+else:
+    def dumps(obj):
+        # Compact, non-ASCII kept as-is: the same bytes orjson writes
+        return json.dumps(obj, default=default, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps_bytes(obj):
+        return dumps(obj).encode('utf-8')
+
+    loads = json.loads
@@ -0,0 +1,95 @@
+"""Graceful shutdown for both apps.
+
+Under gunicorn a stopping worker first stops accepting connections and
+waits ``graceful_timeout`` for its requests to finish. The ``worker_exit``
+hook in gunicorn.conf.py then calls ``Lifecycle.shutdown()``. The
+development server calls it at interpreter exit.
+
+``shutdown()`` marks the app as draining, so ``GET /health/ready`` answers
+503 and a load balancer stops sending traffic. It then waits for requests
+still in flight (including streamed exports) and runs the registered
+closers in reverse order: background threads stop first and the
+connection pool closes last.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from flask import g, jsonify
+
+log = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    def __init__(self, drain_timeout=5.0):
+        self.drain_timeout = drain_timeout
+        self._lock = threading.Condition()
+        self._in_flight = 0
+        self._draining = False
+        self._closed = False
+        self._closers = []  # (name, callback) in registration order
+
+    @property
+    def draining(self):
+        return self._draining
+
+    def on_shutdown(self, name, callback):
+        self._closers.append((name, callback))
+
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._lock.notify_all()
+
+    def shutdown(self, timeout=None):
+        """Drain in-flight requests, then close everything; safe to call more than once."""
+        timeout = self.drain_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = self._draining = True
+            while self._in_flight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    log.warning("Shutting down with requests still in flight", extra={'in_flight': self._in_flight})
+                    break
+                self._lock.wait(remaining)
+
+        for name, callback in reversed(self._closers):
+            try:
+                callback()
+            except Exception:  # One failing closer must not keep the pool open
+                log.exception("Shutdown step failed", extra={'step': name})
+        log.info("Shutdown complete")
+
+
+def install_lifecycle(app, drain_timeout=5.0):
+    """Track in-flight requests on ``app``, add ``GET /health/ready``, and shut down at exit."""
+    lifecycle = Lifecycle(drain_timeout)
+    app.extensions['lifecycle'] = lifecycle
+
+    @app.before_request
+    def track_request():
+        lifecycle.request_started()
+        g.lifecycle_tracked = True
+
+    # Runs once the response is done, so a streamed body counts until its last chunk
+    @app.teardown_request
+    def untrack_request(exc):
+        if g.pop('lifecycle_tracked', False):
+            lifecycle.request_finished()
+
+    @app.route('/health/ready', methods=['GET'])
+    def readiness():
+        if lifecycle.draining:
+            return jsonify({"status": "draining"}), 503
+        return jsonify({"status": "ok"})
+
+    atexit.register(lifecycle.shutdown)
+    return lifecycle
@@ -0,0 +1,183 @@
+"""Structured, sampled, non-blocking logging for both apps.
+
+``configure_logging(app)`` puts a QueueHandler on the root logger. Request
+threads only enqueue records; a single listener thread formats them as
+JSON lines and writes them to stderr. Each record carries the request ID,
+taken from an incoming ``X-Request-ID`` header or generated, and echoed
+back on the response. Credential fields in any structured field are
+redacted before the record leaves the request thread.
+
+Debug detail (SQL, request bodies) is expensive and noisy, so it is
+sampled per request. With ``LOG_SAMPLE_RATE=0.01``, one request in a
+hundred logs all of its debug records and the rest log none.
+
+Environment:
+    LOG_LEVEL        level for everything that is not sampled (default INFO)
+    LOG_SAMPLE_RATE  share of requests whose DEBUG records are kept (default 0)
+    LOG_FORMAT       json (default) or text
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+
+from flask import g, has_request_context, request
+
+REDACTED = '[redacted]'
+REDACT_KEYS = re.compile(r'pass(word)?|secret|token|authorization|cookie|api[_-]?key', re.IGNORECASE)
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID_RE = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+# LogRecord attributes that are not structured fields passed with extra=
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_traceback_formatter = logging.Formatter()
+
+
+def redact(value):
+    """Copy of ``value`` with credential-looking keys masked, at any depth."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if isinstance(key, str) and REDACT_KEYS.search(key) else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class ContextFilter(logging.Filter):
+    """Runs in the request thread: adds the request ID, samples DEBUG, redacts."""
+
+    def __init__(self, level, sample_rate):
+        super().__init__()
+        self.level = level
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        in_request = has_request_context()
+        if record.levelno < self.level:
+            sampled = g.get('log_sampled', False) if in_request else random.random() < self.sample_rate
+            if not sampled:
+                return False
+
+        record.request_id = g.get('request_id') if in_request else None
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS:
+                setattr(record, key, REDACTED if REDACT_KEYS.search(key) else redact(value))
+        return True
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Keeps the traceback apart from the message when a record is queued.
+
+    The stock ``prepare()`` formats the record and folds the traceback into
+    ``msg``, so the listener could no longer write it as its own ``exc``
+    field. Here only the message arguments are merged; the traceback travels
+    as ``exc_text``, without the frames ``exc_info`` would keep alive.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; runs in the listener thread."""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+def _new_request_id():
+    incoming = request.headers.get(REQUEST_ID_HEADER, '')
+    return incoming if _REQUEST_ID_RE.fullmatch(incoming) else uuid.uuid4().hex
+
+
+def configure_logging(app):
+    """Install the queue handler once per process and hook request IDs into ``app``."""
+    global _listener
+
+    level = logging.getLevelName(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+    sample_rate = float(os.environ.get('LOG_SAMPLE_RATE', 0))
+
+    if _listener is None:
+        output = logging.StreamHandler(sys.stderr)
+        if os.environ.get('LOG_FORMAT', 'json') == 'json':
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'))
+
+        # Unbounded, so a slow stderr never stalls a request thread
+        records = queue.SimpleQueue()
+        handler = StructuredQueueHandler(records)
+        handler.addFilter(ContextFilter(level, sample_rate))
+
+        root = logging.getLogger()
+        root.handlers[:] = [handler]
+        # Records below LOG_LEVEL must still be created for sampled requests
+        root.setLevel(logging.DEBUG if sample_rate > 0 else level)
+
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    # The app's own logger propagates to the root handler above
+    app.logger.handlers.clear()
+    app.logger.setLevel(logging.NOTSET)
+
+    access_log = logging.getLogger('bakes.access')
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = _new_request_id()
+        g.log_sampled = sample_rate > 0 and random.random() < sample_rate
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        response.headers[REQUEST_ID_HEADER] = g.get('request_id', '')
+        access_log.info(
+            "%s %s %s", request.method, request.path, response.status_code,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.get('request_started', time.perf_counter())) * 1000, 2),
+            },
+        )
+        return response
@@ -0,0 +1,154 @@
+"""Request and database metrics in Prometheus text format.
+
+``instrument_app(app, name, pool)`` records the following:
+- a latency histogram per route, method and status
+- a histogram of database queries per request, by route, so an N+1
+  loop shows up as a route whose query count grows with the order size
+- a latency histogram per SQL verb, fed by the pool's cursors
+All of this is served from ``GET /metrics``. Each response also gets a
+``Server-Timing`` header with its database time and query count.
+
+Recording is a dict lookup and a few additions under one lock. Set
+``METRICS_ENABLED=0`` to skip all of it: no hooks, no cursor wrapping, and
+no /metrics route.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_enabled():
+    return os.environ.get('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1  # index == len(buckets) is the +Inf bucket
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_values, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, label_values, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, label_values)} {series[-2]}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, label_values)} {series[-1]}')
+        return lines
+
+
+class Metrics:
+    def __init__(self, app_name, pool=None, slow_request_queries=50):
+        self.app_name = app_name
+        self.pool = pool
+        # Requests issuing more queries than this are logged as likely N+1s
+        self.slow_request_queries = slow_request_queries
+        self.request_latency = Histogram(
+            'http_request_duration_seconds', 'Request latency by route, method and status.',
+            ('app', 'route', 'method', 'status'), LATENCY_BUCKETS)
+        self.request_queries = Histogram(
+            'http_request_db_queries', 'Database queries issued per request, by route.',
+            ('app', 'route'), QUERY_COUNT_BUCKETS)
+        self.query_latency = Histogram(
+            'db_query_duration_seconds', 'Time spent in cursor.execute/executemany, by SQL verb.',
+            ('app', 'verb'), LATENCY_BUCKETS)
+
+    def observe_query(self, statement, params, seconds, many):
+        """Pool hook, called after every execute/executemany."""
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement and statement.strip() else 'UNKNOWN'
+        self.query_latency.observe(seconds, self.app_name, verb)
+        if has_request_context():
+            g.db_queries = g.get('db_queries', 0) + 1
+            g.db_seconds = g.get('db_seconds', 0.0) + seconds
+
+    def render(self):
+        lines = []
+        for histogram in (self.request_latency, self.request_queries, self.query_latency):
+            lines.extend(histogram.render())
+        if self.pool is not None:
+            for key, value in self.pool.stats().items():
+                name = f'db_pool_{key}'
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name}{_labels(("app",), (self.app_name,))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def instrument_app(app, name, pool=None):
+    """Hook request/DB timing into ``app`` and add ``GET /metrics``; returns the Metrics or None."""
+    if not metrics_enabled():
+        return None
+
+    metrics = Metrics(name, pool, slow_request_queries=int(os.environ.get('METRICS_SLOW_REQUEST_QUERIES', 50)))
+    app.extensions['metrics'] = metrics
+    if pool is not None:
+        pool.query_observers.append(metrics.observe_query)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        # For streamed responses this is the time until the headers go out
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        queries = g.get('db_queries', 0)
+
+        metrics.request_latency.observe(elapsed, name, route, request.method, str(response.status_code))
+        metrics.request_queries.observe(queries, name, route)
+        response.headers.add(
+            'Server-Timing', f'db;dur={g.get("db_seconds", 0.0) * 1000:.1f};desc="{queries} queries"')
+        if queries > metrics.slow_request_queries:
+            log.warning("Request issued many queries", extra={'route': route, 'queries': queries})
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+    return metrics
@@ -0,0 +1,121 @@
+"""Keyset pagination, field projection and filter parsing for list endpoints.
+
+List endpoints keep returning a plain JSON array. When a page is cut short,
+the cursor for the next page is sent in the ``X-Next-Cursor`` header, along
+with a ``Link: <...>; rel="next"`` URL. The cursor is opaque to clients: it is
+base64url-encoded JSON holding the sort key of the last row, and the next
+page is fetched with ``WHERE key > cursor`` instead of ``OFFSET``. That way
+the cost of page 1000 is the same as the cost of page 1.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from flask import request
+
+MAX_LIMIT = 500
+
+PAGINATION_HEADERS = ['X-Next-Cursor', 'Link']
+
+
+class PaginationError(ValueError):
+    """Invalid limit/after/fields/filter parameter; routes answer 400."""
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise PaginationError("Invalid cursor")
+    if not isinstance(values, dict):
+        raise PaginationError("Invalid cursor")
+    return values
+
+
+def parse_page(args, default_limit=None, max_limit=MAX_LIMIT):
+    """Return ``(limit, cursor)``; limit is None when the client did not page."""
+    limit = args.get('limit', default_limit)
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise PaginationError("limit must be an integer")
+        if not 1 <= limit <= max_limit:
+            raise PaginationError(f"limit must be between 1 and {max_limit}")
+
+    after = args.get('after')
+    cursor = decode_cursor(after) if after else None
+    if cursor is not None and limit is None:
+        limit = max_limit
+    return limit, cursor
+
+
+def cursor_id(cursor, key='id'):
+    """Integer sort key stored in a decoded cursor, or None on the first page."""
+    if cursor is None:
+        return None
+    try:
+        return int(cursor[key])
+    except (KeyError, TypeError, ValueError):
+        raise PaginationError("Invalid cursor")
+
+
+def parse_fields(args, allowed):
+    """Validate ``fields=a,b,c`` against ``allowed``; None means all fields."""
+    value = args.get('fields')
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def project(row, fields):
+    if fields is None:
+        return row
+    return {field: row[field] for field in fields if field in row}
+
+
+def _parse_date(args, name):
+    value = args.get(name)
+    if not value:
+        return None, False
+    try:
+        return datetime.fromisoformat(value), len(value) == 10
+    except ValueError:
+        raise PaginationError(f"{name} must be an ISO date (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)")
+
+
+def parse_date_range(args, start_name='from', end_name='to'):
+    """Return ``(start, end)`` for ``start <= created_at < end``.
+
+    A plain date as the upper bound includes that whole day.
+    """
+    start, _ = _parse_date(args, start_name)
+    end, date_only = _parse_date(args, end_name)
+    if end is not None and date_only:
+        end += timedelta(days=1)
+    return start, end
+
+
+def next_page_headers(cursor_values):
+    """Headers pointing at the next page, or {} when this was the last one."""
+    if cursor_values is None:
+        return {}
+    token = encode_cursor(cursor_values)
+    args = request.args.to_dict()
+    args['after'] = token
+    return {
+        'X-Next-Cursor': token,
+        'Link': f'<{request.base_url}?{urlencode(args)}>; rel="next"',
+    }
@@ -0,0 +1,245 @@
+"""Opt-in request profiling and slow-query capture.
+
+A request is profiled when it sends ``X-Profile: <PROFILE_TOKEN>``, or when
+it falls within ``PROFILE_SAMPLE_RATE``. Without a configured token the
+header is ignored, so it can't be used to make a production app profile
+itself. There are two profilers:
+
+``sample`` (default)
+    A helper thread samples the request thread's stack every
+    ``PROFILE_INTERVAL_MS`` and writes the counts in collapsed-stack format
+    (``a;b;c 42``). flamegraph.pl, speedscope and inferno read it directly.
+``cprofile``
+    A deterministic cProfile run saved as a pstats ``.prof`` file
+    (flameprof or snakeviz draw a flamegraph from it).
+
+The last ``PROFILE_KEEP`` profiles are kept in ``PROFILE_DIR``. The
+response names its profile in ``X-Profile-Id``; the file is written once the
+body has been sent, so streamed responses are profiled to the end.
+
+Any statement slower than ``SLOW_QUERY_MS`` is logged with its route, the
+shape of its parameters (types and lengths, never values) and its EXPLAIN
+plan. The plan is fetched on a background thread with a separate
+connection, so the slow request does not wait any longer.
+"""
+import cProfile
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import g, has_request_context, request
+
+log = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def default_profile_dir():
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    return os.environ.get('PROFILE_DIR', os.path.join(repo_root, 'profiles'))
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer; ``counts`` maps collapsed stacks to hits."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}")
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class ProfileStore:
+    def __init__(self, root, keep=20):
+        self.root = root
+        self.keep = keep
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def prune(self):
+        entries = sorted(
+            (entry for entry in os.scandir(self.root) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries[:max(0, len(entries) - self.keep)]:
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass  # Another worker pruned it first
+
+
+def params_shape(params, many=False):
+    """Types (and lengths of strings) of statement parameters, never the values."""
+    def shape(value):
+        if isinstance(value, (str, bytes)):
+            return f'{type(value).__name__}({len(value)})'
+        return type(value).__name__
+
+    if many:
+        rows = list(params) if not isinstance(params, list) else params
+        return f"{len(rows)} x [{', '.join(shape(value) for value in rows[0])}]" if rows else '0 rows'
+    if isinstance(params, dict):
+        return {key: shape(value) for key, value in params.items()}
+    return [shape(value) for value in params or ()]
+
+
+class SlowQueryLog:
+    """Pool query observer logging statements slower than ``threshold`` seconds."""
+
+    def __init__(self, pool, threshold, explain=True):
+        self.pool = pool
+        self.threshold = threshold
+        self.explain = explain
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+
+    def __call__(self, statement, params, seconds, many):
+        if seconds < self.threshold:
+            return
+        record = {
+            'sql': ' '.join(str(statement).split()),
+            'duration_ms': round(seconds * 1000, 1),
+            'params_shape': params_shape(params, many),
+            'route': None,
+        }
+        if has_request_context():
+            record['route'] = request.url_rule.rule if request.url_rule is not None else request.path
+            record['request_id'] = g.get('request_id')
+
+        verb = record['sql'].split(' ', 1)[0].upper()
+        if self.explain and verb in _EXPLAINABLE:
+            first_params = (next(iter(params), ()) if many else params) or ()
+            self._executor.submit(self._explain_and_log, statement, first_params, record)
+        else:
+            log.warning("Slow query", extra=record)
+
+    def _explain_and_log(self, statement, params, record):
+        try:
+            connection = self.pool.get_connection(timeout=1.0)
+        except Exception as err:
+            record['explain_error'] = str(err)
+        else:
+            try:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute('EXPLAIN ' + statement, params)
+                record['explain'] = cursor.fetchall()
+                cursor.close()
+            except Exception as err:
+                record['explain_error'] = str(err)
+            finally:
+                connection.close()
+        log.warning("Slow query", extra=record)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def install_profiling(app, name, pool=None):
+    """Enable header/sampled profiling on ``app`` and slow-query logging on ``pool``."""
+    token = os.environ.get('PROFILE_TOKEN', '')
+    sample_rate = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    mode = os.environ.get('PROFILE_MODE', 'sample')
+    interval = float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+    slow_query_ms = float(os.environ.get('SLOW_QUERY_MS', 500))
+
+    slow_queries = None
+    if pool is not None and slow_query_ms > 0:
+        slow_queries = SlowQueryLog(pool, slow_query_ms / 1000,
+                                    explain=os.environ.get('SLOW_QUERY_EXPLAIN', '1') != '0')
+        pool.query_observers.append(slow_queries)
+
+    if not token and sample_rate <= 0:
+        return slow_queries  # Profiling off: no request hooks at all
+
+    store = ProfileStore(default_profile_dir(), keep=int(os.environ.get('PROFILE_KEEP', 20)))
+
+    def wants_profile():
+        supplied = request.headers.get(PROFILE_HEADER)
+        if token and supplied and hmac.compare_digest(supplied.encode(), token.encode()):
+            return True
+        return sample_rate > 0 and random.random() < sample_rate
+
+    @app.before_request
+    def start_profile():
+        if not wants_profile():
+            return
+        g.profile_started = time.perf_counter()
+        if mode == 'cprofile':
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+        else:
+            g.profiler = StackSampler(threading.get_ident(), interval)
+            g.profiler.start()
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+
+        started = g.profile_started
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        slug = ''.join(c if c.isalnum() else '_' for c in route).strip('_') or 'root'
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{name}-{request.method}-{slug}-{os.getpid()}-" \
+                     f"{random.getrandbits(32):08x}"
+        filename = profile_id + ('.prof' if mode == 'cprofile' else '.collapsed')
+
+        # Stopped once the server has sent the body, not here: a streamed
+        # response (the SSE endpoints, the CSV export) does its work after
+        # after_request has returned
+        def save_profile():
+            if mode == 'cprofile':
+                profiler.disable()
+            else:
+                profiler.stop()
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            try:
+                if mode == 'cprofile':
+                    profiler.dump_stats(store.path(filename))
+                else:
+                    profiler.write(store.path(filename))
+                store.prune()
+            except OSError:
+                log.exception("Could not save profile")
+                return
+            log.info("Request profiled", extra={'route': route, 'profile': filename, 'duration_ms': elapsed_ms})
+
+        response.call_on_close(save_profile)
+        response.headers[PROFILE_ID_HEADER] = filename
+        return response
+
+    return slow_queries
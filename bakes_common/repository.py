@@ -0,0 +1,240 @@
+"""Product, user and admin queries shared by both apps.
+
+Each statement is fixed text run through ``PooledConnection.prepared``.
+MySQL parses and plans it once per connection, and later calls only send
+the parameters. Rows come back as the named tuples below instead of
+dicts. They are immutable, so the catalog cache can hand the same row to
+many requests, and ``row._asdict()`` gives a dict for JSON.
+
+Every function takes a checked-out connection, so callers keep the usual
+``get_db_connection()`` / ``connection.close()`` pattern and can run
+several calls inside one ``transaction(connection)`` block.
+
+Table names are lowercase here. The admin app's ``Products``/``Users``
+spelling only works because the server's table names are case-insensitive.
+"""
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+
+class Product(NamedTuple):
+    product_id: int
+    name: str
+    description: Optional[str]
+    price: object  # Decimal
+    category: Optional[str]
+    quantity: int
+    status: Optional[str]
+    image_url: Optional[str]  # Legacy external URL, from before the image store
+    image_hash: Optional[str]
+    has_image: bool  # A legacy BLOB is still stored in image_data
+
+
+class User(NamedTuple):
+    user_id: int
+    name: str
+    email: str
+    phone: Optional[str]
+    address: Optional[str]
+    role: str
+    password_hash: str
+
+
+class Admin(NamedTuple):
+    email: str
+    password_hash: str
+
+
+PRODUCT_SELECT = (
+    "SELECT product_id, name, description, price, category, quantity, status, image_url, image_hash, "
+    "image_data IS NOT NULL AS has_image FROM products"
+)
+USER_SELECT = "SELECT user_id, name, email, phone, address, role, password_hash FROM users"
+
+# Built once: a prepared cursor only skips re-preparing when it gets the same
+# string object back (see bakes_common.db.PreparedStatement)
+GET_PRODUCT_SQL = PRODUCT_SELECT + " WHERE product_id = %s"
+PRODUCTS_CHANGED_SQL = ("SELECT change_version, " + PRODUCT_SELECT[len("SELECT "):]
+                        + " WHERE change_version > %s ORDER BY change_version LIMIT %s")
+FIND_USER_SQL = USER_SELECT + " WHERE email = %s"
+FIND_USER_CONFLICT_SQL = USER_SELECT + " WHERE email = %s OR phone = %s LIMIT 1"
+USER_ID_SQL = "SELECT user_id FROM users WHERE email = %s"
+INSERT_USER_SQL = ("INSERT INTO users (name, email, phone, address, role, password_hash) "
+                   "VALUES (%s, %s, %s, %s, %s, %s)")
+SET_USER_PASSWORD_SQL = "UPDATE users SET password_hash = %s WHERE user_id = %s"
+FIND_ADMIN_SQL = "SELECT email, password_hash FROM admins WHERE email = %s"
+SET_ADMIN_PASSWORD_SQL = "UPDATE admins SET password_hash = %s WHERE email = %s"
+
+
+def _product(row):
+    product = Product._make(row)
+    return product._replace(has_image=bool(product.has_image))
+
+
+def _one(cursor, sql, params):
+    # Read every row: a prepared cursor can't run again with results pending
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    return rows[0] if rows else None
+
+
+@contextmanager
+def transaction(connection):
+    """Commit when the block finishes, roll back if it raises."""
+    try:
+        yield connection
+    except BaseException:
+        connection.rollback()
+        raise
+    connection.commit()
+
+
+def get_product(connection, product_id):
+    row = _one(connection.prepared(GET_PRODUCT_SQL), GET_PRODUCT_SQL, (product_id,))
+    return _product(row) if row else None
+
+
+@lru_cache(maxsize=None)
+def list_products_sql(by_category, by_status, after, limited):
+    """The product list statement for one filter shape; the same string object every time."""
+    conditions = []
+    if by_category:
+        conditions.append("category = %s")
+    if by_status:
+        conditions.append("status = %s")
+    if after:
+        conditions.append("product_id > %s")
+    sql = PRODUCT_SELECT
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY product_id"
+    if limited:
+        sql += " LIMIT %s"
+    return sql
+
+
+def list_products(connection, category=None, status=None, after_id=None, limit=None):
+    """Products in id order; with ``limit``, one extra row tells the caller there is a next page."""
+    params = [value for value in (category or None, status or None, after_id) if value is not None]
+    if limit is not None:
+        params.append(limit + 1)
+
+    # At most 16 statement shapes, each prepared once per connection
+    sql = list_products_sql(bool(category), bool(status), after_id is not None, limit is not None)
+    cursor = connection.prepared(sql)
+    cursor.execute(sql, params)
+    return [_product(row) for row in cursor.fetchall()]
+
+
+def products_changed_since(connection, version, limit):
+    """``(change_version, Product)`` pairs for products written after ``version``, oldest change first."""
+    cursor = connection.prepared(PRODUCTS_CHANGED_SQL)
+    cursor.execute(PRODUCTS_CHANGED_SQL, (version, limit))
+    return [(row[0], _product(row[1:])) for row in cursor.fetchall()]
+
+
+def find_user_by_email(connection, email):
+    row = _one(connection.prepared(FIND_USER_SQL), FIND_USER_SQL, (email,))
+    return User._make(row) if row else None
+
+
+def find_user_conflict(connection, email, phone):
+    """A user already holding ``email`` or ``phone``, if any."""
+    row = _one(connection.prepared(FIND_USER_CONFLICT_SQL), FIND_USER_CONFLICT_SQL, (email, phone))
+    return User._make(row) if row else None
+
+
+def user_id_by_email(connection, email):
+    row = _one(connection.prepared(USER_ID_SQL), USER_ID_SQL, (email,))
+    return row[0] if row else None
+
+
+def insert_user(connection, name, email, phone, address, role, password_hash):
+    """Insert a user (the caller commits) and return the new user_id."""
+    cursor = connection.prepared(INSERT_USER_SQL)
+    cursor.execute(INSERT_USER_SQL, (name, email, phone, address, role, password_hash))
+    return cursor.lastrowid
+
+
+def set_user_password_hash(connection, user_id, password_hash):
+    connection.prepared(SET_USER_PASSWORD_SQL).execute(SET_USER_PASSWORD_SQL, (password_hash, user_id))
+
+
+def find_admin_by_email(connection, email):
+    row = _one(connection.prepared(FIND_ADMIN_SQL), FIND_ADMIN_SQL, (email,))
+    return Admin._make(row) if row else None
+
+
+def set_admin_password_hash(connection, email, password_hash):
+    connection.prepared(SET_ADMIN_PASSWORD_SQL).execute(SET_ADMIN_PASSWORD_SQL, (password_hash, email))
+
+
+@lru_cache(maxsize=None)
+def order_history_sql(by_user_id, paged):
+    """The storefront order history statement for one shape: by user id or email, first or later page."""
+    if by_user_id:
+        conditions = ["o.user_id = %s"]
+    else:
+        conditions = ["o.user_id = (SELECT user_id FROM users WHERE email = %s)"]
+    if paged:
+        conditions.append("(o.created_at < %s OR (o.created_at = %s AND o.order_id < %s))")
+    # The page of orders comes from idx_orders_user_created, then gets joined
+    # to its items; never the customer's whole history
+    return f"""
+    SELECT o.order_id, o.order_status, o.total_price, o.payment_status,
+           o.delivery_type, o.delivery_address, o.map_link,
+           oi.product_id, p.name AS product_name, p.status AS product_status,
+           p.image_url, oi.quantity, oi.price as item_price,
+           o.created_at as date
+    FROM (
+        SELECT * FROM orders o
+        WHERE {' AND '.join(conditions)}
+        ORDER BY o.created_at DESC, o.order_id DESC
+        LIMIT %s
+    ) o
+    JOIN order_items oi ON o.order_id = oi.order_id
+    JOIN products p ON oi.product_id = p.product_id
+    ORDER BY o.created_at DESC, o.order_id DESC
+    """
+
+
+def order_history_query(limit, email=None, user_id=None, before=None):
+    """SQL and params for one page of a customer's orders, newest first, one row per item.
+
+    A session token already names the user; otherwise the email is resolved
+    inside the same statement instead of a separate round trip. ``before``
+    is the ``(created_at, order_id)`` of the previous page's last order.
+    One extra order tells the caller whether there is a next page.
+    """
+    params = [user_id] if user_id is not None else [email]
+    if before is not None:
+        before_date, before_id = before
+        params += [before_date, before_date, before_id]
+    params.append(limit + 1)
+    return order_history_sql(user_id is not None, before is not None), params
+
+
+# One order for the storefront details page. The validator is its updated_at
+# (migration 004) plus a checksum of the product fields the page shows, read
+# through idx_order_items_order and the products key; stock changes to the
+# products don't touch it
+ORDER_VERSION_SQL = """
+SELECT o.*, UNIX_TIMESTAMP(o.updated_at) AS version,
+       (SELECT CRC32(GROUP_CONCAT(CONCAT_WS('|', oi.product_id, p.name, p.status, p.image_url)
+                                  ORDER BY oi.product_id SEPARATOR '\\n'))
+        FROM order_items oi LEFT JOIN products p ON oi.product_id = p.product_id
+        WHERE oi.order_id = o.order_id) AS products_tag
+FROM orders o
+WHERE o.order_id = %s
+"""
+ORDER_DETAILS_SQL = """
+SELECT o.order_id, o.order_status, o.total_price, o.payment_status, o.created_at as date,
+       o.delivery_type, o.delivery_address, o.map_link,
+       oi.product_id, p.name AS product_name, p.status AS product_status, p.image_url,
+       oi.quantity, oi.price as item_price
+FROM orders o
+LEFT JOIN order_items oi ON o.order_id = oi.order_id
+LEFT JOIN products p ON oi.product_id = p.product_id
+WHERE o.order_id = %s
+"""
@@ -0,0 +1,83 @@
+"""Response encoding shared by both apps: fast JSON and compression.
+
+``install_json(app)`` makes ``jsonify`` and ``request.get_json`` use
+bakes_common.jsonio. Routes can then return rows with Decimal and datetime
+values as they come from MySQL.
+
+``install_compression(app)`` gzips or brotli-compresses JSON, NDJSON, CSV
+and text responses when the client accepts it. Whole bodies are only
+compressed from ``COMPRESS_MIN_SIZE`` bytes up (default 1024); smaller ones
+would gain nothing. Streamed bodies are compressed chunk by chunk. A
+response that already has a Content-Encoding, such as the order export, is
+left alone.
+
+Environment:
+    COMPRESS_ENABLED         0 turns compression off (e.g. behind a proxy that compresses)
+    COMPRESS_MIN_SIZE        smallest whole body worth compressing, in bytes
+    COMPRESS_GZIP_LEVEL      zlib level (default 6)
+    COMPRESS_BROTLI_QUALITY  brotli quality (default 4)
+"""
+import os
+
+from flask import request
+from flask.json.provider import JSONProvider
+
+from bakes_common import jsonio
+from bakes_common.config import env_bool
+from bakes_common.streaming import BROTLI_QUALITY, GZIP_LEVEL, brotli_chunks, compress, gzip_chunks, negotiate_encoding
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html')
+
+
+class FastJSONProvider(JSONProvider):
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return jsonio.dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return jsonio.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Encode straight to bytes; the default provider builds a str first
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(jsonio.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+def install_json(app):
+    app.json = FastJSONProvider(app)
+
+
+def install_compression(app):
+    if not env_bool('COMPRESS_ENABLED', True):
+        return
+    min_size = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    gzip_level = int(os.environ.get('COMPRESS_GZIP_LEVEL', GZIP_LEVEL))
+    brotli_quality = int(os.environ.get('COMPRESS_BROTLI_QUALITY', BROTLI_QUALITY))
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+
+        # Caches must keep compressed and plain copies apart
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            if encoding == 'br':
+                response.response = brotli_chunks(response.response, brotli_quality)
+            else:
+                response.response = gzip_chunks(response.response, gzip_level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(compress(data, encoding, gzip_level, brotli_quality))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,343 @@
+"""In-memory product search for GET /products/search.
+
+``ProductIndex`` is an inverted index over each product's name, category
+and description. Each word goes to a posting list, weighted by the best
+field it appears in (name over category over description). A trigram
+index over the vocabulary finds words close to a misspelt query word. One
+query word matches a product through:
+
+* the exact word (``cake`` and ``cakes`` are the same word: plural s is stripped)
+* a word it starts, so partial input while typing matches (``choc`` -> ``chocolate``)
+* a word one or two edits away, only if the exact word is unknown (``chocolte``)
+
+A product must match every query word. The score is the sum of the
+per-word weights, discounted for prefix and fuzzy matches. Category facet
+counts are taken over all matches, before the ``category`` filter, so the
+shop can show how many hits each category tab has.
+
+``CatalogSearch`` keeps an index in step with MySQL. It is built once at
+startup. After that, each search compares the shared catalog version, which
+every product and stock write in either app bumps, with the version the
+index last saw. When it differs, only the rows written since are read
+through the change versions from migration 005 (bakes_common/changes.py),
+deletes included.
+"""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter, namedtuple
+from itertools import islice
+
+from bakes_common import changes, repository
+
+FIELD_WEIGHTS = (('name', 3.0), ('category', 2.0), ('description', 1.0))
+PREFIX_FACTOR = 0.7
+FUZZY_FACTOR = 0.5
+MAX_EXPANSIONS = 50  # Vocabulary words tried per prefix or misspelling
+MIN_PREFIX = 2
+MIN_FUZZY = 4
+STOPWORDS = frozenset(['a', 'an', 'and', 'the', 'of', 'with', 'in', 'for', 'to', 'on', 'or', 'our', 'is'])
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+SearchResult = namedtuple('SearchResult', 'products total facets')
+
+
+def words(text):
+    """Lowercased, accent-free words of ``text`` without stopwords; plural s stripped."""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.lower()).encode('ascii', 'ignore').decode('ascii')
+    result = []
+    for word in _WORD.findall(text):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        result.append(word)
+    return result
+
+
+def trigrams(word):
+    padded = f'^{word}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance of ``a`` and ``b``, or ``limit + 1`` once it is certain to exceed ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class ProductIndex:
+    """Inverted and trigram index over products; safe to search while it is updated."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._products = {}   # product_id -> Product
+        self._terms = {}      # product_id -> {word: weight}
+        self._postings = {}   # word -> {product_id: weight}
+        self._grams = {}      # trigram -> set of words
+        self._categories = {}  # product_id -> category
+        # Rebuilt on the next search after a change that affects them
+        self._vocabulary = None  # Sorted words, for prefix lookups
+        self._ranks = None       # product_id -> position in tie-break order (in stock, then name)
+        self._ordered = None     # product ids in that order
+        self._category_counts = None
+
+    def __len__(self):
+        return len(self._products)
+
+    def replace_all(self, products):
+        with self._lock:
+            self._products, self._terms, self._postings, self._grams, self._categories = {}, {}, {}, {}, {}
+            self._vocabulary = self._ranks = None
+            for product in products:
+                self._add(product)
+
+    def upsert(self, product):
+        with self._lock:
+            previous, ranks = self._products.get(product.product_id), self._ranks
+            self._remove(product.product_id)
+            self._add(product)
+            # Most writes are stock updates; they leave the ordering and counts alone
+            if (previous is not None and previous.category == product.category
+                    and _tie_break(previous) == _tie_break(product)):
+                self._ranks = ranks
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+    def _add(self, product):
+        terms = {}
+        for field, weight in FIELD_WEIGHTS:
+            for word in words(getattr(product, field)):
+                if terms.get(word, 0) < weight:
+                    terms[word] = weight
+        self._products[product.product_id] = product
+        self._categories[product.product_id] = product.category
+        self._terms[product.product_id] = terms
+        for word, weight in terms.items():
+            posting = self._postings.get(word)
+            if posting is None:
+                posting = self._postings[word] = {}
+                for gram in trigrams(word):
+                    self._grams.setdefault(gram, set()).add(word)
+                self._vocabulary = None
+            posting[product.product_id] = weight
+        self._ranks = None
+
+    def _remove(self, product_id):
+        if self._products.pop(product_id, None) is None:
+            return
+        del self._categories[product_id]
+        for word in self._terms.pop(product_id):
+            posting = self._postings[word]
+            del posting[product_id]
+            if not posting:
+                del self._postings[word]
+                for gram in trigrams(word):
+                    self._grams[gram].discard(word)
+                self._vocabulary = None
+        self._ranks = None
+
+    def _ranking(self):
+        if self._ranks is None:
+            self._ordered = sorted(self._products, key=lambda product_id: _tie_break(self._products[product_id]))
+            self._ranks = {product_id: rank for rank, product_id in enumerate(self._ordered)}
+            self._category_counts = Counter(self._categories.values())
+        return self._ranks
+
+    def _expansions(self, word):
+        """``(vocabulary word, factor)`` pairs the query word matches, best first."""
+        matches = []
+        if word in self._postings:
+            matches.append((word, 1.0))
+        if len(word) >= MIN_PREFIX:
+            if self._vocabulary is None:
+                self._vocabulary = sorted(self._postings)
+            start = bisect.bisect_right(self._vocabulary, word)
+            for candidate in self._vocabulary[start:start + MAX_EXPANSIONS]:
+                if not candidate.startswith(word):
+                    break
+                # Closer to a whole word, closer to an exact match
+                matches.append((candidate, PREFIX_FACTOR + (1 - PREFIX_FACTOR) * len(word) / len(candidate)))
+        if not matches and len(word) >= MIN_FUZZY:
+            matches = self._fuzzy(word)
+        return matches
+
+    def _fuzzy(self, word):
+        grams = trigrams(word)
+        shared = {}
+        for gram in grams:
+            for candidate in self._grams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        # Only words sharing a fair part of their trigrams get the edit distance check
+        candidates = sorted(
+            (candidate for candidate, count in shared.items()
+             if count / (len(grams) + len(candidate) - count) >= 0.3),
+            key=lambda candidate: -shared[candidate],
+        )[:MAX_EXPANSIONS]
+        limit = 1 if len(word) <= 5 else 2
+        matches = []
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit:
+                matches.append((candidate, FUZZY_FACTOR * (1 - (distance - 1) / (limit + 1))))
+        return matches
+
+    def _match(self, word, within):
+        """{product_id: score} for one query word, limited to ``within`` when given."""
+        scores = {}
+        for candidate, factor in self._expansions(word):
+            posting = self._postings[candidate]
+            if within is None:
+                hits = {product_id: weight * factor for product_id, weight in posting.items()}
+            elif len(within) < len(posting):
+                hits = {product_id: posting[product_id] * factor for product_id in within if product_id in posting}
+            else:
+                hits = {product_id: weight * factor for product_id, weight in posting.items() if product_id in within}
+            if not scores:
+                scores = hits
+                continue
+            for product_id, score in hits.items():
+                if scores.get(product_id, 0) < score:
+                    scores[product_id] = score
+        return scores
+
+    def search(self, query, category=None, limit=20):
+        """Best ``limit`` products for ``query`` in ``category``, with the match count and category facets."""
+        query_words = list(dict.fromkeys(words(query)))
+        with self._lock:
+            ranks = self._ranking()
+            if not query_words:
+                # Browsing: everything in tie-break order, counts precomputed
+                facets = self._category_counts
+                matched = self._ordered if category is None else \
+                    (product_id for product_id in self._ordered if self._categories[product_id] == category)
+                best = list(islice(matched, limit))
+                total = len(self._products) if category is None else facets.get(category, 0)
+            else:
+                scores = None
+                for word in query_words:
+                    matches = self._match(word, scores)
+                    # Every query word must match
+                    scores = matches if scores is None else {
+                        product_id: scores[product_id] + score for product_id, score in matches.items()}
+                    if not scores:
+                        break
+                facets = Counter(map(self._categories.__getitem__, scores))
+                matched = list(scores) if category is None else \
+                    [product_id for product_id in scores if self._categories[product_id] == category]
+                # Highest score first; ties in stock before sold out, then by
+                # name (the second sort is stable)
+                matched.sort(key=ranks.__getitem__)
+                matched.sort(key=scores.__getitem__, reverse=True)
+                best, total = matched[:limit], len(matched)
+            products = [self._products[product_id] for product_id in best]
+
+        facets = dict(sorted(facets.items(), key=lambda facet: (-facet[1], facet[0] or '')))
+        return SearchResult(products, total, facets)
+
+
+def _tie_break(product):
+    return product.status == 'out_of_stock', product.name or ''
+
+
+class CatalogSearch:
+    """A ``ProductIndex`` kept in step with MySQL through the catalog version and change versions."""
+
+    def __init__(self, pool, catalog_cache):
+        self.pool = pool
+        self.catalog_cache = catalog_cache
+        self.index = ProductIndex()
+        self.catalog_version = None  # Catalog version the index reflects; None until built
+        self._since = 0              # Change version to read deltas from
+        self._refresh_lock = threading.Lock()
+        self.rebuilds = 0
+        self.refreshes = 0
+
+    def build(self):
+        """Load every product; the delta position is taken first so no write in between is lost."""
+        catalog_version = self.catalog_cache.version()
+        connection = self.pool.get_connection()
+        try:
+            since = changes.settled_version(connection)
+            products = repository.list_products(connection)
+        finally:
+            connection.close()
+        self.index.replace_all(products)
+        self._since, self.catalog_version = since, catalog_version
+        self.rebuilds += 1
+
+    def refresh(self):
+        """Apply writes since the last refresh if the catalog version moved; returns the version searched."""
+        catalog_version = self.catalog_cache.version()
+        if catalog_version == self.catalog_version:
+            return catalog_version
+        # One thread refreshes; the others search the index as it is
+        if not self._refresh_lock.acquire(blocking=self.catalog_version is None):
+            return self.catalog_version
+        try:
+            if self.catalog_version is None:
+                self.build()
+            elif catalog_version != self.catalog_version:
+                self._apply_changes(catalog_version)
+            return self.catalog_version
+        finally:
+            self._refresh_lock.release()
+
+    def _apply_changes(self, catalog_version):
+        connection = self.pool.get_connection()
+        try:
+            # Read every committed change, including the last few seconds' (a
+            # bulk import can put thousands there), but resume next time from
+            # the settled version: a write that took its version earlier and
+            # commits later is then still picked up
+            settled = changes.settled_version(connection)
+            read_from = self._since
+            while True:
+                page = changes.load_changes(connection, read_from, changes.MAX_PAGE_SIZE, settle=None)
+                # In version order: an update followed by a delete of the
+                # same product must leave it deleted
+                writes = [(version, product, None) for version, product in page['products']]
+                writes += [(version, None, product_id) for version, product_id in page['deleted']['products']]
+                writes.sort(key=lambda write: write[0])
+                for _, product, deleted_id in writes:
+                    if product is not None:
+                        self.index.upsert(product)
+                    else:
+                        self.index.remove(deleted_id)
+                read_from = page['version']
+                if not page['has_more']:
+                    break
+        finally:
+            connection.close()
+        self._since = max(self._since, min(read_from, settled))
+        self.catalog_version = catalog_version
+        self.refreshes += 1
+
+    def search(self, query, category=None, limit=20):
+        self.refresh()
+        return self.index.search(query, category, limit)
+
+    def stats(self):
+        return {
+            "products": len(self.index),
+            "catalog_version": self.catalog_version,
+            "since": self._since,
+            "rebuilds": self.rebuilds,
+            "refreshes": self.refreshes,
+        }
@@ -0,0 +1,57 @@
+"""Compression helpers for response bodies, whole or streamed (exports)."""
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install brotli
+    brotli = None
+
+GZIP_LEVEL = 6
+# Brotli's default (11) is meant for static assets; 4 compresses better
+# than gzip -6 at about the same speed
+BROTLI_QUALITY = 4
+
+
+def accepts_gzip(request):
+    return request.accept_encodings['gzip'] > 0
+
+
+def negotiate_encoding(request):
+    """'br', 'gzip' or None for the request's Accept-Encoding; br only if brotli is installed."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br'] > 0 and accepted['br'] >= accepted['gzip']:
+        return 'br'
+    if accepted['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    """Compress a stream of str/bytes chunks into one gzip member as it goes."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def brotli_chunks(chunks, quality=BROTLI_QUALITY):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
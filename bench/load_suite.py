@@ -0,0 +1,461 @@
+"""Concurrent load test for every route of both apps, with JSON results.
+
+Each endpoint is driven by ``--concurrency`` client threads for
+``--duration`` seconds, one endpoint at a time. The suite reports
+throughput and p50/p95/p99 latency per endpoint and writes everything,
+along with the git commit and the run settings, to a JSON file that can be
+compared with an earlier run:
+
+    python bench/seed_dataset.py seed
+    python bench/load_suite.py --duration 10 --concurrency 16
+    python bench/load_suite.py --only storefront.orders.place admin.orders.page
+    python bench/load_suite.py --compare bench/results/before.json bench/results/after.json
+
+By default both apps are loaded in-process and called through Flask's
+test client. This is handy for comparing two commits on one machine, but
+the clients and the server share the GIL. Pass ``--admin-url`` and
+``--storefront-url`` to load real servers over HTTP instead. Mutating
+endpoints only touch the seeded bench rows, and
+``python bench/seed_dataset.py cleanup`` removes everything they created.
+"""
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'admin'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import seed_dataset  # noqa: E402
+from db_config import db_config  # noqa: E402
+from bakes_common import inventory  # noqa: E402
+from bakes_common.db import ConnectionPool  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'bench', 'results')
+
+
+# -- transports ---------------------------------------------------------------
+
+class InProcessTransport:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, data=body, headers=headers or {})
+        data = response.get_data()  # Drains streamed bodies too
+        response.close()
+        return response.status_code, data
+
+
+class HttpTransport:
+    """One keep-alive connection per client thread."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            connection.request(method, self.prefix + path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (OSError, ConnectionError):
+            connection.close()
+            self._local.connection = None
+            raise
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# -- request builders ---------------------------------------------------------
+
+def json_body(payload, headers=None):
+    return json.dumps(payload).encode(), dict(headers or {}, **{'Content-Type': 'application/json'})
+
+
+def multipart_body(fields, files=()):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, content in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+class Context:
+    """Seeded data plus state shared by the endpoint builders."""
+
+    def __init__(self, data, pool, user_tokens):
+        self.products = data['products']
+        self.users = data['users']
+        self.order_ids = data['order_ids']
+        self.pool = pool
+        self.user_tokens = user_tokens
+        self.image = seed_dataset.make_image(0)
+        # Products reserved for the hot/unhot endpoints so other routes see normal stock
+        self.hot_products = [product['product_id'] for product in self.products[-4:]]
+        self.regular_products = self.products[:-4]
+
+    def product(self, rng):
+        return rng.choice(self.regular_products)
+
+    def user_auth(self, rng):
+        email, token = rng.choice(self.user_tokens)
+        return email, {'Authorization': f'Bearer {token}'}
+
+    def created_product(self):
+        """A fresh bench product for the delete endpoint, inserted directly (untimed)."""
+        connection = self.pool.get_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(
+                "INSERT INTO products (name, description, price, category, quantity, status) "
+                "VALUES ('Bench delete me', %s, 1, 'bench', 0, 'out_of_stock')", (seed_dataset.MARKER,))
+            product_id = cursor.lastrowid
+            cursor.close()
+            connection.commit()
+            return product_id
+        finally:
+            connection.close()
+
+    def held_reservation(self, rng):
+        reservation_id, _ = inventory.reserve(self.pool, {self.product(rng)['product_id']: 1}, ttl=60)
+        return reservation_id
+
+
+def _year_range():
+    today = date.today()
+    return (today - timedelta(days=365)).isoformat(), today.isoformat()
+
+
+def endpoints():
+    """name -> (app, build(ctx, rng) -> (method, path, body, headers), ok statuses or None for 2xx/3xx)."""
+    year_from, year_to = _year_range()
+
+    def get(path):
+        return lambda ctx, rng: ('GET', path(ctx, rng) if callable(path) else path, None, {})
+
+    def bulk_import(ctx, rng):
+        rows = rng.sample(ctx.regular_products, min(100, len(ctx.regular_products)))
+        body = ''.join(json.dumps({
+            'product_id': product['product_id'], 'name': product['name'],
+            'price': float(product['price']), 'quantity': 1_000_000,
+        }) + '\n' for product in rows).encode()
+        return 'POST', '/products/bulk?format=ndjson', body, {'Content-Type': 'application/x-ndjson'}
+
+    def admin_add_product(ctx, rng):
+        body, headers = multipart_body(
+            {'name': 'Bench new product', 'description': seed_dataset.MARKER, 'price': '5',
+             'category': 'bench', 'quantity': '0'},
+            [('image', 'bench.jpg', ctx.image)])
+        return 'POST', '/products', body, headers
+
+    def admin_update_product(ctx, rng):
+        product = ctx.product(rng)
+        body, headers = multipart_body({'quantity': '1000000', 'price': str(product['price'])})
+        return 'PUT', f"/products/{product['product_id']}", body, headers
+
+    def place_order(ctx, rng):
+        _, headers = ctx.user_auth(rng)
+        items = [{'product_id': product['product_id'], 'quantity': 1, 'price': float(product['price'])}
+                 for product in rng.sample(ctx.regular_products, rng.randint(1, 3))]
+        return ('POST', '/orders') + json_body({
+            'items': items, 'delivery_type': 'pickup', 'payment_method': 'cod',
+        }, headers)
+
+    def storefront_login(ctx, rng):
+        return ('POST', '/login') + json_body({'email': rng.choice(ctx.users)['email'],
+                                               'password': seed_dataset.PASSWORD})
+
+    def register(ctx, rng):
+        suffix = uuid.uuid4().hex[:12]
+        return ('POST', '/register') + json_body({
+            'name': 'Bench signup', 'email': f'signup-{suffix}@{seed_dataset.EMAIL_DOMAIN}',
+            'phone': f'8{int(suffix, 16) % 10**9:09d}', 'password': seed_dataset.PASSWORD,
+        })
+
+    return {
+        # Admin app
+        'admin.health.db': ('admin', get('/health/db'), None),
+        'admin.metrics': ('admin', get('/metrics'), (200, 404)),
+        'admin.products.all': ('admin', get('/products'), None),
+        'admin.products.page': ('admin', get('/products?limit=50'), None),
+        'admin.products.detail': ('admin', get(lambda ctx, rng: f"/products/{ctx.product(rng)['product_id']}"), None),
+        'admin.products.legacy_image': (
+            'admin', get(lambda ctx, rng: f"/products/{ctx.product(rng)['product_id']}/image"), None),
+        'admin.images.thumb': ('admin', get(lambda ctx, rng: f"/images/{ctx.product(rng)['image_hash']}/thumb"), None),
+        'admin.products.export': ('admin', get('/products/export?format=csv'), None),
+        'admin.products.add': ('admin', admin_add_product, None),
+        'admin.products.update': ('admin', admin_update_product, None),
+        'admin.products.delete': (
+            'admin', lambda ctx, rng: ('DELETE', f'/products/{ctx.created_product()}', None, {}), None),
+        'admin.products.bulk_import': ('admin', bulk_import, None),
+        'admin.products.hot': (
+            'admin', lambda ctx, rng: ('POST', f'/products/{rng.choice(ctx.hot_products)}/hot') + json_body({}),
+            None),
+        'admin.products.unhot': (
+            'admin', lambda ctx, rng: ('DELETE', f'/products/{rng.choice(ctx.hot_products)}/hot', None, {}),
+            (200, 404)),
+        'admin.inventory.reconcile': ('admin', lambda ctx, rng: ('POST', '/inventory/reconcile', None, {}), None),
+        'admin.login': ('admin', lambda ctx, rng: ('POST', '/login-admin') + json_body({
+            'email': seed_dataset.ADMIN_EMAIL, 'password': seed_dataset.PASSWORD}), None),
+        'admin.orders.all': ('admin', get('/orders'), None),
+        'admin.orders.page': ('admin', get('/orders?limit=50'), None),
+        'admin.orders.filtered': ('admin', get('/orders?order_status=baked&payment_status=not%20paid&limit=50'), None),
+        'admin.orders.export': ('admin', get(f'/orders/export?from={year_from}&to={year_to}&format=csv'), None),
+        'admin.orders.status': ('admin', lambda ctx, rng: (
+            'PUT', f'/orders/{rng.choice(ctx.order_ids)}/status') + json_body(
+            {'status': rng.choice(seed_dataset.ORDER_STATUSES)}), None),
+        'admin.orders.payment_status': ('admin', lambda ctx, rng: (
+            'PUT', f'/orders/{rng.choice(ctx.order_ids)}/payment-status') + json_body(
+            {'payment_status': rng.choice(seed_dataset.PAYMENT_STATUSES)}), None),
+        'admin.orders.legacy_status': ('admin', lambda ctx, rng: ('PUT', '/update_status') + json_body(
+            {'order_id': rng.choice(ctx.order_ids), 'new_status': rng.choice(['shipped', 'delivered'])}), None),
+        'admin.orders.bulk_status': ('admin', lambda ctx, rng: ('PUT', '/orders/status') + json_body(
+            {'order_ids': rng.sample(ctx.order_ids, min(50, len(ctx.order_ids))),
+             'status': rng.choice(seed_dataset.ORDER_STATUSES)}), None),
+
+        # Storefront
+        'storefront.health.db': ('storefront', get('/health/db'), None),
+        'storefront.metrics': ('storefront', get('/metrics'), (200, 404)),
+        'storefront.products.all': ('storefront', get('/products'), None),
+        'storefront.products.category': (
+            'storefront', get(lambda ctx, rng: f"/products?category={ctx.product(rng)['category']}&limit=50"), None),
+        'storefront.images.card': (
+            'storefront', get(lambda ctx, rng: f"/images/{ctx.product(rng)['image_hash']}/card"), None),
+        'storefront.products.add': ('storefront', lambda ctx, rng: ('POST', '/products') + json_body({
+            'name': 'Bench storefront product', 'description': seed_dataset.MARKER, 'price': 5,
+            'category': 'bench', 'quantity': 0}), None),
+        'storefront.products.quantity': ('storefront', lambda ctx, rng: ('POST', '/update-product-quantity') + json_body(
+            {'product_id': ctx.product(rng)['product_id'], 'quantity': 1_000_000}), None),
+        'storefront.login': ('storefront', storefront_login, None),
+        'storefront.register': ('storefront', register, None),
+        'storefront.reservations.create': ('storefront', lambda ctx, rng: ('POST', '/reservations') + json_body(
+            {'items': [{'product_id': ctx.product(rng)['product_id'], 'quantity': 1}], 'ttl': 60}), None),
+        'storefront.reservations.cancel': (
+            'storefront', lambda ctx, rng: ('DELETE', f'/reservations/{ctx.held_reservation(rng)}', None, {}), None),
+        'storefront.orders.place': ('storefront', place_order, None),
+        'storefront.orders.history': (
+            'storefront', get(lambda ctx, rng: f"/orders/user/email/{rng.choice(ctx.users)['email']}"), None),
+        'storefront.orders.details': (
+            'storefront', get(lambda ctx, rng: f"/orders/details/{rng.choice(ctx.order_ids)}"), None),
+    }
+
+
+# -- running ------------------------------------------------------------------
+
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return None
+    # Nearest-rank
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples, statuses, failures, elapsed):
+    samples.sort()
+    ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+    return {
+        'requests': len(samples),
+        'errors': failures,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': ms(sum(samples) / len(samples)) if samples else None,
+        'p50_ms': ms(percentile(samples, 0.50)),
+        'p95_ms': ms(percentile(samples, 0.95)),
+        'p99_ms': ms(percentile(samples, 0.99)),
+        'max_ms': ms(samples[-1]) if samples else None,
+    }
+
+
+def run_endpoint(transport, build, ok_statuses, ctx, concurrency, duration, seed):
+    samples, statuses = [], Counter()
+    failures = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(n):
+        rng = random.Random(seed * 1000 + n)
+        local_samples, local_statuses, local_failures = [], Counter(), 0
+        while time.perf_counter() < deadline:
+            method, path, body, headers = build(ctx, rng)  # Setup work here is not timed
+            started = time.perf_counter()
+            try:
+                status, _ = transport.request(method, path, body, headers)
+            except Exception:
+                local_failures += 1
+                local_statuses['exception'] += 1
+                continue
+            local_samples.append(time.perf_counter() - started)
+            local_statuses[status] += 1
+            if not (status in ok_statuses if ok_statuses else 200 <= status < 400):
+                local_failures += 1
+        with lock:
+            samples.extend(local_samples)
+            statuses.update(local_statuses)
+            failures[0] += local_failures
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, statuses, failures[0], time.perf_counter() - started)
+
+
+def login_tokens(transports, users, count):
+    """Session tokens for ``count`` customers; also checks both apps answer at all."""
+    admin_status, _ = transports['admin'].request('POST', '/login-admin', *json_body({
+        'email': seed_dataset.ADMIN_EMAIL, 'password': seed_dataset.PASSWORD}))
+    if admin_status != 200:
+        raise SystemExit(f"Admin login failed ({admin_status}); reseed with bench/seed_dataset.py")
+    user_tokens = []
+    for user in users[:count]:
+        status, body = transports['storefront'].request('POST', '/login', *json_body({
+            'email': user['email'], 'password': seed_dataset.PASSWORD}))
+        if status == 200:
+            user_tokens.append((user['email'], json.loads(body)['token']))
+    if not user_tokens:
+        raise SystemExit("Customer login failed; reseed with bench/seed_dataset.py")
+    return user_tokens
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path, after_path, threshold):
+    with open(before_path) as f:
+        before = json.load(f)['endpoints']
+    with open(after_path) as f:
+        after = json.load(f)['endpoints']
+
+    regressions = []
+    print(f"{'endpoint':<34} {'p50 ms':>17} {'p95 ms':>17} {'rps':>17}")
+    for name in sorted(set(before) & set(after)):
+        old, new = before[name], after[name]
+        if not old['p95_ms'] or not new['p95_ms']:
+            continue
+        change = (new['p95_ms'] - old['p95_ms']) / old['p95_ms']
+        flag = ' <-- slower' if change > threshold else ''
+        if flag:
+            regressions.append(name)
+        print(f"{name:<34} {old['p50_ms']:>8.1f}>{new['p50_ms']:<8.1f} {old['p95_ms']:>8.1f}>{new['p95_ms']:<8.1f}"
+              f" {old['throughput_rps']:>8.1f}>{new['throughput_rps']:<8.1f}{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} endpoint(s) regressed by more than {threshold:.0%} at p95")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per endpoint")
+    parser.add_argument('--concurrency', type=int, default=8, help="client threads per endpoint")
+    parser.add_argument('--only', nargs='+', metavar='ENDPOINT', help="run only these endpoints (prefixes allowed)")
+    parser.add_argument('--admin-url', help="load a running admin server instead of the in-process app")
+    parser.add_argument('--storefront-url', help="load a running storefront server instead of the in-process app")
+    parser.add_argument('--seed', type=int, default=42, help="random seed for request choices")
+    parser.add_argument('--out', help="results file (default bench/results/<timestamp>.json)")
+    parser.add_argument('--list', action='store_true', help="list endpoint names and exit")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="diff two results files")
+    parser.add_argument('--threshold', type=float, default=0.10, help="p95 regression that fails --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    selected = endpoints()
+    if args.list:
+        print('\n'.join(selected))
+        return
+    if args.only:
+        selected = {name: spec for name, spec in selected.items()
+                    if any(name == prefix or name.startswith(prefix + '.') for prefix in args.only)}
+        if not selected:
+            raise SystemExit("No endpoint matches --only")
+
+    transports = {}
+    # The in-process apps only sign tokens for this run
+    os.environ.setdefault('SECRET_KEY', os.urandom(16).hex())
+    for name, url, path in (('admin', args.admin_url, 'admin/app.py'),
+                            ('storefront', args.storefront_url, 'user project/app.py')):
+        if url:
+            transports[name] = HttpTransport(url)
+        else:
+            transports[name] = InProcessTransport(load_module(f'{name}_app', os.path.join(ROOT, path)).create_app())
+
+    pool = ConnectionPool(db_config, size=4)
+    data = seed_dataset.load(pool)
+    ctx = Context(data, pool, login_tokens(transports, data['users'], count=20))
+
+    results = {}
+    for name, (app_name, build, ok_statuses) in selected.items():
+        results[name] = run_endpoint(
+            transports[app_name], build, ok_statuses, ctx, args.concurrency, args.duration, args.seed)
+        r = results[name]
+        print(f"{name:<34} {r['requests']:>7} req {r['throughput_rps']:>9.1f} rps  "
+              f"p50 {r['p50_ms'] or 0:>8.2f}  p95 {r['p95_ms'] or 0:>8.2f}  p99 {r['p99_ms'] or 0:>8.2f} ms"
+              + (f"  errors {r['errors']}" if r['errors'] else ''))
+    pool.close_all()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'mode': {name: type(transport).__name__ for name, transport in transports.items()},
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'seed': args.seed,
+            'dataset': {'products': len(data['products']), 'users': len(data['users']),
+                        'orders': len(data['order_ids'])},
+        },
+        'endpoints': results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime('%Y%m%dT%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {out}")
+
+
+if __name__ == '__main__':
+    main()
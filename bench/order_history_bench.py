@@ -0,0 +1,165 @@
+"""Latency of the customer order history endpoint, before vs. after.
+
+Seeds a scratch customer with many orders (two items each, spread over
+several years), then measures:
+
+* ``legacy``  - the previous implementation: user lookup, unbounded
+  four-table join, grouping every row in Python
+* ``cold``    - GET /orders/user/email/<email> with the history cache
+  invalidated before every request (one paginated query)
+* ``warm``    - the same request served from the per-customer cache
+
+    python bench/order_history_bench.py --orders 1000 --requests 200
+
+Needs the MySQL database from admin/db_config.py with migrations applied.
+The scratch rows are removed afterwards.
+"""
+import argparse
+import importlib.util
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+EMAIL = 'history-bench@example.invalid'
+
+
+def load_storefront():
+    # The app only signs tokens for this run
+    os.environ.setdefault('SECRET_KEY', os.urandom(16).hex())
+    spec = importlib.util.spec_from_file_location('storefront_app', os.path.join(ROOT, 'user project', 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def seed(connection, orders):
+    cursor = connection.cursor()
+    cursor.execute(
+        "INSERT INTO users (name, email, phone, address, role, password_hash) "
+        "VALUES ('History Bench', %s, '0000000000', '', 'user', 'x')",
+        (EMAIL,)
+    )
+    user_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO products (name, description, price, category, quantity, status) "
+        "VALUES (%s, 'order_history_bench.py', 10, 'bench', 0, 'out_of_stock')",
+        [('Bench cake',), ('Bench bread',)]
+    )
+    cursor.execute("SELECT product_id FROM products WHERE description = 'order_history_bench.py'")
+    product_ids = [row[0] for row in cursor.fetchall()]
+
+    start = datetime.now() - timedelta(days=3 * 365)
+    for n in range(orders):
+        cursor.execute(
+            "INSERT INTO orders (user_id, total_price, delivery_type, delivery_address, map_link, "
+            "payment_method, advance_payment, order_status, payment_status, created_at) "
+            "VALUES (%s, 20, 'delivery', 'Bench street', '', 'cod', 0, 'delivered', 'full paid', %s)",
+            (user_id, start + timedelta(hours=n * 26))
+        )
+        order_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (%s, %s, 1, 10)",
+            [(order_id, product_id) for product_id in product_ids]
+        )
+    connection.commit()
+    cursor.close()
+    return user_id, product_ids
+
+
+def cleanup(connection, user_id, product_ids):
+    cursor = connection.cursor()
+    cursor.execute(
+        "DELETE oi FROM order_items oi JOIN orders o ON o.order_id = oi.order_id WHERE o.user_id = %s",
+        (user_id,)
+    )
+    cursor.execute("DELETE FROM orders WHERE user_id = %s", (user_id,))
+    cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+    cursor.execute(
+        f"DELETE FROM products WHERE product_id IN ({', '.join(['%s'] * len(product_ids))})",
+        product_ids
+    )
+    connection.commit()
+    cursor.close()
+
+
+def legacy_fetch(connection, email):
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("SELECT user_id FROM users WHERE email = %s", (email,))
+    user_id = cursor.fetchone()['user_id']
+    cursor.execute("""
+        SELECT o.order_id, o.order_status, o.total_price, o.payment_status,
+               o.delivery_type, o.delivery_address, o.map_link,
+               oi.product_id, p.name AS product_name, p.status AS product_status,
+               p.image_url, oi.quantity, oi.price as item_price,
+               o.created_at as date
+        FROM orders o
+        JOIN order_items oi ON o.order_id = oi.order_id
+        JOIN products p ON oi.product_id = p.product_id
+        WHERE o.user_id = %s
+        ORDER BY o.created_at DESC
+    """, (user_id,))
+    orders = {}
+    for item in cursor.fetchall():
+        order = orders.setdefault(item['order_id'], {
+            'order_id': item['order_id'],
+            'date': item['date'].strftime('%Y-%m-%d %H:%M:%S'),
+            'products': [],
+        })
+        order['products'].append({'product_id': item['product_id'], 'price': float(item['item_price'])})
+    cursor.close()
+    return list(orders.values())
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return statistics.median(samples) * 1000, p99 * 1000
+
+
+def measure(fn, requests):
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    storefront = load_storefront()
+    client = storefront.app.test_client()
+    connection = storefront.db_pool.get_connection()
+    user_id, product_ids = seed(connection, args.orders)
+    try:
+        url = f'/orders/user/email/{EMAIL}'
+
+        def cold():
+            storefront.order_history_cache.invalidate(EMAIL)
+            assert client.get(url).status_code == 200
+
+        def warm():
+            assert client.get(url).status_code == 200
+
+        results = {
+            'legacy': measure(lambda: legacy_fetch(connection, EMAIL), args.requests),
+            'cold': measure(cold, args.requests),
+            'warm': measure(warm, args.requests),
+        }
+        print(f"GET /orders/user/email/<email>: customer with {args.orders} orders, {args.requests} requests each")
+        for name, (p50, p99) in results.items():
+            print(f"  {name:<7} p50={p50:8.2f} ms   p99={p99:8.2f} ms")
+    finally:
+        cleanup(connection, user_id, product_ids)
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
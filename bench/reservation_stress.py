@@ -0,0 +1,153 @@
+"""Concurrency stress test for the hot-product reservation engine.
+
+Creates a scratch product, then lets many threads reserve and confirm one
+unit at a time until the stock runs out (every fifth reservation is
+cancelled instead). It checks that nothing was oversold and that
+Products.quantity reconciles to stock - sold, and reports throughput with a
+single counter row vs. slotted counters:
+
+    python bench/reservation_stress.py --stock 500 --threads 32 --slots 1 8
+
+Needs the MySQL database from admin/db_config.py with migrations applied.
+The scratch product and its reservations are removed afterwards.
+"""
+import argparse
+import itertools
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'admin'))
+from db_config import db_config  # noqa: E402
+from bakes_common import inventory  # noqa: E402
+from bakes_common.db import ConnectionPool  # noqa: E402
+
+
+def create_product(pool, stock):
+    connection = pool.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "INSERT INTO products (name, description, price, category, quantity, status) "
+            "VALUES ('Stress test cake', 'reservation_stress.py', 1, 'stress-test', %s, 'in_stock')",
+            (stock,)
+        )
+        product_id = cursor.lastrowid
+        cursor.close()
+        connection.commit()
+        return product_id
+    finally:
+        connection.close()
+
+
+def cleanup(pool, product_id):
+    connection = pool.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM inventory_reservations WHERE product_id = %s", (product_id,))
+        cursor.execute("DELETE FROM inventory_slots WHERE product_id = %s", (product_id,))
+        cursor.execute("DELETE FROM products WHERE product_id = %s", (product_id,))
+        cursor.close()
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def worker(pool, product_id, order_ids, results, lock):
+    sold = cancelled = conflicts = 0
+    while True:
+        try:
+            reservation_id, _ = inventory.reserve(pool, {product_id: 1}, ttl=60)
+        except inventory.InsufficientStock:
+            break
+
+        order_id = next(order_ids)
+        connection = pool.get_connection()
+        try:
+            if order_id % 5 == 0:
+                inventory.release(connection, reservation_id)
+                cancelled += 1
+            else:
+                inventory.confirm(connection, reservation_id, order_id, {product_id: 1})
+                sold += 1
+            connection.commit()
+        except inventory.ReservationExpired:
+            connection.rollback()
+            conflicts += 1
+        finally:
+            connection.close()
+
+    with lock:
+        results['sold'] += sold
+        results['cancelled'] += cancelled
+        results['conflicts'] += conflicts
+
+
+def run(pool, stock, threads, slots):
+    product_id = create_product(pool, stock)
+    try:
+        connection = pool.get_connection()
+        if slots > 1:
+            inventory.enable_hot(connection, product_id, slots)
+        connection.commit()
+        connection.close()
+
+        results = {'sold': 0, 'cancelled': 0, 'conflicts': 0}
+        lock = threading.Lock()
+        order_ids = itertools.count(1)
+        workers = [
+            threading.Thread(target=worker, args=(pool, product_id, order_ids, results, lock))
+            for _ in range(threads)
+        ]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        connection = pool.get_connection()
+        inventory.reconcile(connection, [product_id])
+        connection.commit()
+        cursor = connection.cursor()
+        cursor.execute("SELECT quantity FROM products WHERE product_id = %s", (product_id,))
+        remaining = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT COALESCE(SUM(quantity), 0) FROM inventory_reservations "
+            "WHERE product_id = %s AND status = 'confirmed'",
+            (product_id,)
+        )
+        confirmed = int(cursor.fetchone()[0])
+        cursor.close()
+        connection.close()
+
+        oversold = confirmed > stock
+        consistent = remaining == stock - confirmed
+        print(
+            f"slots={slots:<3} threads={threads:<3} sold={confirmed:<5} cancelled={results['cancelled']:<5} "
+            f"remaining={remaining:<5} time={elapsed:.2f}s throughput={confirmed / elapsed:.1f} orders/s "
+            f"oversold={'YES' if oversold else 'no'} reconciled={'yes' if consistent else 'NO'}"
+        )
+        return not oversold and consistent
+    finally:
+        cleanup(pool, product_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stock', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--slots', type=int, nargs='+', default=[1, 8])
+    args = parser.parse_args()
+
+    pool = ConnectionPool(db_config, size=args.threads + 2, timeout=30)
+    ok = all([run(pool, args.stock, args.threads, slots) for slots in args.slots])
+    pool.close_all()
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Build and query times for the in-memory product search index.
+
+Builds a synthetic catalog shaped like the products table, indexes it with
+bakes_common.search.ProductIndex, and times a mix of queries: exact words,
+prefixes typed so far, misspellings, several words, and a category filter.
+
+    python bench/search_bench.py --products 5000 --repeat 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from bakes_common.repository import Product  # noqa: E402
+from bakes_common.search import ProductIndex  # noqa: E402
+
+CATEGORIES = ['cakes', 'breads', 'cookies', 'pastries', 'cupcakes', 'brownies', 'savouries', 'desserts']
+FLAVOURS = ['chocolate', 'vanilla', 'strawberry', 'butterscotch', 'red velvet', 'black forest', 'pineapple',
+            'mango', 'blueberry', 'coffee', 'caramel', 'almond', 'pistachio', 'lemon', 'orange', 'walnut',
+            'honey', 'cinnamon', 'cardamom', 'coconut', 'rose', 'saffron', 'hazelnut', 'banana', 'date']
+KINDS = {
+    'cakes': ['cake', 'truffle cake', 'cheesecake', 'sponge cake', 'layer cake'],
+    'breads': ['bread', 'loaf', 'bun', 'brioche', 'focaccia', 'sourdough'],
+    'cookies': ['cookie', 'biscuit', 'shortbread', 'macaron'],
+    'pastries': ['pastry', 'croissant', 'danish', 'eclair', 'puff'],
+    'cupcakes': ['cupcake', 'muffin'],
+    'brownies': ['brownie', 'blondie', 'fudge bar'],
+    'savouries': ['puff', 'roll', 'quiche', 'pie'],
+    'desserts': ['tart', 'mousse', 'pudding', 'trifle'],
+}
+DESCRIPTION_WORDS = ('freshly baked soft moist rich eggless premium classic homemade light fluffy crunchy '
+                     'glazed frosted topped filled buttery festive special gift box serves slice layered').split()
+
+QUERIES = [
+    ('exact', 'chocolate', None),
+    ('exact', 'brownie', None),
+    ('prefix', 'choc', None),
+    ('prefix', 'str', None),
+    ('fuzzy', 'chocolte', None),
+    ('fuzzy', 'butterscoth cake', None),
+    ('words', 'red velvet cake', None),
+    ('words', 'eggless chocolate truffle', None),
+    ('category', 'chocolate', 'cakes'),
+    ('browse', '', 'breads'),
+    ('miss', 'xylophone', None),
+]
+
+
+def catalog(count, rng):
+    products = []
+    for n in range(count):
+        category = rng.choice(CATEGORIES)
+        name = f"{rng.choice(FLAVOURS).title()} {rng.choice(KINDS[category]).title()}"
+        if rng.random() < 0.3:
+            name = f"{rng.choice(FLAVOURS).title()} {name}"
+        description = ' '.join(rng.choice(DESCRIPTION_WORDS) for _ in range(rng.randint(8, 20)))
+        products.append(Product(
+            n + 1, name, description, Decimal(f'{rng.uniform(2, 60):.2f}'), category, rng.randint(0, 200),
+            'in_stock' if rng.random() < 0.9 else 'out_of_stock', None, None, False,
+        ))
+    return products
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return result, statistics.median(samples) * 1e6, samples[int(len(samples) * 0.99) - 1] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--random-seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.random_seed)
+    products = catalog(args.products, rng)
+    index = ProductIndex()
+
+    started = time.perf_counter()
+    index.replace_all(products)
+    print(f"build    {args.products} products in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    _, median, _ = timed(lambda: index.upsert(rng.choice(products)), args.repeat)
+    print(f"upsert   {median:7.1f} us median")
+
+    print(f"\n{'kind':<9} {'query':<28} {'category':<9} {'hits':>6} {'median':>10} {'p99':>10}")
+    for kind, query, category in QUERIES:
+        result, median, p99 = timed(lambda: index.search(query, category, args.limit), args.repeat)
+        print(f"{kind:<9} {query!r:<28} {category or '-':<9} {result.total:>6} {median:8.1f}us {p99:8.1f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""Synthetic dataset for the load suite (bench/load_suite.py).
+
+Seeds products with real images in the image store, customers sharing one
+known password, an admin account, and a year of orders with 1-4 items
+each. Generation uses a fixed random seed, so two runs with the same
+arguments produce the same data. Every seeded row is tagged (product
+description ``bench-seed``, ``@bench.invalid`` emails), and ``cleanup``
+removes exactly those rows and the orders that reference them.
+
+    python bench/seed_dataset.py seed --products 500 --users 200 --orders 5000
+    python bench/seed_dataset.py cleanup
+
+Needs the MySQL database from admin/db_config.py with migrations applied.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'admin'))
+from db_config import db_config  # noqa: E402
+from bakes_common.auth import PasswordHasher  # noqa: E402
+from bakes_common.db import ConnectionPool  # noqa: E402
+from bakes_common.images import ImageStore, default_store_root  # noqa: E402
+
+MARKER = 'bench-seed'
+EMAIL_DOMAIN = 'bench.invalid'
+ADMIN_EMAIL = f'admin@{EMAIL_DOMAIN}'
+PASSWORD = 'bench-password'
+
+CATEGORIES = ['cakes', 'breads', 'cookies', 'pastries', 'cupcakes', 'brownies', 'pies', 'savouries']
+ORDER_STATUSES = ['pending', 'order confirmation', 'baked', 'shipped', 'delivered']
+PAYMENT_STATUSES = ['not paid', 'advance paid', 'full paid']
+IMAGE_COUNT = 24  # Distinct pictures shared by the products, like a real catalog
+BATCH = 500
+
+# 1x1 PNG used when Pillow is not installed
+_FALLBACK_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360f8cfc0f01f0005000201a5d1b4'
+    '2a0000000049454e44ae426082'
+)
+
+
+def make_image(n):
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        return _FALLBACK_PNG
+    rng = random.Random(n)
+    image = Image.new('RGB', (1200, 900), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(1200), rng.randrange(900)
+        draw.ellipse((x, y, x + rng.randrange(40, 300), y + rng.randrange(40, 300)),
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def _insert_batches(cursor, connection, statement, rows):
+    for start in range(0, len(rows), BATCH):
+        cursor.executemany(statement, rows[start:start + BATCH])
+        connection.commit()
+
+
+def seed(pool, image_store, products=500, users=200, orders=5000, random_seed=42):
+    rng = random.Random(random_seed)
+    started = time.perf_counter()
+
+    digests = [image_store.save(io.BytesIO(make_image(n))) for n in range(IMAGE_COUNT)]
+    # Every bench account shares one hash so seeding doesn't spend minutes in bcrypt
+    hasher = PasswordHasher(workers=1, rounds=int(os.environ.get('BCRYPT_ROUNDS', 12)))
+    password_hash = hasher.hash(PASSWORD)
+    hasher.shutdown()
+
+    connection = pool.get_connection()
+    try:
+        cursor = connection.cursor()
+        _insert_batches(cursor, connection, (
+            "INSERT INTO products (name, description, price, image_hash, category, quantity, status) "
+            "VALUES (%s, %s, %s, %s, %s, %s, 'in_stock')"
+        ), [
+            (f"Bench {CATEGORIES[n % len(CATEGORIES)][:-1]} {n}", MARKER, round(rng.uniform(2, 60), 2),
+             digests[n % len(digests)], CATEGORIES[n % len(CATEGORIES)], 1_000_000)
+            for n in range(products)
+        ])
+        cursor.execute("SELECT product_id, price FROM products WHERE description = %s", (MARKER,))
+        product_prices = dict(cursor.fetchall())
+
+        _insert_batches(cursor, connection, (
+            "INSERT INTO users (name, email, phone, address, role, password_hash) "
+            "VALUES (%s, %s, %s, %s, 'user', %s)"
+        ), [
+            (f"Bench customer {n}", f"customer{n}@{EMAIL_DOMAIN}", f"9{n:09d}", f"{n} Bench street", password_hash)
+            for n in range(users)
+        ])
+        cursor.execute("SELECT user_id FROM users WHERE email LIKE %s", (f'%@{EMAIL_DOMAIN}',))
+        user_ids = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute("DELETE FROM admins WHERE email = %s", (ADMIN_EMAIL,))
+        cursor.execute("INSERT INTO admins (email, password_hash) VALUES (%s, %s)", (ADMIN_EMAIL, password_hash))
+        connection.commit()
+
+        product_ids = sorted(product_prices)
+        first_day = datetime.now() - timedelta(days=365)
+        items = []
+        for n in range(orders):
+            lines = {pid: rng.randint(1, 3) for pid in rng.sample(product_ids, min(len(product_ids), rng.randint(1, 4)))}
+            total = sum(product_prices[pid] * quantity for pid, quantity in lines.items())
+            payment_status = rng.choice(PAYMENT_STATUSES)
+            cursor.execute(
+                "INSERT INTO orders (user_id, total_price, delivery_type, delivery_address, map_link, "
+                "payment_method, advance_payment, order_status, payment_status, created_at) "
+                "VALUES (%s, %s, %s, 'Bench street', '', 'cod', %s, %s, %s, %s)",
+                (rng.choice(user_ids), total, rng.choice(['delivery', 'pickup']),
+                 round(total / 2, 2) if payment_status == 'advance paid' else 0,
+                 rng.choice(ORDER_STATUSES), payment_status,
+                 first_day + timedelta(seconds=n * 365 * 86400 // max(orders, 1)))
+            )
+            order_id = cursor.lastrowid
+            items.extend((order_id, pid, quantity, product_prices[pid]) for pid, quantity in lines.items())
+            if len(items) >= BATCH:
+                _insert_batches(cursor, connection,
+                                "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (%s, %s, %s, %s)",
+                                items)
+                items = []
+        _insert_batches(cursor, connection,
+                        "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (%s, %s, %s, %s)",
+                        items)
+        cursor.close()
+    finally:
+        connection.close()
+
+    return {
+        'products': products, 'users': users, 'orders': orders, 'images': len(digests),
+        'random_seed': random_seed, 'seconds': round(time.perf_counter() - started, 1),
+    }
+
+
+def load(pool):
+    """The seeded rows the load suite needs to build requests."""
+    connection = pool.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(
+            # Rows added by the suite's own create endpoints have no image or stock
+            "SELECT product_id, name, price, category, image_hash FROM products "
+            "WHERE description = %s AND image_hash IS NOT NULL AND quantity > 0 ORDER BY product_id", (MARKER,))
+        products = cursor.fetchall()
+        cursor.execute("SELECT user_id, email FROM users WHERE email LIKE %s ORDER BY user_id", (f'%@{EMAIL_DOMAIN}',))
+        users = cursor.fetchall()
+        cursor.execute(
+            "SELECT o.order_id FROM orders o JOIN users u ON u.user_id = o.user_id "
+            "WHERE u.email LIKE %s ORDER BY o.order_id", (f'%@{EMAIL_DOMAIN}',))
+        order_ids = [row['order_id'] for row in cursor.fetchall()]
+        cursor.close()
+    finally:
+        connection.close()
+    if not products or not users or not order_ids:
+        raise SystemExit("No seeded data found; run: python bench/seed_dataset.py seed")
+    return {'products': products, 'users': users, 'order_ids': order_ids}
+
+
+def cleanup(pool):
+    connection = pool.get_connection()
+    try:
+        cursor = connection.cursor()
+        bench_users = "SELECT user_id FROM users WHERE email LIKE %s"
+        bench_products = "SELECT product_id FROM products WHERE description = %s"
+        like = f'%@{EMAIL_DOMAIN}'
+        cursor.execute(
+            f"DELETE oi FROM order_items oi JOIN orders o ON o.order_id = oi.order_id "
+            f"WHERE o.user_id IN ({bench_users}) OR oi.product_id IN ({bench_products})", (like, MARKER))
+        cursor.execute(f"DELETE FROM orders WHERE user_id IN ({bench_users})", (like,))
+        cursor.execute(f"DELETE FROM inventory_reservations WHERE product_id IN ({bench_products})", (MARKER,))
+        cursor.execute(f"DELETE FROM inventory_slots WHERE product_id IN ({bench_products})", (MARKER,))
+        cursor.execute("DELETE FROM products WHERE description = %s", (MARKER,))
+        cursor.execute("DELETE FROM users WHERE email LIKE %s", (like,))
+        cursor.execute("DELETE FROM admins WHERE email = %s", (ADMIN_EMAIL,))
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    seed_parser = commands.add_parser('seed')
+    seed_parser.add_argument('--products', type=int, default=500)
+    seed_parser.add_argument('--users', type=int, default=200)
+    seed_parser.add_argument('--orders', type=int, default=5000)
+    seed_parser.add_argument('--random-seed', type=int, default=42)
+    commands.add_parser('cleanup')
+    args = parser.parse_args()
+
+    pool = ConnectionPool(db_config, size=2)
+    try:
+        if args.command == 'seed':
+            cleanup(pool)  # Reseeding starts from the same state
+            image_store = ImageStore(default_store_root(), workers=2)
+            summary = seed(pool, image_store, args.products, args.users, args.orders, args.random_seed)
+            image_store.shutdown()
+            print(f"Seeded {summary}")
+        else:
+            cleanup(pool)
+            print("Removed the bench dataset")
+    finally:
+        pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Serialization time and bytes on the wire for the product and order payloads.
+
+Offline mode (the default) builds payloads shaped like GET /products and
+the customer order history, with Decimal prices and datetime stamps as
+MySQL returns them, and times three encoders:
+
+* ``legacy``  - the previous code path: a per-row float()/strftime() loop,
+  then json.dumps with Flask's default provider settings (sorted keys)
+* ``std``     - bakes_common.jsonio's encoder on the json module
+* ``orjson``  - bakes_common.jsonio's encoder on orjson (skipped if missing)
+
+For the orjson body it then reports the size and compression time for
+identity, gzip and brotli (if installed).
+
+    python bench/serialization_bench.py --products 500 --orders 200 --repeat 50
+
+Live mode fetches real endpoints with each Accept-Encoding and reports the
+bytes on the wire and response time:
+
+    python bench/serialization_bench.py --admin-url http://localhost:5001 \\
+        --storefront-url http://localhost:5000 --email customer0@bench.invalid
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from bakes_common import jsonio  # noqa: E402
+from bakes_common.streaming import BROTLI_QUALITY, GZIP_LEVEL, brotli, compress  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def product_payload(count, rng):
+    return [
+        {
+            'product_id': n + 1,
+            'name': f'Product {n}',
+            'description': 'A freshly baked product with a description of typical length. ' * 2,
+            'price': Decimal(f'{rng.uniform(2, 60):.2f}'),
+            'category': rng.choice(['cakes', 'breads', 'cookies', 'pastries']),
+            'quantity': rng.randint(0, 500),
+            'status': 'in_stock',
+            'image_url': f'http://localhost:5000/images/{n:064x}/card',
+            'thumbnail_url': f'http://localhost:5000/images/{n:064x}/thumb',
+        }
+        for n in range(count)
+    ]
+
+
+def order_payload(count, rng):
+    start = datetime(2024, 1, 1, 9, 0, 0)
+    return [
+        {
+            'order_id': n + 1,
+            'order_status': rng.choice(['pending', 'baked', 'delivered']),
+            'total_price': Decimal(f'{rng.uniform(10, 200):.2f}'),
+            'payment_status': rng.choice(['not paid', 'full paid']),
+            'delivery_type': 'delivery',
+            'delivery_address': f'{n} Bench street',
+            'map_link': '',
+            'date': start + timedelta(hours=n * 7),
+            'products': [
+                {
+                    'product_id': rng.randint(1, 500),
+                    'product_name': f'Product {rng.randint(1, 500)}',
+                    'product_status': 'in_stock',
+                    'image_url': None,
+                    'quantity': rng.randint(1, 3),
+                    'price': Decimal(f'{rng.uniform(2, 60):.2f}'),
+                }
+                for _ in range(rng.randint(1, 4))
+            ],
+        }
+        for n in range(count)
+    ]
+
+
+def legacy_encode(payload):
+    """What the routes did before: convert every value, then Flask's json.dumps."""
+    def convert(value):
+        if isinstance(value, dict):
+            return {key: convert(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [convert(item) for item in value]
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, datetime):
+            return value.strftime('%Y-%m-%d %H:%M:%S')
+        return value
+    return json.dumps(convert(payload), sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def std_encode(payload):
+    return json.dumps(payload, default=jsonio.default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def orjson_encode(payload):
+    return orjson.dumps(payload, default=jsonio.default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def timed(fn, payload, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn(payload)
+        samples.append(time.perf_counter() - started)
+    return body, statistics.median(samples) * 1000
+
+
+def offline(args):
+    rng = random.Random(args.random_seed)
+    payloads = {
+        'GET /products': product_payload(args.products, rng),
+        'GET /orders/user/email/<email>': order_payload(args.orders, rng),
+    }
+    encoders = [('legacy', legacy_encode), ('std', std_encode)]
+    if orjson is not None:
+        encoders.append(('orjson', orjson_encode))
+
+    for name, payload in payloads.items():
+        print(f"\n{name} ({len(payload)} rows, median of {args.repeat})")
+        body = None
+        for encoder_name, encoder in encoders:
+            body, ms = timed(encoder, payload, args.repeat)
+            print(f"  encode {encoder_name:<8} {ms:8.2f} ms  {len(body):>9,} bytes")
+
+        encodings = [('identity', None), ('gzip', 'gzip')]
+        if brotli is not None:
+            encodings.append(('br', 'br'))
+        for label, encoding in encodings:
+            if encoding is None:
+                print(f"  wire   {label:<8} {0:8.2f} ms  {len(body):>9,} bytes")
+                continue
+            compressed, ms = timed(lambda data: compress(data, encoding, GZIP_LEVEL, BROTLI_QUALITY), body, args.repeat)
+            print(f"  wire   {label:<8} {ms:8.2f} ms  {len(compressed):>9,} bytes "
+                  f"({len(compressed) / len(body):.0%})")
+
+
+def fetch(url, encoding):
+    request = urllib.request.Request(url, headers={'Accept-Encoding': encoding})
+    started = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        body = response.read()  # Still compressed: urllib doesn't decode
+        served = response.headers.get('Content-Encoding', 'identity')
+    return len(body), served, (time.perf_counter() - started) * 1000
+
+
+def live(args):
+    urls = []
+    if args.admin_url:
+        urls += [f'{args.admin_url}/products', f'{args.admin_url}/orders?limit=100']
+    if args.storefront_url:
+        urls.append(f'{args.storefront_url}/products')
+        if args.email:
+            urls.append(f'{args.storefront_url}/orders/user/email/{args.email}')
+
+    for url in urls:
+        print(f"\nGET {url}")
+        for encoding in ('identity', 'gzip', 'br'):
+            results = [fetch(url, encoding) for _ in range(args.repeat)]
+            size, served = results[-1][0], results[-1][1]
+            ms = statistics.median(result[2] for result in results)
+            print(f"  accept {encoding:<8} served {served:<8} {size:>9,} bytes  {ms:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--random-seed', type=int, default=42)
+    parser.add_argument('--admin-url')
+    parser.add_argument('--storefront-url')
+    parser.add_argument('--email', help="customer whose order history the live run fetches")
+    args = parser.parse_args()
+
+    if args.admin_url or args.storefront_url:
+        live(args)
+    else:
+        offline(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Gunicorn settings shared by both apps.
+
+Run these from the repository root:
+
+    PORT=5001 gunicorn -c gunicorn.conf.py --chdir admin wsgi:app
+    PORT=5000 gunicorn -c gunicorn.conf.py --chdir "user project" wsgi:app
+
+Each worker is a separate process that builds its own app through
+``create_app()``, with its own connection pool, image/bcrypt executors and
+background threads. Requests are served by a pool of threads in each
+worker (the ``gthread`` class). A worker blocked on MySQL or bcrypt keeps
+serving, and the worker count spreads the Python work over every core.
+
+Environment:
+    PORT / BIND              listen address (default 0.0.0.0:$PORT, PORT=8000)
+    WEB_CONCURRENCY          worker processes (default: one per CPU core)
+    GUNICORN_THREADS         request threads per worker (default 4)
+    GUNICORN_KEEPALIVE       seconds an idle keep-alive connection stays open (default 5)
+    GUNICORN_GRACEFUL_TIMEOUT  seconds a stopping worker gets to finish requests (default 30)
+    GUNICORN_MAX_REQUESTS    recycle a worker after this many requests (default 0, never)
+    DB_POOL_SIZE             per-worker pool; defaults to threads + 2 (sweeper or order feed, EXPLAIN)
+    SSE_MAX_STREAMS          admin live order streams per worker; defaults to half the threads
+    BCRYPT_MAX_PENDING       logins hashing at once per worker; defaults to a quarter of the threads,
+                             but never fewer than BCRYPT_WORKERS (default 2)
+
+MySQL must allow ``workers * DB_POOL_SIZE`` connections per app.
+
+``preload_app`` stays off on purpose. Preloading would build the app once
+in the master and fork it, and the forked workers would share the master's
+MySQL sockets while their background threads (log writer, inventory
+sweeper, image executor) are left behind in the master.
+
+Graceful shutdown: on SIGTERM a worker stops accepting, finishes its
+requests within ``graceful_timeout`` and then runs ``worker_exit`` below.
+That hook drains any stragglers and closes the app's pool and executors
+(bakes_common/lifecycle.py).
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', 8000)}")
+
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Every request thread may hold a connection, plus the sweeper (storefront)
+# or order feed (admin) and the slow-query EXPLAIN thread. Set before the
+# workers fork so they inherit it
+os.environ.setdefault('DB_POOL_SIZE', str(threads + 2))
+
+# An open /orders/events stream keeps its request thread; leave the other
+# half for ordinary requests. Raise GUNICORN_THREADS for more dashboards
+os.environ.setdefault('SSE_MAX_STREAMS', str(max(1, threads // 2)))
+
+# A login's request thread waits for bcrypt; keep most threads for the
+# product and order routes, but give every bcrypt process work (extra
+# logins wait briefly, then get 503)
+os.environ.setdefault('BCRYPT_MAX_PENDING', str(max(int(os.environ.get('BCRYPT_WORKERS', 2)), threads // 4)))
+
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# gthread workers heartbeat from their main loop, so long streamed exports
+# don't trip this; it only catches a worker that is truly stuck
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+preload_app = False
+
+# The apps log JSON lines to stderr themselves; gunicorn's access log would
+# duplicate them
+accesslog = None
+errorlog = '-'
+
+
+def worker_exit(server, worker):
+    app = getattr(worker, 'wsgi', None)
+    lifecycle = getattr(app, 'extensions', {}).get('lifecycle')
+    if lifecycle is not None:
+        lifecycle.shutdown()
@@ -0,0 +1,6 @@
+-- Product images move out of the Products row into the on-disk
+-- content-addressed store (bakes_common/images.py). image_hash is the
+-- SHA-256 of the original upload; image_data is kept only for rows not yet
+-- backfilled with admin/backfill_images.py.
+ALTER TABLE Products
+    ADD COLUMN image_hash CHAR(64) NULL;
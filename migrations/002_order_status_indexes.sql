@@ -0,0 +1,29 @@
+-- Canonical, non-null status columns so the admin filters can compare them
+-- directly (no LOWER()/COALESCE() around the column) and use an index.
+
+UPDATE Orders SET order_status = LOWER(TRIM(COALESCE(order_status, 'pending')));
+UPDATE Orders SET order_status = 'order confirmation' WHERE order_status = 'order_confirmation';
+UPDATE Orders SET payment_status = LOWER(TRIM(COALESCE(payment_status, 'not paid')));
+UPDATE Orders SET delivery_type = LOWER(TRIM(COALESCE(delivery_type, 'delivery')));
+
+ALTER TABLE Orders
+    MODIFY order_status ENUM('pending', 'order confirmation', 'baked', 'shipped', 'delivered')
+        NOT NULL DEFAULT 'pending',
+    MODIFY payment_status ENUM('not paid', 'advance paid', 'full paid')
+        NOT NULL DEFAULT 'not paid',
+    MODIFY delivery_type VARCHAR(20) NOT NULL DEFAULT 'delivery';
+
+-- Admin order filters; order_id last so keyset pages stay inside the index
+CREATE INDEX idx_orders_status ON Orders (order_status, order_id);
+CREATE INDEX idx_orders_payment_status ON Orders (payment_status, order_id);
+CREATE INDEX idx_orders_delivery_type ON Orders (delivery_type, order_id);
+CREATE INDEX idx_orders_created_at ON Orders (created_at, order_id);
+
+-- Customer order history
+CREATE INDEX idx_orders_user_created ON Orders (user_id, created_at);
+
+-- Joining orders to their items
+CREATE INDEX idx_order_items_order ON Order_Items (order_id, product_id);
+
+-- Storefront/admin category filter with keyset paging
+CREATE INDEX idx_products_category ON Products (category, product_id);
@@ -0,0 +1,29 @@
+-- Slotted stock counters for hot products and short-lived checkout
+-- reservations (bakes_common/inventory.py).
+--
+-- While a product has rows in inventory_slots its sellable stock lives in
+-- those rows, spread over several counters so concurrent orders lock
+-- different rows; Products.quantity is refreshed from their sum by the
+-- reconcile sweep.
+
+CREATE TABLE inventory_slots (
+    product_id INT NOT NULL,
+    slot SMALLINT NOT NULL,
+    quantity INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (product_id, slot)
+);
+
+-- slot is NULL when the stock was taken from the Products row itself
+CREATE TABLE inventory_reservations (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    reservation_id CHAR(32) NOT NULL,
+    product_id INT NOT NULL,
+    slot SMALLINT NULL,
+    quantity INT NOT NULL,
+    status ENUM('held', 'confirmed', 'released') NOT NULL DEFAULT 'held',
+    expires_at DATETIME NOT NULL,
+    order_id INT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_reservations_reservation (reservation_id),
+    KEY idx_reservations_expiry (status, expires_at)
+);
@@ -0,0 +1,8 @@
+-- Row version for conditional GETs on /orders/details/<id>: the ETag and
+-- Last-Modified come from this column through a primary-key lookup, and
+-- the order is only loaded when the client's copy is stale. MySQL bumps it
+-- on every UPDATE that changes the row (status, payment status).
+
+ALTER TABLE Orders
+    ADD COLUMN updated_at TIMESTAMP(3) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3);
@@ -0,0 +1,77 @@
+-- Change versions for GET /changes?since=<version> (bakes_common/changes.py).
+--
+-- change_log is the sequence: every insert or real update of a product or
+-- order adds a row, and its AUTO_INCREMENT version is stamped on the row
+-- as change_version. AUTO_INCREMENT doesn't hold a lock until commit (a
+-- single counter row would serialize every order). Deletes leave a
+-- tombstone (deleted = TRUE) with the id. Triggers catch every write path:
+-- routes, bulk import, the inventory sweeper and manual SQL.
+
+CREATE TABLE change_log (
+    version BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    entity ENUM('product', 'order') NOT NULL,
+    entity_id INT NULL,  -- Only recorded for tombstones
+    deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    changed_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    KEY idx_change_log_tombstones (entity, deleted, version)
+);
+
+-- Rows that exist before this migration keep version 0; clients pick them
+-- up with their initial full fetch
+ALTER TABLE Products
+    ADD COLUMN change_version BIGINT NOT NULL DEFAULT 0,
+    ADD INDEX idx_products_change_version (change_version);
+
+ALTER TABLE Orders
+    ADD COLUMN change_version BIGINT NOT NULL DEFAULT 0,
+    ADD INDEX idx_orders_change_version (change_version),
+    ADD INDEX idx_orders_user_change_version (user_id, change_version);
+
+DELIMITER //
+
+CREATE TRIGGER products_change_insert BEFORE INSERT ON Products FOR EACH ROW
+BEGIN
+    INSERT INTO change_log (entity) VALUES ('product');
+    SET NEW.change_version = LAST_INSERT_ID();
+END //
+
+-- No-op updates (the reconcile sweep rewriting an unchanged quantity)
+-- must not produce a change
+CREATE TRIGGER products_change_update BEFORE UPDATE ON Products FOR EACH ROW
+BEGIN
+    IF NOT (NEW.name <=> OLD.name AND NEW.description <=> OLD.description AND NEW.price <=> OLD.price
+            AND NEW.category <=> OLD.category AND NEW.quantity <=> OLD.quantity AND NEW.status <=> OLD.status
+            AND NEW.image_url <=> OLD.image_url AND NEW.image_hash <=> OLD.image_hash
+            AND NEW.image_data <=> OLD.image_data) THEN
+        INSERT INTO change_log (entity) VALUES ('product');
+        SET NEW.change_version = LAST_INSERT_ID();
+    END IF;
+END //
+
+CREATE TRIGGER products_change_delete AFTER DELETE ON Products FOR EACH ROW
+BEGIN
+    INSERT INTO change_log (entity, entity_id, deleted) VALUES ('product', OLD.product_id, TRUE);
+END //
+
+CREATE TRIGGER orders_change_insert BEFORE INSERT ON Orders FOR EACH ROW
+BEGIN
+    INSERT INTO change_log (entity) VALUES ('order');
+    SET NEW.change_version = LAST_INSERT_ID();
+END //
+
+CREATE TRIGGER orders_change_update BEFORE UPDATE ON Orders FOR EACH ROW
+BEGIN
+    IF NOT (NEW.order_status <=> OLD.order_status AND NEW.payment_status <=> OLD.payment_status
+            AND NEW.total_price <=> OLD.total_price AND NEW.advance_payment <=> OLD.advance_payment
+            AND NEW.delivery_type <=> OLD.delivery_type AND NEW.delivery_address <=> OLD.delivery_address) THEN
+        INSERT INTO change_log (entity) VALUES ('order');
+        SET NEW.change_version = LAST_INSERT_ID();
+    END IF;
+END //
+
+CREATE TRIGGER orders_change_delete AFTER DELETE ON Orders FOR EACH ROW
+BEGIN
+    INSERT INTO change_log (entity, entity_id, deleted) VALUES ('order', OLD.order_id, TRUE);
+END //
+
+DELIMITER ;
@@ -0,0 +1,18 @@
+-- Outbox for the admin live order feed (GET /orders/events,
+-- bakes_common/events.py).
+--
+-- place_order() and the admin status routes insert a row in the same
+-- transaction as the order write, so an event exists exactly when its
+-- change committed, whichever app or worker made it. Each admin worker
+-- polls this table once a second, whatever the number of open dashboards;
+-- the id is the SSE event id clients resume from. Rows older than
+-- ORDER_EVENTS_RETENTION (default one day) are pruned by the feed.
+
+CREATE TABLE order_events (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    type VARCHAR(32) NOT NULL,
+    order_id INT NOT NULL,
+    data JSON NOT NULL,
+    created_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    KEY idx_order_events_created_at (created_at)
+);
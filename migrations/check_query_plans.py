@@ -0,0 +1,77 @@
+"""EXPLAIN the hot queries and fail if any of them falls back to a full scan.
+
+    python migrations/check_query_plans.py
+
+Run it after migrate.py against a database with realistic row counts: on a
+handful of rows MySQL may legitimately prefer a table scan over an index.
+Exits with status 1 when a plan reads a base table with access type ALL.
+"""
+import os
+import sys
+from datetime import datetime
+
+import mysql.connector
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'admin'))
+from db_config import db_config  # noqa: E402
+from app import ORDER_FIELDS, build_next_page_query, build_order_export_query, build_orders_query  # noqa: E402
+from bakes_common import changes, repository  # noqa: E402
+
+ORDER_COLUMNS = list(ORDER_FIELDS.values())
+
+
+def hot_queries():
+    yield "admin orders, first page", build_orders_query(ORDER_COLUMNS, {}, limit=50)
+    yield "admin orders, next page", build_orders_query(ORDER_COLUMNS, {}, after_id=1000, limit=50)
+    yield "admin orders, next-page probe", build_next_page_query({'order_status': 'baked'}, limit=50)
+    yield "admin orders by status", build_orders_query(ORDER_COLUMNS, {'order_status': 'baked'}, limit=50)
+    yield "admin orders by payment", build_orders_query(ORDER_COLUMNS, {'payment_status': 'not paid'}, limit=50)
+    yield "admin orders by delivery type", build_orders_query(ORDER_COLUMNS, {'delivery_type': 'pickup'}, limit=50)
+    yield "accounting export window", build_order_export_query(
+        datetime(2024, 1, 1), datetime(2025, 1, 1), after_id=1000, window=1000)
+    yield "customer order history", repository.order_history_query(20, user_id=1)
+    yield "customer order history by email", repository.order_history_query(20, email='customer@example.com')
+    yield "customer order history, next page", repository.order_history_query(
+        20, user_id=1, before=(datetime(2025, 1, 1), 1000))
+    yield "order details, version check", (repository.ORDER_VERSION_SQL, [1])
+    yield "order details", (repository.ORDER_DETAILS_SQL, [1])
+    yield "products by category", (repository.list_products_sql(True, False, False, True), ['cakes', 51])
+    yield "products by category, next page", (
+        repository.list_products_sql(True, False, True, True), ['cakes', 1000, 51])
+    yield "product changes since", (repository.PRODUCTS_CHANGED_SQL, [1000, 501])
+    yield "customer order changes since", (changes.orders_changed_sql(True), [1000, 1, 501])
+    yield "product tombstones since", (changes.TOMBSTONES_SQL, ['product', 1000, 501])
+
+
+def full_scans(cursor, query, params):
+    cursor.execute("EXPLAIN " + query, params)
+    return [
+        row for row in cursor.fetchall()
+        # <derivedN>/<subqueryN> are the small materialized page, not a base table
+        if row['type'] == 'ALL' and not (row['table'] or '').startswith('<')
+    ]
+
+
+def main():
+    connection = mysql.connector.connect(**db_config)
+    failed = False
+    try:
+        cursor = connection.cursor(dictionary=True)
+        for name, (query, params) in hot_queries():
+            scans = full_scans(cursor, query, params)
+            if scans:
+                failed = True
+                tables = ', '.join(f"{row['table']} (~{row['rows']} rows)" for row in scans)
+                print(f"FAIL  {name}: full scan of {tables}")
+            else:
+                print(f"ok    {name}")
+        cursor.close()
+    finally:
+        connection.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Apply the numbered *.sql files in this directory that have not run yet.
+
+    python migrations/migrate.py          # apply pending migrations
+    python migrations/migrate.py --list   # show applied/pending
+
+Applied versions are recorded in the schema_migrations table, so running it
+again is a no-op.
+"""
+import os
+import re
+import sys
+
+import mysql.connector
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(MIGRATIONS_DIR, '..', 'admin'))
+from db_config import db_config  # noqa: E402
+
+_FILENAME_RE = re.compile(r'^(\d+)_.+\.sql$')
+
+
+def migration_files():
+    files = []
+    for name in os.listdir(MIGRATIONS_DIR):
+        match = _FILENAME_RE.match(name)
+        if match:
+            files.append((int(match.group(1)), name))
+    return sorted(files)
+
+
+def split_statements(sql):
+    """Statements split on ``;``, or on the delimiter set by a ``DELIMITER //``
+    line as in the mysql client (trigger bodies contain semicolons)."""
+    statements, block, delimiter = [], [], ';'
+
+    def flush():
+        statements.extend(s.strip() for s in '\n'.join(block).split(delimiter) if s.strip())
+        block.clear()
+
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('--'):
+            continue
+        if stripped.upper().startswith('DELIMITER '):
+            flush()
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        block.append(line)
+    flush()
+    return statements
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(list_only=False):
+    connection = mysql.connector.connect(**db_config)
+    try:
+        cursor = connection.cursor()
+        applied = applied_versions(cursor)
+        for version, name in migration_files():
+            if version in applied:
+                print(f"  applied  {name}")
+                continue
+            if list_only:
+                print(f"  pending  {name}")
+                continue
+
+            print(f"Applying {name}...")
+            with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+                statements = split_statements(f.read())
+            # MySQL commits DDL implicitly, so each file must be safe to
+            # resume by hand if one of its statements fails
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+            connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    migrate(list_only='--list' in sys.argv)
@@ -0,0 +1,577 @@
+import csv
+import importlib.util
+import io
+import json
+import os
+import runpy
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def load_app(monkeypatch, directory, module_name):
+    monkeypatch.setenv('SECRET_KEY', 'test-secret')
+    monkeypatch.setenv('CACHE_BACKEND', 'local')
+    # The admin app imports db_config from its own directory
+    monkeypatch.syspath_prepend(os.path.join(ROOT, directory))
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(ROOT, directory, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Calls:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def execute(self, sql, params=()):
+        sql = ' '.join(sql.split())
+        self.connection.executed.append((sql, params))
+        result = self.connection.respond(sql, params)
+        # A responder answers a read with its rows and a write with its rowcount
+        if isinstance(result, int):
+            self.rows, self.rowcount = [], result
+        else:
+            self.rows, self.rowcount = list(result or []), len(result or [])
+        self.lastrowid = self.connection.lastrowid
+
+    def executemany(self, sql, seq_params):
+        self.execute(sql, list(seq_params))
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """A pooled connection whose statements are answered by ``respond(sql, params)``."""
+
+    def __init__(self, respond, lastrowid=None):
+        self.respond = respond
+        self.lastrowid = lastrowid
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, dictionary=False, **kwargs):
+        return FakeCursor(self)
+
+    def prepared(self, sql):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+    def statements(self, prefix):
+        return [(sql, params) for sql, params in self.executed if sql.startswith(prefix)]
+
+
+@pytest.fixture
+def storefront(monkeypatch):
+    module = load_app(monkeypatch, 'user project', 'storefront_app_under_test')
+    monkeypatch.setattr(module.inventory_sweeper, 'start', Calls())
+    monkeypatch.setattr(module.product_search, 'build', Calls())
+    return module
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    module = load_app(monkeypatch, 'admin', 'admin_app_under_test')
+    monkeypatch.setattr(module.order_feed, 'start', Calls())
+    return module
+
+
+def test_storefront_create_app_is_idempotent(storefront):
+    app = storefront.create_app()
+    lifecycle = app.extensions['lifecycle']
+    assert storefront.create_app() is app
+    assert app.extensions['lifecycle'] is lifecycle
+    assert storefront.inventory_sweeper.start.count == 1
+    assert storefront.product_search.build.count == 1
+    assert len(lifecycle._closers) == len({name for name, _ in lifecycle._closers})
+    assert app.test_client().get('/health/ready').status_code == 200
+    lifecycle.shutdown(timeout=0)
+
+
+def test_admin_create_app_is_idempotent(admin):
+    app = admin.create_app()
+    lifecycle = app.extensions['lifecycle']
+    assert admin.create_app() is app
+    assert app.extensions['lifecycle'] is lifecycle
+    assert admin.order_feed.start.count == 1
+    assert [name for name, _ in lifecycle._closers][0] == 'db pool'  # Closed last
+    lifecycle.shutdown(timeout=0)
+
+
+def history_page(name='Plum Cake', status='in_stock'):
+    products = [{'product_id': 3, 'product_name': name, 'product_status': status, 'image_url': None,
+                 'quantity': 1, 'price': 12}]
+    orders = [{'order_id': 9, 'order_status': 'pending', 'products': products}]
+    return orders
+
+
+def test_order_history_etag_follows_the_products_shown_not_the_catalog(storefront, monkeypatch):
+    page = {'orders': history_page()}
+    monkeypatch.setattr(storefront, 'load_order_history', lambda *args, **kwargs: {
+        'user_found': True, 'orders': page['orders'], 'next': None,
+        'products_tag': storefront.products_tag(page['orders'])})
+    client = storefront.app.test_client()
+    url = '/orders/user/email/a@example.com'
+
+    first = client.get(url)
+    assert first.status_code == 200
+    tag = first.headers['ETag']
+
+    # Stock moved somewhere in the catalog: still a 304
+    storefront.catalog_cache.invalidate()
+    assert client.get(url, headers={'If-None-Match': tag}).status_code == 304
+
+    # A product on the page was renamed
+    page['orders'] = history_page(name='Plum Tart')
+    storefront.order_history_cache.invalidate('a@example.com')
+    renamed = client.get(url, headers={'If-None-Match': tag})
+    assert renamed.status_code == 200
+    assert renamed.headers['ETag'] != tag
+
+
+def test_products_tag_ignores_fields_the_page_does_not_show(storefront):
+    orders = history_page()
+    tag = storefront.products_tag(orders)
+    orders[0]['order_status'] = 'baked'
+    orders[0]['products'][0]['quantity'] = 2
+    assert storefront.products_tag(orders) == tag
+    assert storefront.products_tag(history_page(status='out_of_stock')) != tag
+
+
+@pytest.fixture
+def gunicorn_settings(monkeypatch):
+    for name in ('BIND', 'PORT', 'WEB_CONCURRENCY', 'GUNICORN_THREADS', 'DB_POOL_SIZE', 'SSE_MAX_STREAMS',
+                 'BCRYPT_MAX_PENDING', 'BCRYPT_WORKERS'):
+        # setenv first so the settings file's setdefault()s are undone afterwards
+        monkeypatch.setenv(name, '')
+        monkeypatch.delenv(name)
+    monkeypatch.setenv('GUNICORN_THREADS', '8')
+    return runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+
+
+def test_gunicorn_settings(gunicorn_settings):
+    assert gunicorn_settings['worker_class'] == 'gthread'
+    assert gunicorn_settings['threads'] == 8
+    assert gunicorn_settings['bind'] == '0.0.0.0:8000'
+    assert gunicorn_settings['preload_app'] is False
+    # Per-worker limits derived from the thread count
+    assert os.environ['DB_POOL_SIZE'] == '10'
+    assert os.environ['SSE_MAX_STREAMS'] == '4'
+    assert os.environ['BCRYPT_MAX_PENDING'] == '2'
+
+
+def test_gunicorn_config_is_accepted_by_gunicorn(gunicorn_settings):
+    config = pytest.importorskip('gunicorn.config').Config()
+    for name, value in gunicorn_settings.items():
+        if name in config.settings:
+            config.set(name, value)
+    assert config.worker_class_str == 'gthread'
+    assert config.threads == 8
+    assert config.worker_exit is gunicorn_settings['worker_exit']
+
+
+def test_worker_exit_shuts_the_app_down(gunicorn_settings):
+    shutdowns = Calls()
+    app = SimpleNamespace(extensions={'lifecycle': SimpleNamespace(shutdown=shutdowns)})
+    gunicorn_settings['worker_exit'](None, SimpleNamespace(wsgi=app))
+    assert shutdowns.count == 1
+    # A worker that never loaded the app has nothing to shut down
+    gunicorn_settings['worker_exit'](None, SimpleNamespace())
+
+
+@pytest.mark.parametrize('body', [
+    {'items': [{'product_id': 3}]},
+    {'items': [{'product_id': 3, 'quantity': 'two'}]},
+    {'items': [{'product_id': 3, 'quantity': 0}]},
+    {'items': [{'product_id': 3, 'quantity': 1}], 'ttl': 'soon'},
+])
+def test_reservation_rejects_malformed_requests(storefront, body):
+    response = storefront.app.test_client().post('/reservations', json=body)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('requested, held', [(-5, 1), (0, 1), (30, 30), (10 ** 6, 600)])
+def test_reservation_ttl_is_clamped(storefront, monkeypatch, requested, held):
+    ttls = []
+
+    def reserve(pool, quantities, ttl):
+        ttls.append(ttl)
+        return 'r1', datetime(2026, 1, 1)
+
+    monkeypatch.setattr(storefront.inventory, 'reserve', reserve)
+    response = storefront.app.test_client().post(
+        '/reservations', json={'items': [{'product_id': 3, 'quantity': 1}], 'ttl': requested})
+    assert response.status_code == 201
+    assert ttls == [held]
+
+
+def test_legacy_product_image_moves_into_the_store_once(admin, monkeypatch):
+    saved = []
+    monkeypatch.setattr(admin.image_store, 'save', lambda stream, **kwargs: saved.append(stream.read()) or 'ab' * 32)
+    row = {'image_hash': None, 'image_data': b'\x89PNG\r\n\x1a\nlegacy'}
+
+    def respond(sql, params):
+        if sql.startswith('SELECT image_hash'):
+            return [{'image_hash': row['image_hash']}]
+        if sql.startswith('SELECT image_data'):
+            return [{'image_data': row['image_data']}]
+        if sql.startswith('UPDATE Products SET image_hash'):
+            row.update(image_hash=params[0], image_data=None)
+            return 1
+        raise AssertionError(sql)
+
+    connection = FakeConnection(respond)
+    monkeypatch.setattr(admin, 'get_db_connection', lambda: connection)
+    client = admin.app.test_client()
+
+    for _ in range(2):
+        response = client.get('/products/7/image')
+        assert response.status_code == 302
+        assert response.headers['Location'].endswith('/images/' + 'ab' * 32 + '/full')
+    assert saved == [b'\x89PNG\r\n\x1a\nlegacy']
+    assert len(connection.statements('SELECT image_data')) == 1
+    assert not [sql for sql, _ in connection.executed if 'SHA1' in sql]
+
+
+def test_product_image_404s_without_a_product_or_image(admin, monkeypatch):
+    rows = {'SELECT image_hash': [], 'SELECT image_data': [{'image_data': None}]}
+    connection = FakeConnection(lambda sql, params: rows[' '.join(sql.split()[:2])])
+    monkeypatch.setattr(admin, 'get_db_connection', lambda: connection)
+    client = admin.app.test_client()
+    assert client.get('/products/7/image').status_code == 404
+
+    rows['SELECT image_hash'] = [{'image_hash': None}]
+    assert client.get('/products/7/image').status_code == 404
+
+
+class Shop:
+    """Products table behind a faked connection, as place_order sees it."""
+
+    def __init__(self, stock, slots=None, deleted_before_lock=(), hot_before_lock=(), decremented=None):
+        self.stock = stock
+        self.slots = slots or {}
+        self.deleted_before_lock = set(deleted_before_lock)
+        self.hot_before_lock = set(hot_before_lock)
+        self.decremented = decremented
+
+    def respond(self, sql, params):
+        if sql.startswith('SELECT user_id FROM users'):
+            return [(1,)]
+        if sql.startswith('SELECT p.product_id, COUNT(s.slot)'):
+            return [{'product_id': pid, 'slots': self.slots.get(pid, 0)} for pid in params if pid in self.stock]
+        if sql.startswith('SELECT p.product_id, p.quantity'):
+            assert sql.endswith('ORDER BY p.product_id FOR UPDATE')
+            return [{'product_id': pid, 'quantity': self.stock[pid],
+                     'slots': 4 if pid in self.hot_before_lock else self.slots.get(pid, 0)}
+                    for pid in params if pid in self.stock and pid not in self.deleted_before_lock]
+        if sql.startswith('UPDATE products'):
+            return self.decremented if self.decremented is not None else len(params) // 5
+        if sql.startswith('INSERT INTO'):
+            return 1
+        raise AssertionError(sql)
+
+
+@pytest.fixture
+def checkout(storefront, monkeypatch):
+    taken = []
+    monkeypatch.setattr(storefront.inventory, 'take_from_slots',
+                        lambda connection, pid, quantity, slots: taken.append((pid, quantity, slots)))
+
+    def place(shop, items):
+        connection = FakeConnection(shop.respond, lastrowid=50)
+        monkeypatch.setattr(storefront, 'get_db_connection', lambda: connection)
+        response = storefront.app.test_client().post(
+            '/orders', json={'email': 'a@example.com', 'items': items})
+        return response, connection
+
+    place.taken = taken
+    return place
+
+
+def cart(*lines):
+    return [{'product_id': pid, 'quantity': quantity, 'price': 10} for pid, quantity in lines]
+
+
+def test_place_order_locks_products_in_key_order_and_decrements_once(checkout):
+    response, connection = checkout(Shop({3: 5, 4: 1}), cart((4, 1), (3, 1), (3, 2)))
+    assert response.status_code == 201
+    assert response.get_json()['order_id'] == 50
+    [(_, locked)] = connection.statements('SELECT p.product_id, p.quantity')
+    assert locked == [3, 4]
+    [(_, decrement)] = connection.statements('UPDATE products')
+    assert decrement[:4] == [3, 3, 4, 1]  # Same-product lines summed
+    [(_, lines)] = connection.statements('INSERT INTO order_items')
+    assert len(lines) == 3
+    assert (connection.commits, connection.rollbacks) == (1, 0)
+
+
+def test_place_order_rejects_insufficient_stock_seen_under_the_lock(checkout):
+    response, connection = checkout(Shop({3: 2, 4: 9}), cart((3, 2), (4, 1), (3, 1)))
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Insufficient stock for product ID 3"}
+    assert connection.statements('UPDATE products') == []
+    assert connection.statements('INSERT INTO order_items') == []
+    assert (connection.commits, connection.rollbacks) == (0, 1)
+
+
+def test_place_order_rejects_an_unknown_product_before_inserting(checkout):
+    response, connection = checkout(Shop({3: 5}), cart((3, 1), (8, 1)))
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Product with ID 8 does not exist"}
+    assert connection.statements('INSERT INTO orders') == []
+    assert connection.commits == 0
+
+
+def test_place_order_rechecks_a_product_deleted_before_the_lock(checkout):
+    response, connection = checkout(Shop({3: 5, 4: 5}, deleted_before_lock=[4]), cart((3, 1), (4, 1)))
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Product with ID 4 does not exist"}
+    assert (connection.commits, connection.rollbacks) == (0, 1)
+
+
+def test_place_order_takes_a_product_made_hot_before_the_lock_from_its_slots(checkout):
+    response, connection = checkout(Shop({3: 5, 4: 5}, hot_before_lock=[4]), cart((3, 1), (4, 2)))
+    assert response.status_code == 201
+    [(_, decrement)] = connection.statements('UPDATE products')
+    assert decrement == [3, 1, 3, 3, 1]  # Only the regular product
+    assert checkout.taken == [(4, 2, 4)]
+
+
+def test_place_order_gives_up_when_the_guarded_decrement_misses(checkout):
+    response, connection = checkout(Shop({3: 5, 4: 5}, decremented=1), cart((3, 1), (4, 1)))
+    assert response.status_code == 409
+    assert connection.statements('INSERT INTO order_items') == []
+    assert (connection.commits, connection.rollbacks) == (0, 1)
+
+
+def test_bulk_status_update_reports_each_order_and_skips_unknown_ids(admin, monkeypatch):
+    orders = {1: ('pending', 'not paid'), 2: ('baked', 'not paid')}
+
+    def respond(sql, params):
+        if sql.startswith('SELECT order_id, order_status, payment_status FROM Orders'):
+            assert sql.endswith('FOR UPDATE')
+            return [(order_id,) + orders[order_id] for order_id in params if order_id in orders]
+        if sql.startswith('UPDATE Orders'):
+            return len(params) - 1
+        if sql.startswith('INSERT INTO order_events'):
+            return len(params)
+        if sql.startswith('SELECT DISTINCT Users.email'):
+            return [('A@example.com',)]
+        raise AssertionError(sql)
+
+    connection = FakeConnection(respond)
+    monkeypatch.setattr(admin, 'get_db_connection', lambda: connection)
+    invalidated = []
+    monkeypatch.setattr(admin.order_history_cache, 'invalidate', invalidated.append)
+
+    response = admin.app.test_client().put('/orders/status', json={'order_ids': [1, 99, 2, 1], 'status': 'baked'})
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'success': True,
+        'updated': 1,
+        'not_found': 1,
+        'results': [
+            {'order_id': 1, 'result': 'updated'},
+            {'order_id': 99, 'result': 'not_found'},
+            {'order_id': 2, 'result': 'unchanged'},
+        ],
+    }
+    [(_, update)] = connection.statements('UPDATE Orders')
+    assert update == ['baked', 1]  # Neither the unknown nor the unchanged order
+    [(_, published)] = connection.statements('INSERT INTO order_events')
+    assert [row[:2] for row in published] == [(admin.events.ORDER_STATUS_CHANGED, 1)]
+    assert connection.commits == 1
+    assert invalidated == ['a@example.com']
+
+
+def test_bulk_status_update_with_only_unknown_ids_changes_nothing(admin, monkeypatch):
+    connection = FakeConnection(lambda sql, params: [] if sql.startswith('SELECT') else pytest.fail(sql))
+    monkeypatch.setattr(admin, 'get_db_connection', lambda: connection)
+
+    response = admin.app.test_client().put(
+        '/orders/status', json={'order_ids': [98, 99], 'payment_status': 'full paid'}
+    )
+    assert response.get_json()['results'] == [
+        {'order_id': 98, 'result': 'not_found'}, {'order_id': 99, 'result': 'not_found'}]
+    assert response.get_json()['updated'] == 0
+    assert connection.statements('UPDATE') == []
+
+
+@pytest.mark.parametrize('body', [
+    {'order_ids': [], 'status': 'baked'},
+    {'order_ids': ['1'], 'status': 'baked'},
+    {'order_ids': [True], 'status': 'baked'},
+    {'order_ids': [1]},
+    {'order_ids': [1], 'status': 'burnt'},
+    {'order_ids': [1], 'payment_status': 'maybe'},
+])
+def test_bulk_status_update_rejects_bad_requests(admin, monkeypatch, body):
+    monkeypatch.setattr(admin, 'get_db_connection', lambda: pytest.fail("no connection for a bad request"))
+    assert admin.app.test_client().put('/orders/status', json=body).status_code == 400
+
+
+def export_row(order_id, product_id=None, quantity=None, item_price=None, **order):
+    row = {
+        'order_id': order_id, 'created_at': datetime(2025, 1, order_id, 9, 30), 'customer_name': 'Ann',
+        'email': 'ann@example.com', 'order_status': 'delivered', 'payment_status': 'advance paid',
+        'payment_method': 'cod', 'delivery_type': 'pickup', 'total_price': 30, 'advance_payment': 10,
+        'product_id': product_id, 'product_name': product_id and f'Cake {product_id}',
+        'quantity': quantity, 'item_price': item_price,
+    }
+    row.update(order)
+    return row
+
+
+EXPORT_ROWS = [
+    export_row(1, 3, 2, 10),
+    export_row(1, 4, 1, 10),
+    export_row(2, advance_payment=None, total_price=None, customer_name=None),  # No items, no user
+    export_row(3, 3, 1, 12, total_price=12, advance_payment=0, customer_name='Bo, "the baker"'),
+]
+
+
+@pytest.fixture
+def export(admin, monkeypatch):
+    """Runs generate_order_export over EXPORT_ROWS, two orders per window."""
+    connections = []
+
+    def respond(sql, params):
+        after_id, window = params[0], params[-1]
+        order_ids = sorted({row['order_id'] for row in EXPORT_ROWS if row['order_id'] > after_id})[:window]
+        return [dict(row) for row in EXPORT_ROWS if row['order_id'] in order_ids]
+
+    def get_connection():
+        connections.append(FakeConnection(respond))
+        return connections[-1]
+
+    monkeypatch.setattr(admin, 'db_pool', SimpleNamespace(get_connection=get_connection))
+    monkeypatch.setattr(admin, 'ORDER_EXPORT_WINDOW', 2)
+    monkeypatch.setattr(admin, 'ORDER_STREAM_BATCH', 1)
+
+    def run(fmt):
+        return ''.join(admin.generate_order_export(fmt, None, None))
+
+    run.connections = connections
+    return run
+
+
+def test_csv_export_has_one_line_per_item_with_the_order_repeated(export):
+    lines = list(csv.reader(io.StringIO(export('csv'))))
+    assert lines == [
+        ['order_id', 'created_at', 'customer_name', 'email', 'order_status', 'payment_status', 'payment_method',
+         'delivery_type', 'total_price', 'advance_payment', 'balance_due',
+         'product_id', 'product_name', 'quantity', 'item_price', 'line_total'],
+        ['1', '2025-01-01 09:30:00', 'Ann', 'ann@example.com', 'delivered', 'advance paid', 'cod', 'pickup',
+         '30', '10', '20', '3', 'Cake 3', '2', '10', '20'],
+        ['1', '2025-01-01 09:30:00', 'Ann', 'ann@example.com', 'delivered', 'advance paid', 'cod', 'pickup',
+         '30', '10', '20', '4', 'Cake 4', '1', '10', '10'],
+        ['2', '2025-01-02 09:30:00', '', 'ann@example.com', 'delivered', 'advance paid', 'cod', 'pickup',
+         '0', '0', '0', '', '', '', '', ''],
+        ['3', '2025-01-03 09:30:00', 'Bo, "the baker"', 'ann@example.com', 'delivered', 'advance paid', 'cod',
+         'pickup', '12', '0', '12', '3', 'Cake 3', '1', '12', '12'],
+    ]
+    # Two windows of two orders, each on its own connection, then nothing left
+    assert [params[0] for connection in export.connections for _, params in connection.executed] == [0, 2]
+
+
+def test_ndjson_export_nests_items_under_each_order(export):
+    orders = [json.loads(line) for line in export('ndjson').splitlines()]
+    assert [order['order_id'] for order in orders] == [1, 2, 3]
+    assert orders[0]['balance_due'] == 20
+    assert orders[0]['items'] == [
+        {'product_id': 3, 'product_name': 'Cake 3', 'quantity': 2, 'item_price': 10, 'line_total': 20},
+        {'product_id': 4, 'product_name': 'Cake 4', 'quantity': 1, 'item_price': 10, 'line_total': 10},
+    ]
+    assert orders[1]['items'] == []
+    assert orders[1]['created_at'] == '2025-01-02 09:30:00'
+
+
+def product_form(**fields):
+    form = {'name': 'Plum Cake', 'description': 'Seasonal', 'price': '12.5', 'category': 'cakes', 'quantity': '4',
+            'image': (io.BytesIO(b'\x89PNG\r\n\x1a\nplum'), 'plum.png')}
+    form.update(fields)
+    return form
+
+
+@pytest.fixture
+def new_product(admin, monkeypatch):
+    saved = []
+
+    def save(stream, **kwargs):
+        saved.append(stream.read())
+        return 'cd' * 32
+
+    monkeypatch.setattr(admin.image_store, 'save', save)
+
+    def post(respond, **fields):
+        connection = FakeConnection(respond, lastrowid=12)
+        monkeypatch.setattr(admin, 'get_db_connection', lambda: connection)
+        response = admin.app.test_client().post('/products', data=product_form(**fields),
+                                                content_type='multipart/form-data')
+        return response, connection
+
+    post.saved = saved
+    return post
+
+
+def test_add_product_stores_the_image_after_the_insert(new_product):
+    response, connection = new_product(lambda sql, params: 1)
+    assert response.status_code == 201
+    assert response.get_json()['product_id'] == 12
+    assert new_product.saved == [b'\x89PNG\r\n\x1a\nplum']
+    assert [sql.split(' ', 1)[0] for sql, _ in connection.executed] == ['INSERT', 'UPDATE']
+    assert connection.executed[1][1] == ('cd' * 32, 12)
+    assert connection.commits == 1
+
+
+def test_add_product_leaves_no_image_behind_when_the_insert_fails(admin, new_product):
+    def respond(sql, params):
+        raise admin.mysql.connector.Error("Data too long for column 'name'")
+
+    response, connection = new_product(respond)
+    assert response.status_code == 500
+    assert new_product.saved == []
+    assert (connection.commits, connection.rollbacks) == (0, 1)
+
+
+def test_add_product_rejects_a_bad_price_before_storing_anything(admin, monkeypatch, new_product):
+    monkeypatch.setattr(admin, 'get_db_connection', lambda: pytest.fail("no connection for a bad request"))
+    response = admin.app.test_client().post('/products', data=product_form(price='twelve'),
+                                            content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert new_product.saved == []
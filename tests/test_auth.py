@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from bakes_common import auth, config
+from bakes_common.auth import HasherBusy, PasswordHasher
+
+
+def test_secret_key_is_required_outside_debug(monkeypatch):
+    monkeypatch.delenv('SECRET_KEY', raising=False)
+    monkeypatch.delenv('FLASK_DEBUG', raising=False)
+    with pytest.raises(RuntimeError):
+        config.secret_key_from_env()
+
+    monkeypatch.setenv('FLASK_DEBUG', '1')
+    assert config.secret_key_from_env()
+
+    monkeypatch.setenv('SECRET_KEY', 'from-env')
+    assert config.secret_key_from_env() == 'from-env'
+
+
+def test_hasher_gives_up_after_waiting_for_a_slot(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(*args):
+        started.set()
+        release.wait(5)
+        return True
+
+    hasher = PasswordHasher(workers=1, max_pending=1, wait=0.05)
+    monkeypatch.setattr(hasher, '_pool', lambda: _Inline())
+    first = threading.Thread(target=hasher._run, args=(slow,))
+    first.start()
+    assert started.wait(5)
+    try:
+        with pytest.raises(HasherBusy):
+            hasher._run(lambda: True)
+    finally:
+        release.set()
+        first.join(5)
+    assert hasher._run(lambda: 'done') == 'done'
+
+
+def test_two_concurrent_logins_both_hash(monkeypatch):
+    # The default cap is one login per bcrypt process, never fewer
+    hasher = PasswordHasher(workers=2, max_pending=1, wait=0.05)
+    assert hasher.max_pending == 2
+    both_running = threading.Barrier(2, timeout=5)
+    monkeypatch.setattr(hasher, '_pool', lambda: _Inline())
+    results = []
+
+    def login():
+        results.append(hasher._run(lambda: both_running.wait() is not None))
+
+    logins = [threading.Thread(target=login) for _ in range(2)]
+    for thread in logins:
+        thread.start()
+    for thread in logins:
+        thread.join(5)
+    assert results == [True, True]
+
+
+def test_a_login_waits_for_a_slot_to_free_up(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(*args):
+        started.set()
+        release.wait(5)
+        return 'first'
+
+    hasher = PasswordHasher(workers=1, wait=5)
+    monkeypatch.setattr(hasher, '_pool', lambda: _Inline())
+    first = threading.Thread(target=hasher._run, args=(slow,))
+    first.start()
+    assert started.wait(5)
+    threading.Timer(0.05, release.set).start()
+    assert hasher._run(lambda: 'second') == 'second'
+    first.join(5)
+
+
+def test_hasher_does_not_fork_the_worker():
+    hasher = PasswordHasher(workers=1, rounds=4)
+    try:
+        assert hasher._pool()._mp_context.get_start_method() == 'forkserver'
+        hashed = hasher.hash('secret')
+        assert hasher.check('secret', hashed)
+        assert auth.hash_rounds(hashed) == 4
+    finally:
+        hasher.shutdown()
+
+
+class _Inline:
+    def submit(self, fn, *args):
+        return _Done(fn(*args))
+
+
+class _Done:
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
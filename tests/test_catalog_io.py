@@ -0,0 +1,103 @@
+import io
+from decimal import Decimal
+
+import pytest
+
+from bakes_common import catalog_io
+from bakes_common.catalog_io import ImportFormatError, RowError, clean_row, read_rows
+
+DIGEST = 'a' * 64
+
+
+def rows(data, fmt):
+    return list(read_rows(io.BytesIO(data.encode('utf-8')), fmt))
+
+
+def test_detect_format():
+    assert catalog_io.detect_format('csv') == 'csv'
+    assert catalog_io.detect_format(filename='catalog.JSONL') == 'ndjson'
+    assert catalog_io.detect_format(filename='upload', content_type='text/csv; charset=utf-8') == 'csv'
+    with pytest.raises(ImportFormatError):
+        catalog_io.detect_format('xlsx')
+    with pytest.raises(ImportFormatError):
+        catalog_io.detect_format(filename='catalog.txt')
+
+
+def test_csv_rows_carry_line_numbers_and_drop_empty_cells():
+    data = '\ufeffname,price,quantity\nPlum Cake,12.50,\n"Rye\nBread",4,10\n'
+    assert rows(data, 'csv') == [
+        (2, {'name': 'Plum Cake', 'price': '12.50'}),
+        (4, {'name': 'Rye\nBread', 'price': '4', 'quantity': '10'}),  # A quoted cell spans lines
+    ]
+
+
+def test_csv_header_and_row_errors():
+    with pytest.raises(ImportFormatError, match='colour'):
+        rows('name,price,colour\n', 'csv')
+    with pytest.raises(ImportFormatError, match='Empty'):
+        rows('', 'csv')
+    [(line, error)] = rows('name,price\nPlum Cake,12,extra\n', 'csv')
+    assert line == 2
+    assert isinstance(error, RowError)
+
+
+def test_ndjson_rows_and_errors():
+    data = ('{"name": "Plum Cake", "price": 12.5, "category": null}\n'
+            '\n'
+            'not json\n'
+            '[1, 2]\n'
+            '{"name": "x", "price": 1, "colour": "red"}\n')
+    result = rows(data, 'ndjson')
+    assert result[0] == (1, {'name': 'Plum Cake', 'price': 12.5})
+    assert [line for line, _ in result[1:]] == [3, 4, 5]
+    assert [str(error) for _, error in result[1:]] == [
+        'Invalid JSON', 'Each line must be a JSON object', 'Unknown column(s): colour']
+
+
+def test_clean_row_converts_values():
+    cleaned = clean_row({'product_id': ' 7 ', 'name': ' Plum Cake ', 'price': '12.50', 'quantity': 3,
+                         'status': 'in_stock', 'category': 'cakes', 'image_hash': DIGEST.upper()},
+                        image_exists=lambda digest: digest == DIGEST)
+    assert cleaned == {'product_id': 7, 'name': 'Plum Cake', 'price': Decimal('12.50'), 'quantity': 3.0,
+                       'status': 'in_stock', 'category': 'cakes', 'image_hash': DIGEST}
+
+
+@pytest.mark.parametrize('row, message', [
+    ({'name': 'Plum Cake'}, 'Missing required column'),
+    ({'name': '  ', 'price': 1}, 'name must not be empty'),
+    ({'name': 'x', 'price': 'cheap'}, 'price must be a number'),
+    ({'name': 'x', 'price': '-1'}, 'non-negative'),
+    ({'name': 'x', 'price': 'NaN'}, 'price must be a number'),
+    ({'name': 'x', 'price': 1, 'quantity': 'nan'}, 'non-negative'),
+    ({'name': 'x', 'price': 1, 'quantity': 'inf'}, 'non-negative'),
+    ({'name': 'x', 'price': 1, 'product_id': 0}, 'product_id'),
+    ({'name': 'x', 'price': 1, 'product_id': True}, 'product_id'),
+    ({'name': 'x', 'price': 1, 'product_id': '1.5'}, 'product_id'),
+    ({'name': 'x', 'price': 1, 'status': 'sold'}, 'status must be one of'),
+    ({'name': 'x', 'price': 1, 'image_hash': 'abc'}, 'image_hash'),
+])
+def test_clean_row_errors(row, message):
+    with pytest.raises(RowError, match=message):
+        clean_row(row)
+
+
+def test_image_hash_must_name_a_stored_image():
+    with pytest.raises(RowError):
+        clean_row({'name': 'x', 'price': 1, 'image_hash': DIGEST}, image_exists=lambda digest: False)
+
+
+def test_upsert_statement_updates_everything_but_the_key():
+    assert catalog_io.upsert_statement(('product_id', 'name', 'price')) == (
+        "INSERT INTO Products (product_id, name, price) VALUES (%s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE name = VALUES(name), price = VALUES(price)"
+    )
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_an_export_imports_again_unchanged(fmt):
+    exported = [(1, 'Plum Cake', 'with, comma', Decimal('12.50'), 'cakes', 3, 'in_stock', None)]
+    data = catalog_io.export_header(fmt) + catalog_io.encode_rows(exported, fmt)
+    [(_, row)] = rows(data, fmt)
+    assert clean_row(row) == {'product_id': 1, 'name': 'Plum Cake', 'description': 'with, comma',
+                              'price': Decimal('12.50'), 'category': 'cakes', 'quantity': 3.0,
+                              'status': 'in_stock'}
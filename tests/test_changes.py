@@ -0,0 +1,119 @@
+import pytest
+
+from bakes_common import changes, repository
+
+
+class ChangeLog:
+    """Product, order and tombstone rows by version, served like the queries in changes.py."""
+
+    def __init__(self, settled):
+        self.products, self.orders, self.tombstones = [], [], []
+        self.settled = settled
+        self.order_users = {}
+
+    def products_changed_since(self, connection, since, limit):
+        return [row for row in self.products if row[0] > since][:limit]
+
+    def orders_changed_since(self, connection, since, limit, user_id=None):
+        return [(version, {'version': version, 'order_id': order_id}) for version, order_id in self.orders
+                if version > since and user_id in (None, self.order_users.get(order_id))][:limit]
+
+    def tombstones_since(self, connection, entity, since, limit):
+        return [(version, entity_id) for version, kind, entity_id in self.tombstones
+                if kind == entity and version > since][:limit]
+
+    def settled_version(self, connection, settle=changes.SETTLE_SECONDS):
+        return self.settled
+
+
+@pytest.fixture
+def log(monkeypatch):
+    log = ChangeLog(settled=100)
+    monkeypatch.setattr(repository, 'products_changed_since', log.products_changed_since)
+    monkeypatch.setattr(changes, '_orders_changed_since', log.orders_changed_since)
+    monkeypatch.setattr(changes, '_tombstones_since', log.tombstones_since)
+    monkeypatch.setattr(changes, 'settled_version', log.settled_version)
+    return log
+
+
+def versions(page):
+    deleted = page['deleted']
+    return ([version for version, _ in page['products']], [order['version'] for order in page['orders']],
+            [version for version, _ in deleted['products']], [version for version, _ in deleted['orders']])
+
+
+def test_sources_are_merged_in_version_order_and_cut_at_limit(log):
+    log.products = [(1, 'p1'), (4, 'p4'), (5, 'p5'), (9, 'p9')]
+    log.orders = [(2, 20), (6, 21)]
+    log.tombstones = [(3, 'product', 7), (7, 'order', 22), (8, 'product', 8)]
+
+    page = changes.load_changes(None, 0, limit=5, orders=True)
+    assert versions(page) == ([1, 4, 5], [2], [3], [])
+    assert page['version'] == 5
+    assert page['has_more']
+
+    page = changes.load_changes(None, page['version'], limit=5, orders=True)
+    assert versions(page) == ([9], [6], [8], [7])
+    assert page['deleted'] == {'products': [(8, 8)], 'orders': [(7, 22)]}
+    assert page['version'] == 9
+    assert not page['has_more']
+
+
+def test_an_empty_page_keeps_the_version(log):
+    page = changes.load_changes(None, 42, orders=True)
+    assert page['version'] == 42
+    assert not page['has_more']
+
+
+def test_customer_feed_has_their_orders_and_no_order_tombstones(log):
+    log.orders = [(1, 10), (2, 11)]
+    log.order_users = {10: 7, 11: 8}
+    log.tombstones = [(3, 'order', 12)]
+    page = changes.load_changes(None, 0, orders=True, order_user_id=7)
+    assert [order['order_id'] for order in page['orders']] == [10]
+    assert page['deleted']['orders'] == []
+
+
+def test_version_is_held_back_to_the_settled_version(log):
+    log.settled = 3
+    log.products = [(n, f'p{n}') for n in range(1, 7)]
+    page = changes.load_changes(None, 0, limit=10)
+    # Everything read is sent, but the next poll starts again after 3
+    assert len(page['products']) == 6
+    assert page['version'] == 3
+    assert not page['has_more']
+
+
+def test_a_page_clamped_by_the_settle_window_does_not_ask_for_more(log):
+    log.settled = 3
+    log.products = [(n, f'p{n}') for n in range(1, 11)]
+    page = changes.load_changes(None, 0, limit=5)
+    assert page['version'] == 3
+    # The client waits for its next poll rather than re-reading 4 and 5 at once
+    assert not page['has_more']
+
+    log.settled = 100
+    page = changes.load_changes(None, 0, limit=5)
+    assert page['version'] == 5
+    assert page['has_more']
+
+
+def test_version_never_goes_below_since(log):
+    log.settled = 0
+    log.products = [(11, 'p11')]
+    assert changes.load_changes(None, 10)['version'] == 10
+
+
+def test_settle_none_reads_through(log):
+    log.settled = 0
+    log.products = [(n, f'p{n}') for n in range(1, 11)]
+    page = changes.load_changes(None, 0, limit=5, settle=None)
+    assert page['version'] == 5
+    assert page['has_more']
+
+
+def test_deleted_for_json():
+    assert changes.deleted_for_json({'products': [(4, 1)], 'orders': [(5, 2)]}) == {
+        'products': [{'version': 4, 'product_id': 1}],
+        'orders': [{'version': 5, 'order_id': 2}],
+    }
@@ -0,0 +1,78 @@
+from bakes_common import changes, repository
+from bakes_common.db import ConnectionPool, PooledConnection
+
+
+class FakePreparedCursor:
+    """Mimics MySQLCursorPrepared: re-prepares unless given the same string object."""
+
+    def __init__(self, log):
+        self.log = log
+        self._executed = None
+
+    def execute(self, operation, params=()):
+        if operation is not self._executed:
+            self.log.append(('prepare', operation))
+            self._executed = operation
+        self.log.append(('execute', params))
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self, prepared=False):
+        assert prepared
+        return FakePreparedCursor(self.log)
+
+
+def pooled():
+    pool = ConnectionPool({}, size=1)
+    raw = FakeConnection()
+    return PooledConnection(pool, raw), raw.log
+
+
+def prepares(log):
+    return [entry for entry in log if entry[0] == 'prepare']
+
+
+def test_second_call_reuses_the_prepared_statement():
+    connection, log = pooled()
+    for _ in range(3):
+        repository.get_product(connection, 1)
+        repository.find_user_by_email(connection, 'a@example.com')
+        repository.list_products(connection, category='cakes', limit=10)
+        repository.products_changed_since(connection, 0, 10)
+        changes._orders_changed_since(connection, 0, 10, user_id=5)
+    assert len(prepares(log)) == 5
+
+
+def test_equal_but_rebuilt_sql_is_not_re_prepared():
+    connection, log = pooled()
+    sql = "SELECT 1 FROM products WHERE product_id = %s"
+    connection.prepared(sql).execute(sql, (1,))
+    rebuilt = ' '.join(sql.split(' '))
+    assert rebuilt is not sql
+    connection.prepared(rebuilt).execute(rebuilt, (2,))
+    assert len(prepares(log)) == 1
+
+
+def test_list_products_shapes_are_memoized():
+    assert repository.list_products_sql(True, False, True, True) is repository.list_products_sql(True, False, True, True)
+    assert "category = %s AND product_id > %s" in repository.list_products_sql(True, False, True, True)
+
+
+def test_order_history_query_params_match_each_shape():
+    for kwargs in ({'user_id': 1}, {'email': 'a@example.com'}, {'user_id': 1, 'before': ('2025-01-01', 9)}):
+        sql, params = repository.order_history_query(20, **kwargs)
+        assert sql.count('%s') == len(params)
+        assert params[-1] == 21
+        assert sql is repository.order_history_query(5, **kwargs)[0]
+    sql, params = repository.order_history_query(20, email='a@example.com', before=('2025-01-01', 9))
+    assert "(SELECT user_id FROM users WHERE email = %s)" in sql
+    assert params == ['a@example.com', '2025-01-01', '2025-01-01', 9, 21]
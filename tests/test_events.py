@@ -0,0 +1,170 @@
+import pytest
+
+from bakes_common import events
+from bakes_common.events import Event, FeedUnavailable, OrderFeed
+
+
+class FakeOutbox:
+    """Committed ``order_events`` rows, and how often they were read."""
+
+    def __init__(self):
+        self.rows = {}
+        self.reads = 0
+
+    def add(self, *ids):
+        for event_id in ids:
+            self.rows[event_id] = Event(event_id, events.ORDER_CREATED, event_id, '{"order_id": %d}' % event_id)
+
+    def read(self, connection, after, up_to, limit):
+        self.reads += 1
+        return [self.rows[event_id] for event_id in sorted(self.rows) if after < event_id <= up_to][:limit]
+
+
+class FakeConnection:
+    def __init__(self, outbox):
+        self.outbox = outbox
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=()):
+        self.result = (max(self.outbox.rows, default=0),)
+
+    def fetchone(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, outbox):
+        self.outbox = outbox
+
+    def get_connection(self):
+        return FakeConnection(self.outbox)
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    outbox = FakeOutbox()
+    monkeypatch.setattr(events, 'read_events', outbox.read)
+    return outbox
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = {'now': 1000.0}
+    monkeypatch.setattr(events.time, 'monotonic', lambda: clock['now'])
+    return clock
+
+
+def make_feed(outbox, **kwargs):
+    feed = OrderFeed(FakePool(outbox), **kwargs)
+    feed._next_prune = float('inf')
+    feed.poll()  # Starts from the newest event
+    return feed
+
+
+def ids(batch):
+    return [event.id for event in batch]
+
+
+def test_subscribe_before_the_first_poll_is_refused(outbox):
+    with pytest.raises(FeedUnavailable):
+        OrderFeed(FakePool(outbox)).subscribe()
+
+
+def test_new_events_reach_every_subscriber(outbox):
+    outbox.add(1, 2)
+    feed = make_feed(outbox)
+    first, second = feed.subscribe(), feed.subscribe()
+    outbox.add(3, 4)
+    assert feed.poll() == 2
+    assert ids(first.get(0)) == [3, 4]
+    assert ids(second.get(0)) == [3, 4]
+    assert first.get(0) == []
+
+
+def test_an_id_gap_holds_later_events_until_gap_wait(outbox, clock):
+    outbox.add(1)
+    feed = make_feed(outbox, gap_wait=2.0)
+    subscription = feed.subscribe()
+    outbox.add(3)  # 2 took its id first but has not committed
+    assert feed.poll() == 0
+    assert subscription.get(0) == []
+
+    outbox.add(2)  # Committed within gap_wait: both go out in order
+    assert feed.poll() == 2
+    assert ids(subscription.get(0)) == [2, 3]
+
+    outbox.add(5)  # 4 was rolled back and never appears
+    assert feed.poll() == 0
+    clock['now'] += 2.5
+    assert feed.poll() == 1
+    assert ids(subscription.get(0)) == [5]
+
+
+def test_last_event_id_resumes_from_the_buffer(outbox):
+    feed = make_feed(outbox)
+    outbox.add(1, 2, 3, 4)
+    feed.poll()
+    reads = outbox.reads
+    subscription = feed.subscribe(last_event_id=2)
+    assert ids(subscription.get(0)) == [3, 4]
+    assert outbox.reads == reads  # No outbox read needed
+    # Live events after the replay are not sent twice
+    outbox.add(5)
+    feed.poll()
+    assert ids(subscription.get(0)) == [5]
+
+
+def test_last_event_id_older_than_the_buffer_reads_the_outbox(outbox):
+    feed = make_feed(outbox, buffer_size=3)
+    outbox.add(*range(1, 11))
+    feed.poll()
+    subscription = feed.subscribe(last_event_id=4)
+    assert ids(subscription.get(0)) == [5, 6, 7, 8, 9, 10]
+
+
+def test_a_client_away_too_long_gets_a_reset(outbox, monkeypatch):
+    monkeypatch.setattr(events, 'REPLAY_LIMIT', 5)
+    feed = make_feed(outbox, buffer_size=2)
+    outbox.add(*range(1, 21))
+    feed.poll()
+    batch = feed.subscribe(last_event_id=1).get(0)
+    assert [(event.id, event.type) for event in batch] == [(20, events.RESET)]
+
+
+def test_a_subscriber_that_falls_behind_is_dropped(outbox):
+    feed = make_feed(outbox, queue_size=3)
+    slow, fast = feed.subscribe(), feed.subscribe()
+    outbox.add(1, 2)
+    feed.poll()
+    assert ids(fast.get(0)) == [1, 2]
+    outbox.add(3, 4)
+    feed.poll()
+
+    assert slow.closed
+    # What was queued still goes out, then the stream ends; the client
+    # reconnects from event 2
+    assert ids(slow.get(0)) == [1, 2]
+    assert slow.get(0) is None
+    assert ids(fast.get(0)) == [3, 4]
+    assert feed.stats()['subscribers'] == 1
+    assert feed.stats()['dropped'] == 1
+
+
+def test_subscriber_limit(outbox):
+    feed = make_feed(outbox, max_subscribers=1)
+    subscription = feed.subscribe()
+    with pytest.raises(FeedUnavailable):
+        feed.subscribe()
+    feed.unsubscribe(subscription)
+    assert subscription.get(0) is None
+    feed.subscribe()
+
+
+def test_format_sse():
+    event = Event(7, events.ORDER_CREATED, 3, '{"order_id": 3}')
+    assert events.format_sse(event) == 'id: 7\nevent: order-created\ndata: {"order_id": 3}\n\n'
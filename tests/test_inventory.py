@@ -0,0 +1,26 @@
+import pytest
+
+from bakes_common import inventory
+from bakes_common.inventory import InvalidCart
+
+
+def test_cart_quantities_sum_lines_per_product():
+    items = [{'product_id': 3, 'quantity': 1}, {'product_id': 5, 'quantity': 2}, {'product_id': 3, 'quantity': 4}]
+    assert inventory.cart_quantities(items) == {3: 5, 5: 2}
+
+
+@pytest.mark.parametrize('items', [
+    [],
+    None,
+    [{'product_id': 3}],
+    [{'quantity': 1}],
+    ['3'],
+    [{'product_id': '3', 'quantity': 1}],
+    [{'product_id': True, 'quantity': 1}],
+    [{'product_id': 3, 'quantity': 0}],
+    [{'product_id': 3, 'quantity': -2}],
+    [{'product_id': 3, 'quantity': 1.5}],
+])
+def test_cart_quantities_reject_malformed_lines(items):
+    with pytest.raises(InvalidCart):
+        inventory.cart_quantities(items)
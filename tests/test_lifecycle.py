@@ -0,0 +1,58 @@
+import threading
+
+from flask import Flask
+
+from bakes_common.lifecycle import Lifecycle, install_lifecycle
+
+
+def test_shutdown_waits_for_in_flight_requests_and_answers_503_meanwhile():
+    app = Flask(__name__)
+    lifecycle = install_lifecycle(app, drain_timeout=5)
+    entered, release = threading.Event(), threading.Event()
+    closed = []
+    lifecycle.on_shutdown('pool', lambda: closed.append('pool'))
+    lifecycle.on_shutdown('sweeper', lambda: closed.append('sweeper'))
+
+    @app.route('/slow')
+    def slow():
+        entered.set()
+        release.wait(5)
+        return 'done'
+
+    client = app.test_client()
+    assert client.get('/health/ready').status_code == 200
+
+    responses = []
+    request = threading.Thread(target=lambda: responses.append(client.get('/slow')))
+    request.start()
+    assert entered.wait(5)
+    shutdown = threading.Thread(target=lifecycle.shutdown)
+    shutdown.start()
+    try:
+        shutdown.join(0.2)
+        assert shutdown.is_alive()  # Still draining the slow request
+        assert lifecycle.draining
+        ready = client.get('/health/ready')
+        assert ready.status_code == 503
+        assert ready.get_json() == {"status": "draining"}
+        assert closed == []
+    finally:
+        release.set()
+        request.join(5)
+        shutdown.join(5)
+
+    assert responses[0].data == b'done'
+    # Closers run once the request finished, in reverse registration order
+    assert closed == ['sweeper', 'pool']
+
+
+def test_shutdown_gives_up_after_the_drain_timeout_and_runs_once():
+    lifecycle = Lifecycle(drain_timeout=0.05)
+    closed = []
+    lifecycle.on_shutdown('broken', lambda: 1 / 0)
+    lifecycle.on_shutdown('pool', lambda: closed.append('pool'))
+    lifecycle.request_started()  # Never finishes
+
+    lifecycle.shutdown()
+    lifecycle.shutdown()
+    assert closed == ['pool']
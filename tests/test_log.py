@@ -0,0 +1,53 @@
+import json
+import logging
+import queue
+
+from bakes_common.log import JsonFormatter, StructuredQueueHandler
+
+
+def queued_record(log_call):
+    records = queue.SimpleQueue()
+    logger = logging.getLogger('tests.log')
+    logger.propagate = False
+    handler = StructuredQueueHandler(records)
+    logger.addHandler(handler)
+    try:
+        log_call(logger)
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+    return records.get_nowait()
+
+
+def test_exception_stays_a_separate_field_after_queueing():
+    def log_call(logger):
+        try:
+            {}['missing']
+        except KeyError:
+            logger.exception("Lookup failed for %s", 'order 7', extra={'order_id': 7})
+
+    record = queued_record(log_call)
+    assert record.exc_info is None  # No frames held by the queue
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['msg'] == 'Lookup failed for order 7'
+    assert entry['order_id'] == 7
+    assert entry['exc'].startswith('Traceback')
+    assert "KeyError: 'missing'" in entry['exc']
+
+
+def test_text_format_still_appends_the_traceback():
+    def log_call(logger):
+        try:
+            raise ValueError('bad row')
+        except ValueError:
+            logger.error("Import failed", exc_info=True)
+
+    text = logging.Formatter('%(message)s').format(queued_record(log_call))
+    assert text.startswith('Import failed\nTraceback')
+    assert text.endswith('ValueError: bad row')
+
+
+def test_records_without_exceptions_are_unchanged():
+    entry = json.loads(JsonFormatter().format(queued_record(lambda logger: logger.warning("%d left", 3))))
+    assert entry['msg'] == '3 left'
+    assert 'exc' not in entry
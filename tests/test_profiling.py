@@ -0,0 +1,48 @@
+import pstats
+import time
+
+from flask import Flask
+
+from bakes_common.profiling import PROFILE_HEADER, PROFILE_ID_HEADER, install_profiling
+
+
+def test_streamed_response_is_profiled_until_the_body_is_sent(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROFILE_TOKEN', 'secret')
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+    monkeypatch.setenv('PROFILE_MODE', 'cprofile')
+    app = Flask(__name__)
+    install_profiling(app, 'test')
+
+    def slow_body():
+        yield 'a'
+        time.sleep(0.01)
+        yield 'b'
+
+    @app.route('/stream')
+    def stream():
+        return app.response_class(slow_body())
+
+    client = app.test_client()
+    response = client.get('/stream', headers={PROFILE_HEADER: 'secret'})
+    filename = response.headers[PROFILE_ID_HEADER]
+    assert not (tmp_path / filename).exists()  # Body not sent yet
+
+    assert response.get_data(as_text=True) == 'ab'
+    response.close()
+    profile = tmp_path / filename
+    assert profile.exists()
+
+    stats = pstats.Stats(str(profile)).stats
+    assert any(function == 'slow_body' for (_, _, function) in stats)
+
+
+def test_requests_without_the_token_are_not_profiled(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROFILE_TOKEN', 'secret')
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+    app = Flask(__name__)
+    install_profiling(app, 'test')
+    app.add_url_rule('/', 'index', lambda: 'ok')
+
+    response = app.test_client().get('/', headers={PROFILE_HEADER: 'wrong'})
+    assert PROFILE_ID_HEADER not in response.headers
+    assert list(tmp_path.iterdir()) == []
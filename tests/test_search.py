@@ -0,0 +1,163 @@
+from decimal import Decimal
+
+import pytest
+
+from bakes_common import changes, search
+from bakes_common.repository import Product
+from bakes_common.search import CatalogSearch, ProductIndex
+
+
+def product(product_id, name, category='cakes', description='', status='in_stock'):
+    return Product(product_id, name, description, Decimal('10.00'), category, 5, status, None, None, False)
+
+
+@pytest.fixture
+def index():
+    index = ProductIndex()
+    index.replace_all([
+        product(1, 'Chocolate Truffle Cake', description='rich and eggless'),
+        product(2, 'Vanilla Cupcakes', category='cupcakes'),
+        product(3, 'Chocolate Chip Cookies', category='cookies'),
+        product(4, 'Sourdough Bread', category='breads', description='pairs well with chocolate spread'),
+        product(5, 'Chocolate Brownie', category='brownies', status='out_of_stock'),
+    ])
+    return index
+
+
+def ids(result):
+    return [p.product_id for p in result.products]
+
+
+def test_words_normalise_case_accents_stopwords_and_plurals():
+    assert search.words('The Crème Brûlées and Cakes') == ['creme', 'brulee', 'cake']
+    assert search.words('Glass') == ['glass']
+
+
+def test_name_matches_rank_above_description_matches(index):
+    result = index.search('chocolate')
+    # Name hits first (in stock before sold out, then by name), description last
+    assert ids(result) == [3, 1, 5, 4]
+    assert result.total == 4
+
+
+def test_every_query_word_must_match(index):
+    assert ids(index.search('chocolate cake')) == [1]
+    assert ids(index.search('chocolate vanilla')) == []
+
+
+def test_prefix_matches_partial_words(index):
+    assert ids(index.search('choc')) == [3, 1, 5, 4]
+    assert ids(index.search('sourd')) == [4]
+
+
+def test_exact_word_outranks_a_longer_word_it_prefixes(index):
+    index.upsert(product(6, 'Cake Pops'))
+    index.upsert(product(7, 'Caked Honey'))
+    assert ids(index.search('cake'))[:1] == [6]
+
+
+def test_fuzzy_matches_misspellings(index):
+    assert set(ids(index.search('chocolte'))) == {1, 3, 4, 5}
+    assert ids(index.search('sourdugh')) == [4]
+    assert ids(index.search('xylophone')) == []
+
+
+def test_facets_count_matches_before_the_category_filter(index):
+    result = index.search('chocolate', category='cakes')
+    assert ids(result) == [1]
+    assert result.total == 1
+    assert result.facets == {'breads': 1, 'brownies': 1, 'cakes': 1, 'cookies': 1}
+
+
+def test_empty_query_browses_in_tie_break_order(index):
+    result = index.search('', category=None, limit=3)
+    assert ids(result) == [3, 1, 4]
+    assert result.total == 5
+    assert index.search('', category='breads').total == 1
+
+
+def test_upsert_and_remove_update_postings_and_order(index):
+    index.upsert(product(3, 'Oatmeal Cookies', category='cookies'))
+    assert 3 not in ids(index.search('chocolate'))
+    assert ids(index.search('oatmeal')) == [3]
+    index.upsert(product(1, 'Chocolate Truffle Cake', status='out_of_stock'))
+    assert ids(index.search('chocolate'))[:2] == [5, 1]
+    index.remove(5)
+    assert 5 not in ids(index.search('brownie'))
+    assert 'brownies' not in index.search('').facets
+
+
+class FakeCatalogCache:
+    def __init__(self):
+        self.current = 1
+
+    def version(self):
+        return self.current
+
+
+class FakePool:
+    def get_connection(self):
+        return FakeConnection()
+
+
+class FakeConnection:
+    def close(self):
+        pass
+
+
+class FakeChangeLog:
+    """Products written at versions 1..n, all within the settle window."""
+
+    def __init__(self, products, settled):
+        self.rows = [(n, p) for n, p in enumerate(products, 1)]
+        self.settled = settled
+
+    def settled_version(self, connection, settle=changes.SETTLE_SECONDS):
+        return self.settled
+
+    def load_changes(self, connection, since, limit=changes.PAGE_SIZE, settle=changes.SETTLE_SECONDS, **kwargs):
+        rows = [row for row in self.rows if row[0] > since]
+        page, has_more = rows[:limit], len(rows) > limit
+        version = page[-1][0] if page else since
+        if page and settle is not None:
+            version = min(version, max(since, self.settled))
+            has_more = has_more and version == page[-1][0]
+        return {'version': version, 'has_more': has_more, 'products': page,
+                'deleted': {'products': [], 'orders': []}}
+
+
+def test_refresh_reads_a_bulk_import_that_is_still_inside_the_settle_window(monkeypatch):
+    catalog_search = CatalogSearch(FakePool(), FakeCatalogCache())
+    catalog_search.catalog_version = 1  # Built before the import
+    imported = [product(n, f'Imported Cake {n}') for n in range(1, changes.MAX_PAGE_SIZE * 2 + 500)]
+    log = FakeChangeLog(imported, settled=0)
+    monkeypatch.setattr(changes, 'load_changes', log.load_changes)
+    monkeypatch.setattr(changes, 'settled_version', log.settled_version)
+
+    catalog_search.catalog_cache.current = 2
+    assert catalog_search.refresh() == 2
+    assert len(catalog_search.index) == len(imported)
+    # The next refresh starts again from before the unsettled writes
+    assert catalog_search._since == 0
+
+    log.settled = len(imported)
+    catalog_search.catalog_cache.current = 3
+    catalog_search.refresh()
+    assert catalog_search._since == len(imported)
+
+
+def test_refresh_applies_updates_and_deletes_in_version_order(monkeypatch):
+    catalog_search = CatalogSearch(FakePool(), FakeCatalogCache())
+    catalog_search.catalog_version = 1
+    catalog_search.index.replace_all([product(1, 'Plum Cake'), product(2, 'Rye Bread', category='breads')])
+    page = {'version': 9, 'has_more': False,
+            # Renamed then deleted, and deleted then re-added
+            'products': [(5, product(1, 'Plum Tart')), (8, product(2, 'Rye Loaf', category='breads'))],
+            'deleted': {'products': [(7, 1), (6, 2)], 'orders': []}}
+    monkeypatch.setattr(changes, 'load_changes', lambda *args, **kwargs: page)
+    monkeypatch.setattr(changes, 'settled_version', lambda *args, **kwargs: 9)
+
+    catalog_search.catalog_cache.current = 2
+    catalog_search.refresh()
+    assert ids(catalog_search.index.search('plum')) == []
+    assert ids(catalog_search.index.search('rye loaf')) == [2]
@@ -1,32 +1,147 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, url_for
 import mysql.connector
 from mysql.connector import Error
-import bcrypt
 from flask_cors import CORS
+import hashlib
+import logging
 import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bakes_common import changes, events, inventory, repository, search
+from bakes_common.auth import HasherBusy, PasswordHasher, SessionTokens
+from bakes_common.cache import CatalogCache, ScopedCache, version_backend_from_env
+from bakes_common.db import ConnectionPool, PoolTimeout
+from bakes_common.pagination import (
+    PAGINATION_HEADERS, PaginationError, cursor_id, next_page_headers, parse_fields, parse_page, project,
+)
+from bakes_common.images import ImageStore, default_store_root, send_stored_image
+from bakes_common.conditional import PRIVATE_REVALIDATE, etag, not_modified, with_validators
+from bakes_common.config import db_config_from_env, dev_server_options, secret_key_from_env
+from bakes_common.lifecycle import install_lifecycle
+from bakes_common.log import REQUEST_ID_HEADER, configure_logging
+from bakes_common.metrics import instrument_app
+from bakes_common.profiling import install_profiling
+from bakes_common.responses import install_compression, install_json
 
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
-
-# Database configuration
-db_config = {
-    'host': 'localhost',
-    'user': 'root',  # Replace with your MySQL username
-    'password': 'Thrisha',  # Replace with your MySQL password
-    'database': 'bakes_db'  # Ensure this database exists
-}
-
-# Function to establish a database connection
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=PAGINATION_HEADERS + [REQUEST_ID_HEADER])
+
+# orjson-backed jsonify that takes Decimal/datetime as they come from MySQL,
+# and gzip/brotli for JSON bodies over COMPRESS_MIN_SIZE
+install_json(app)
+install_compression(app)
+
+# JSON log lines with request IDs, written off the request thread
+configure_logging(app)
+log = logging.getLogger('bakes.storefront')
+
+# Database configuration from DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+db_config = db_config_from_env()
+
+# Shared pool instead of a fresh MySQL handshake per request
+db_pool = ConnectionPool(
+    db_config,
+    size=int(os.environ.get('DB_POOL_SIZE', 10)),
+    timeout=float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+)
+
+# Per-route latency, per-request query counts and pool gauges at /metrics
+# (METRICS_ENABLED=0 turns all of it off)
+metrics = instrument_app(app, 'storefront', db_pool)
+
+# Opt-in profiles (X-Profile header / PROFILE_SAMPLE_RATE) and slow-query
+# log with EXPLAIN plans (SLOW_QUERY_MS)
+slow_query_log = install_profiling(app, 'storefront', db_pool)
+
+# Same on-disk image store the admin app uploads into
+image_store = ImageStore(default_store_root())
+
+# Product grid served from memory; product and stock writes in either app
+# bump the shared catalog version
+catalog_cache = CatalogCache(version_backend_from_env(), ttl=float(os.environ.get('CATALOG_CACHE_TTL', 300)))
+
+# Search index over the catalog, built by create_app(); follows product
+# writes from either app through the catalog version
+product_search = search.CatalogSearch(db_pool, catalog_cache)
+
+# Recent order history per customer (keyed by lowercased email); placing an
+# order or an admin status change invalidates only that customer
+order_history_cache = ScopedCache(
+    version_backend_from_env('order-history'), ttl=float(os.environ.get('ORDER_HISTORY_CACHE_TTL', 300)))
+
+# Returns unconfirmed checkout reservations to stock and refreshes the
+# quantity of hot products from their counter slots; started by create_app()
+inventory_sweeper = inventory.InventorySweeper(
+    db_pool,
+    interval=float(os.environ.get('INVENTORY_SWEEP_INTERVAL', 5)),
+    on_change=catalog_cache.invalidate,
+)
+
+# bcrypt runs in a bounded process pool; logins hand out signed session
+# tokens so later requests need neither bcrypt nor a users lookup
+password_hasher = PasswordHasher(
+    workers=int(os.environ.get('BCRYPT_WORKERS', 2)),
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', 12)),
+    max_pending=int(os.environ.get('BCRYPT_MAX_PENDING', 2)),
+)
+session_tokens = SessionTokens(secret_key_from_env(), salt='user-session')
+
+# Function to check a connection out of the pool; close() hands it back
 def get_db_connection():
     try:
-        connection = mysql.connector.connect(**db_config)
-        if connection.is_connected():
-            print("Connected to MySQL database")
-        return connection
+        return db_pool.get_connection()
     except Error as e:
-        print(f"Error connecting to MySQL: {e}")
+        log.error("Database connection failed", extra={'error': str(e)})
         return None
 
+@app.errorhandler(PaginationError)
+def handle_pagination_error(err):
+    return jsonify({"error": str(err)}), 400
+
+@app.errorhandler(inventory.InvalidCart)
+def handle_invalid_cart(err):
+    return jsonify({"error": str(err)}), 400
+
+@app.errorhandler(HasherBusy)
+def handle_hasher_busy(err):
+    return jsonify({"error": str(err)}), 503
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(err):
+    return jsonify({"error": "Database busy, please retry"}), 503
+
+@app.route('/health/db', methods=['GET'])
+def db_pool_stats():
+    return jsonify(db_pool.stats())
+
+@app.route('/health/cache', methods=['GET'])
+def catalog_cache_stats():
+    return jsonify({
+        "catalog": catalog_cache.stats(),
+        "order_history": order_history_cache.stats(),
+        "search": product_search.stats(),
+    })
+
+@app.route('/images/<digest>/<variant>', methods=['GET'])
+def get_stored_image(digest, variant):
+    response = send_stored_image(image_store, digest, variant)
+    return response if response is not None else (jsonify({"error": "Image not found"}), 404)
+
+# Products uploaded through the admin app carry an image_hash; point the shop
+# grid at the small card/thumb variants instead of the full-size upload
+def with_image_urls(product):
+    product = product._asdict()
+    del product['has_image']  # Legacy BLOBs are only served by the admin app
+    digest = product.pop('image_hash')
+    if digest:
+        product['image_url'] = url_for('get_stored_image', digest=digest, variant='card', _external=True)
+        product['thumbnail_url'] = url_for('get_stored_image', digest=digest, variant='thumb', _external=True)
+    else:
+        product['thumbnail_url'] = product.get('image_url')
+    return product
+
 # Route to register a new user
 @app.route('/register', methods=['POST'])
 def register_user():
@@ -48,72 +163,130 @@ def register_user():
     if role not in ['user', 'admin']:
         return jsonify({"error": "Invalid role"}), 400
 
-    # Hash the password
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-
     # Check if the email or phone already exists
     connection = get_db_connection()
     if not connection:
         return jsonify({"error": "Database connection failed"}), 500
 
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT email, phone FROM users WHERE email = %s OR phone = %s", (email, phone))
-    existing_user = cursor.fetchone()
+    try:
+        existing_user = repository.find_user_conflict(connection, email, phone)
+    finally:
+        # Don't hold a pooled connection while bcrypt runs
+        connection.close()
 
     if existing_user:
-        cursor.close()
-        connection.close()
-        if existing_user.get('email') == email:
+        if existing_user.email == email:
             return jsonify({"error": f"User with email {email} already exists"}), 400
-        elif existing_user.get('phone') == phone:
+        elif existing_user.phone == phone:
             return jsonify({"error": f"User with phone {phone} already exists"}), 400
 
-    # Insert the new user
-    query = """
-    INSERT INTO users (name, email, phone, address, role, password_hash)
-    VALUES (%s, %s, %s, %s, %s, %s)
-    """
-    values = (name, email, phone, address, role, hashed_password.decode('utf-8'))  # Store the hashed password
+    # Hash the password
+    hashed_password = password_hasher.hash(password)
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({"error": "Database connection failed"}), 500
 
     try:
-        cursor.execute(query, values)
-        connection.commit()
+        with repository.transaction(connection):
+            repository.insert_user(connection, name, email, phone, address, role, hashed_password)
+        # A history lookup before registering cached "user not found"
+        order_history_cache.invalidate(email.lower())
         return jsonify({"message": "User registered successfully"}), 201
     except mysql.connector.Error as e:
         return jsonify({"error": str(e)}), 500
     finally:
-        cursor.close()
         connection.close()
 
 # Additional routes for login, order placement, etc. can be added here
 
-@app.route('/products', methods=['GET'])
-def get_products():
-    print("Received GET request for products")  # Debug log
+PRODUCT_FIELDS = {
+    'product_id', 'name', 'description', 'price', 'image_url', 'thumbnail_url', 'category', 'quantity', 'status',
+}
+
+def load_products(category=None, status=None, after_id=None, limit=None):
     connection = get_db_connection()
     if not connection:
-        print("Database connection failed")  # Debug log
-        return jsonify({"error": "Database connection failed"}), 500
+        return None
 
     try:
-        cursor = connection.cursor(dictionary=True)
-        query = "SELECT * FROM products"
-        cursor.execute(query)
-        products = cursor.fetchall()
-        print(f"Found {len(products)} products")  # Debug log
-        cursor.close()
+        return repository.list_products(connection, category=category, status=status, after_id=after_id, limit=limit)
+    finally:
+        # Always hand the connection back, otherwise the pool drains on errors
         connection.close()
-        return jsonify(products)
+
+@app.route('/products', methods=['GET'])
+def get_products():
+    limit, page_cursor = parse_page(request.args)
+    after_id = cursor_id(page_cursor)
+    fields = parse_fields(request.args, PRODUCT_FIELDS)
+    category = request.args.get('category')
+    status = request.args.get('status')
+
+    # Every product or stock write bumps the catalog version, so a client
+    # holding the current one gets a 304 without a query
+    tag = etag('products', catalog_cache.version())
+    cached = not_modified(tag)
+    if cached is not None:
+        return cached
+
+    try:
+        products = catalog_cache.get_or_load(
+            ('products', category, status, after_id, limit),
+            lambda: load_products(category=category, status=status, after_id=after_id, limit=limit),
+        )
     except Error as e:
-        print(f"Database error: {str(e)}")  # Debug log
+        log.error("Product list query failed", extra={'error': str(e)})
         return jsonify({"error": str(e)}), 500
+    if products is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    next_cursor = None
+    if limit is not None and len(products) > limit:
+        products = products[:limit]
+        next_cursor = {'id': products[-1].product_id}
+
+    body = [project(with_image_urls(product), fields) for product in products]
+    return with_validators(jsonify(body), tag), 200, next_page_headers(next_cursor)
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_RESULTS = 100
+
+@app.route('/products/search', methods=['GET'])
+def search_products():
+    """Ranked products matching ``q`` with category facet counts; see bakes_common/search.py."""
+    limit, _ = parse_page(request.args, default_limit=SEARCH_PAGE_SIZE, max_limit=MAX_SEARCH_RESULTS)
+    fields = parse_fields(request.args, PRODUCT_FIELDS)
+    query = request.args.get('q', '')
+    category = request.args.get('category') or None
+
+    try:
+        version = product_search.refresh()
+    except (Error, PoolTimeout) as e:
+        if product_search.catalog_version is None:
+            log.error("Product search index could not be built", extra={'error': str(e)})
+            return jsonify({"error": "Product search is unavailable"}), 503
+        # Searching a slightly stale index beats failing the request
+        log.warning("Product search refresh failed", extra={'error': str(e)})
+        version = product_search.catalog_version
+
+    tag = etag('search', version)
+    cached = not_modified(tag)
+    if cached is not None:
+        return cached
+
+    result = product_search.index.search(query, category, limit)
+    return with_validators(jsonify({
+        "results": [project(with_image_urls(product), fields) for product in result.products],
+        "total": result.total,
+        "facets": {"category": result.facets},
+    }), tag)
 
 
 @app.route('/login', methods=['POST'])
 def login_user():
     data = request.get_json()
-    print("Received data:", data)  # Debug: Print received data
+    log.debug("Login request", extra={'body': data})
 
     # Validate required fields
     required_fields = ['email', 'password']
@@ -128,31 +301,49 @@ def login_user():
     if not connection:
         return jsonify({"error": "Database connection failed"}), 500
 
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
-    user = cursor.fetchone()
+    try:
+        user = repository.find_user_by_email(connection, email)
+    finally:
+        # Don't hold a pooled connection while bcrypt runs
+        connection.close()
 
     if not user:
-        cursor.close()
-        connection.close()
         return jsonify({"error": "User not found"}), 404
 
     # Verify the password
-    stored_hashed_password = user['password_hash'].encode('utf-8')
-    if bcrypt.checkpw(password.encode('utf-8'), stored_hashed_password):
-        cursor.close()
-        connection.close()
-        return jsonify({"message": "User login successful"}), 200
-    else:
-        cursor.close()
-        connection.close()
+    if not password_hasher.check(password, user.password_hash):
         return jsonify({"error": "Invalid password"}), 401
 
+    # Upgrade hashes made with an older cost factor while we have the password
+    if password_hasher.needs_rehash(user.password_hash):
+        connection = get_db_connection()
+        if connection:
+            try:
+                with repository.transaction(connection):
+                    repository.set_user_password_hash(connection, user.user_id, password_hasher.hash(password))
+            except Error as e:
+                # The login itself succeeded; retry the upgrade next time
+                log.warning("Password rehash failed", extra={'error': str(e)})
+            finally:
+                connection.close()
+
+    token = session_tokens.issue({'user_id': user.user_id, 'email': user.email, 'role': user.role})
+    return jsonify({
+        "message": "User login successful",
+        "token": token,
+        "user_id": user.user_id,
+        "name": user.name,
+        "email": user.email,
+        "phone": user.phone,
+        "address": user.address,
+        "role": user.role,
+    }), 200
+
 
 @app.route('/update-product-quantity', methods=['POST'])
 def update_product_quantity():
     data = request.get_json()
-    print("Received data:", data)  # Debugging
+    log.debug("Update product quantity request", extra={'body': data})
 
     required_fields = ['product_id', 'quantity']
     if not all(field in data for field in required_fields):
@@ -174,7 +365,14 @@ def update_product_quantity():
                    WHERE product_id = %s"""
         values = (quantity, quantity, product_id)
         cursor.execute(query, values)
+
+        # Hot products keep their stock in counter slots; re-split the new total
+        slots = inventory.hot_slot_counts(connection, [product_id]).get(product_id)
+        if slots:
+            inventory.set_hot_stock(connection, product_id, quantity, slots)
+
         connection.commit()
+        catalog_cache.invalidate()
         
         return jsonify({"message": "Product quantity updated successfully"}), 200
     except Error as e:
@@ -183,21 +381,77 @@ def update_product_quantity():
         cursor.close()
         connection.close()
 
+@app.route('/reservations', methods=['POST'])
+def create_reservation():
+    data = request.get_json()
+    if not data or not data.get('items'):
+        return jsonify({"error": "Missing required fields (items)"}), 400
+
+    quantities = inventory.cart_quantities(data['items'])
+    try:
+        ttl = int(data.get('ttl', inventory.DEFAULT_TTL))
+    except (TypeError, ValueError):
+        return jsonify({"error": "ttl must be a number of seconds"}), 400
+    # Zero or negative would hold stock that has already expired
+    ttl = max(1, min(ttl, inventory.DEFAULT_TTL))
+
+    try:
+        reservation_id, expires_at = inventory.reserve(db_pool, quantities, ttl=ttl)
+    except inventory.InsufficientStock as e:
+        return jsonify({"error": str(e)}), 409
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+
+    catalog_cache.invalidate()  # Held stock is no longer available
+    return jsonify({
+        "reservation_id": reservation_id,
+        "expires_at": expires_at.strftime('%Y-%m-%d %H:%M:%S'),
+    }), 201
+
+@app.route('/reservations/<string:reservation_id>', methods=['DELETE'])
+def cancel_reservation(reservation_id):
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        released = inventory.release(connection, reservation_id)
+        connection.commit()
+    except Error as e:
+        connection.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        connection.close()
+
+    if not released:
+        return jsonify({"error": "Reservation not found or no longer held"}), 404
+    catalog_cache.invalidate()
+    return jsonify({"message": "Reservation released"}), 200
+
 @app.route('/orders', methods=['POST'])
 def place_order():
     data = request.get_json()
+    session = session_tokens.from_request()
     
-    # Validate input data
-    if not data or 'email' not in data or 'items' not in data:
+    # Validate input data; the email is only needed without a session token
+    if not data or 'items' not in data or ('email' not in data and session is None):
         return jsonify({"error": "Missing required fields (email, items)"}), 400
 
-    email = data['email']
+    email = data.get('email')
+    # The token decides whose order this is; a different email in the body
+    # means a stale token from someone else on this browser
+    if session is not None and email and email.lower() != session['email'].lower():
+        return jsonify({"error": "Signed in as a different customer; sign in again to order for this email"}), 403
     items = data['items']
-    delivery_type = data.get('delivery_type', 'delivery')
+    # Same product may appear on several cart lines; stock is checked per product
+    quantities = inventory.cart_quantities(items)
+    # Stored lowercase so the admin filters can use idx_orders_delivery_type
+    delivery_type = (data.get('delivery_type') or 'delivery').strip().lower()
     delivery_address = data.get('delivery_address', '')
     map_link = data.get('map_link', '')  # Get map_link from request
     payment_method = data.get('payment_method', 'cod')
     advance_payment = data.get('advance_payment', 0)
+    reservation_id = data.get('reservation_id')  # From POST /reservations at checkout start
 
     connection = get_db_connection()
     if not connection:
@@ -206,27 +460,28 @@ def place_order():
     try:
         cursor = connection.cursor(dictionary=True)
 
-        # Get user_id from email
-        cursor.execute("SELECT user_id FROM users WHERE email = %s", (email,))
-        user = cursor.fetchone()
-        if not user:
-            return jsonify({"error": "User not found"}), 404
-
-        user_id = user['user_id']
-
-        # Validate product stock before processing
-        for item in items:
-            product_id, quantity = item['product_id'], item['quantity']
+        if session is not None:
+            user_id = session['user_id']
+        else:
+            user_id = repository.user_id_by_email(connection, email)
+            if user_id is None:
+                return jsonify({"error": "User not found"}), 404
 
-            cursor.execute("SELECT quantity FROM products WHERE product_id = %s", (product_id,))
-            product = cursor.fetchone()
+        product_ids = sorted(quantities)
 
-            if not product:
+        # Existence and hot-product check in one round trip, without locks
+        cursor.execute(
+            f"""SELECT p.product_id, COUNT(s.slot) AS slots
+                FROM products p LEFT JOIN inventory_slots s ON s.product_id = p.product_id
+                WHERE p.product_id IN ({', '.join(['%s'] * len(product_ids))})
+                GROUP BY p.product_id""",
+            product_ids
+        )
+        slot_counts = {row['product_id']: row['slots'] for row in cursor.fetchall()}
+        for product_id in product_ids:
+            if product_id not in slot_counts:
                 return jsonify({"error": f"Product with ID {product_id} does not exist"}), 400
 
-            if product['quantity'] < quantity:
-                return jsonify({"error": f"Insufficient stock for product ID {product_id}"}), 400
-
         # Calculate total price
         total_price = sum(item['price'] * item['quantity'] for item in items)
 
@@ -244,30 +499,102 @@ def place_order():
         )
         order_id = cursor.lastrowid
 
-        # Insert order items and update stock manually
-        for item in items:
-            product_id, quantity, price = item['product_id'], item['quantity'], item['price']
+        # Stock held at checkout start only needs to be confirmed
+        if reservation_id:
+            covered = inventory.confirm(connection, reservation_id, order_id, quantities)
+            for product_id, quantity in covered.items():
+                quantities[product_id] -= quantity
 
-            cursor.execute(
-                "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (%s, %s, %s, %s)",
-                (order_id, product_id, quantity, price)
-            )
+        regular_ids = [pid for pid in product_ids if not slot_counts[pid] and quantities[pid] > 0]
+        hot_ids = [pid for pid in product_ids if slot_counts[pid] and quantities[pid] > 0]
 
-            # Reduce product quantity **without triggers**
+        if regular_ids:
+            placeholders = ', '.join(['%s'] * len(regular_ids))
+
+            # Lock the regular products in one round trip. Rows are locked in
+            # primary-key order, so two concurrent orders cannot deadlock and
+            # the second one sees the stock left by the first. The check above
+            # ran without locks, so existence and slots are read again here:
+            # a product may have been deleted or made hot since (enable_hot
+            # locks the product row before it fills the slots).
             cursor.execute(
-                "UPDATE products SET quantity = quantity - %s WHERE product_id = %s",
-                (quantity, product_id)
+                f"""SELECT p.product_id, p.quantity, COUNT(s.slot) AS slots
+                    FROM products p LEFT JOIN inventory_slots s ON s.product_id = p.product_id
+                    WHERE p.product_id IN ({placeholders})
+                    GROUP BY p.product_id
+                    ORDER BY p.product_id FOR UPDATE""",
+                regular_ids
             )
+            locked = {row['product_id']: row for row in cursor.fetchall()}
+            for product_id in regular_ids:
+                if product_id not in locked:
+                    connection.rollback()
+                    return jsonify({"error": f"Product with ID {product_id} does not exist"}), 400
+            now_hot = [pid for pid in regular_ids if locked[pid]['slots']]
+            if now_hot:
+                for product_id in now_hot:
+                    slot_counts[product_id] = locked[product_id]['slots']
+                hot_ids = sorted(hot_ids + now_hot)
+                regular_ids = [pid for pid in regular_ids if not locked[pid]['slots']]
+                placeholders = ', '.join(['%s'] * len(regular_ids))
+
+            stock = {product_id: locked[product_id]['quantity'] for product_id in regular_ids}
+            for product_id in regular_ids:
+                if stock[product_id] < quantities[product_id]:
+                    connection.rollback()
+                    return jsonify({"error": f"Insufficient stock for product ID {product_id}"}), 400
+
+            # Empty when every one of them turned out to be hot
+            if regular_ids:
+                # Decrement all products at once. MySQL applies SET assignments left
+                # to right, so status sees the new quantity. The WHERE guard makes the
+                # decrement conditional even without the row locks above.
+                decrement = "CASE product_id " + " ".join(["WHEN %s THEN %s"] * len(regular_ids)) + " END"
+                decrement_params = [value for product_id in regular_ids
+                                    for value in (product_id, quantities[product_id])]
+                cursor.execute(
+                    f"""UPDATE products
+                        SET quantity = quantity - {decrement},
+                            status = IF(quantity <= 0, 'out_of_stock', status)
+                        WHERE product_id IN ({placeholders}) AND quantity >= {decrement}""",
+                    decrement_params + regular_ids + decrement_params
+                )
+                if cursor.rowcount != len(regular_ids):
+                    connection.rollback()
+                    return jsonify({"error": "Insufficient stock for one or more products"}), 409
+
+        # Hot products take stock from one of their counter slots, leaving
+        # the products row (and its lock) alone
+        for product_id in hot_ids:
+            inventory.take_from_slots(connection, product_id, quantities[product_id], slot_counts[product_id])
+
+        # executemany sends this as a single multi-row INSERT
+        cursor.executemany(
+            "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (%s, %s, %s, %s)",
+            [(order_id, item['product_id'], item['quantity'], item['price']) for item in items]
+        )
 
-            # Check if product is out of stock after update
-            cursor.execute("SELECT quantity FROM products WHERE product_id = %s", (product_id,))
-            updated_product = cursor.fetchone()
-            if updated_product['quantity'] == 0:
-                cursor.execute("UPDATE products SET status = 'out_of_stock' WHERE product_id = %s", (product_id,))
-
+        # Committed with the order; the admin dashboards pick it up from the outbox
+        events.publish(connection, events.ORDER_CREATED, order_id, {
+            "user_id": user_id,
+            "total_price": total_price,
+            "delivery_type": delivery_type,
+            "order_status": 'pending',
+            "payment_status": 'not paid',
+        })
         connection.commit()
+        catalog_cache.invalidate()  # Stock levels changed
+        order_history_cache.invalidate((session['email'] if session is not None else email).lower())
         return jsonify({"message": "Order placed successfully", "order_id": order_id}), 201
 
+    except inventory.InsufficientStock as e:
+        connection.rollback()
+        return jsonify({"error": str(e)}), 400
+
+    except inventory.ReservationExpired as e:
+        connection.rollback()
+        return jsonify({"error": str(e)}), 409
+
     except mysql.connector.Error as e:
         connection.rollback()  # Rollback if any error occurs
         return jsonify({"error": str(e)}), 500
@@ -314,83 +641,150 @@ def add_product():
         cursor.execute(query, values)
         connection.commit()
         cursor.close()
-        connection.close()
+        catalog_cache.invalidate()
         return jsonify({"message": "Product added successfully"}), 201
     except Error as e:
         return jsonify({"error": str(e)}), 500
+    finally:
+        connection.close()
     
-@app.route('/orders/user/email/<string:email>', methods=['GET'])
-def fetch_orders_by_email(email):
+ORDER_HISTORY_PAGE_SIZE = 20
+
+def load_order_history(email, user_id=None, before=None, limit=ORDER_HISTORY_PAGE_SIZE):
+    """One page of a customer's orders, newest first, with their products."""
     connection = get_db_connection()
     if not connection:
-        return jsonify({"error": "Database connection failed"}), 500
+        return None
+
+    query, params = repository.order_history_query(limit, email=email, user_id=user_id, before=before)
 
     try:
         cursor = connection.cursor(dictionary=True)
-        
-        # First get the user_id from email
-        user_query = "SELECT user_id FROM users WHERE email = %s"
-        cursor.execute(user_query, (email,))
-        user_result = cursor.fetchone()
-        
-        if not user_result:
-            return jsonify({"error": "User not found"}), 404
-            
-        user_id = user_result['user_id']
-        
-        # Then get the orders using the user_id with more product details
-        query = """
-        SELECT o.order_id, o.order_status, o.total_price, o.payment_status, 
-               o.delivery_type, o.delivery_address, o.map_link,
-               oi.product_id, p.name AS product_name, p.status AS product_status,
-               p.image_url, oi.quantity, oi.price as item_price,
-               o.created_at as date
-        FROM orders o
-        JOIN order_items oi ON o.order_id = oi.order_id
-        JOIN products p ON oi.product_id = p.product_id
-        WHERE o.user_id = %s
-        ORDER BY o.created_at DESC
-        """
-        cursor.execute(query, (user_id,))
+        cursor.execute(query, params)
         order_details = cursor.fetchall()
+
+        if not order_details and before is None and user_id is None:
+            # Only an empty first page needs to tell "no orders" from "no user"
+            if repository.user_id_by_email(connection, email) is None:
+                return {'user_found': False, 'orders': [], 'next': None}
+        cursor.close()
+    finally:
+        connection.close()
+
+    # Process the results to group by order_id
+    orders = {}
+    for item in order_details:
+        order_id = item['order_id']
+        if order_id not in orders:
+            orders[order_id] = {
+                'order_id': order_id,
+                'order_status': item['order_status'],
+                'total_price': item['total_price'],
+                'payment_status': item['payment_status'],
+                'delivery_type': item['delivery_type'],
+                'delivery_address': item['delivery_address'],
+                'map_link': item['map_link'],
+                'date': item['date'],
+                'products': []
+            }
         
-        if not order_details:
-            return jsonify([]), 200
-            
-        # Process the results to group by order_id
-        orders = {}
-        for item in order_details:
-            order_id = item['order_id']
-            if order_id not in orders:
-                orders[order_id] = {
-                    'order_id': order_id,
-                    'order_status': item['order_status'],
-                    'total_price': float(item['total_price']),
-                    'payment_status': item['payment_status'],
-                    'delivery_type': item['delivery_type'],
-                    'delivery_address': item['delivery_address'],
-                    'map_link': item['map_link'],
-                    'date': item['date'].strftime('%Y-%m-%d %H:%M:%S'),
-                    'products': []
-                }
-            
-            orders[order_id]['products'].append({
-                'product_id': item['product_id'],
-                'product_name': item['product_name'],
-                'product_status': item['product_status'],
-                'image_url': item['image_url'],
-                'quantity': item['quantity'],
-                'price': float(item['item_price'])
-            })
-        
-        return jsonify(list(orders.values())), 200
-        
-    except Exception as e:
+        orders[order_id]['products'].append({
+            'product_id': item['product_id'],
+            'product_name': item['product_name'],
+            'product_status': item['product_status'],
+            'image_url': item['image_url'],
+            'quantity': item['quantity'],
+            'price': item['item_price']
+        })
+
+    orders = list(orders.values())
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = {'date': orders[-1]['date'].strftime('%Y-%m-%d %H:%M:%S'), 'id': orders[-1]['order_id']}
+    return {'user_found': True, 'orders': orders, 'next': next_cursor, 'products_tag': products_tag(orders)}
+
+def products_tag(orders):
+    """Short digest of the product fields an order listing shows (name, status, image)."""
+    shown = [(product['product_id'], product['product_name'], product['product_status'], product['image_url'])
+             for order in orders for product in order['products']]
+    return hashlib.blake2b(repr(shown).encode('utf-8'), digest_size=8).hexdigest()
+
+@app.route('/orders/user/email/<string:email>', methods=['GET'])
+def fetch_orders_by_email(email):
+    limit, page_cursor = parse_page(request.args, default_limit=ORDER_HISTORY_PAGE_SIZE, max_limit=100)
+    before = None
+    if page_cursor is not None:
+        try:
+            before = (datetime.strptime(page_cursor['date'], '%Y-%m-%d %H:%M:%S'), int(page_cursor['id']))
+        except (KeyError, TypeError, ValueError):
+            raise PaginationError("Invalid cursor")
+
+    session = session_tokens.from_request()
+    user_id = session['user_id'] if session is not None and session['email'] == email else None
+
+    # The customer's history version moves with every order they place and
+    # every admin status change. Read before the cache, so the tag is never
+    # newer than the page it goes out with
+    history_version = order_history_cache.version(email.lower())
+    try:
+        history = order_history_cache.get_or_load(
+            email.lower(), (before, limit),
+            lambda: load_order_history(email, user_id=user_id, before=before, limit=limit),
+        )
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+
+    if history is None:
+        return jsonify({"error": "Database connection failed"}), 500
+    if not history['user_found']:
+        return jsonify({"error": "User not found"}), 404
+
+    # Product names, statuses and images come from the page itself: stock
+    # movements elsewhere in the catalog leave the tag alone
+    tag = etag('history', history_version, history['products_tag'])
+    cached = not_modified(tag, cache_control=PRIVATE_REVALIDATE)
+    if cached is not None:
+        return cached
+    return (with_validators(jsonify(history['orders']), tag, cache_control=PRIVATE_REVALIDATE), 200,
+            next_page_headers(history['next']))
+
+@app.route('/changes', methods=['GET'])
+def get_changes():
+    """Products, and the signed-in customer's orders, changed since ``since``; see bakes_common/changes.py."""
+    limit, _ = parse_page(request.args, default_limit=changes.PAGE_SIZE, max_limit=changes.MAX_PAGE_SIZE)
+    since = request.args.get('since')
+    if since is not None:
+        if not since.isdigit():
+            return jsonify({"error": "since must be a non-negative integer"}), 400
+        since = int(since)
+
+    # Order changes only for the customer the session token names
+    session = session_tokens.from_request()
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        if since is None:
+            # Starting point for a client about to do its full fetch
+            page = {'version': changes.settled_version(connection)}
+        else:
+            page = changes.load_changes(connection, since, limit, orders=session is not None,
+                                         order_user_id=session['user_id'] if session is not None else None)
+    except Error as e:
         return jsonify({"error": str(e)}), 500
     finally:
-        cursor.close()
         connection.close()
 
+    if 'products' in page:
+        page['products'] = [dict(with_image_urls(product), version=version) for version, product in page['products']]
+        page['deleted'] = changes.deleted_for_json(page['deleted'])
+    response = jsonify(page)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 # Route to get order details by ID
 @app.route('/orders/details/<int:order_id>', methods=['GET'])
 def fetch_order_details(order_id):
@@ -401,49 +795,45 @@ def fetch_order_details(order_id):
     try:
         cursor = connection.cursor(dictionary=True)
         
-        # First check if the order exists
-        check_query = "SELECT * FROM orders WHERE order_id = %s"
-        cursor.execute(check_query, (order_id,))
+        # First check if the order exists; its validators come from the same row
+        cursor.execute(repository.ORDER_VERSION_SQL, (order_id,))
         order = cursor.fetchone()
         
         if not order:
             return jsonify({"error": "Order not found"}), 404
+
+        last_modified = datetime.fromtimestamp(float(order['version']), timezone.utc)
+        tag = etag('order', order_id, int(order['version'] * 1000), order['products_tag'])
+        cached = not_modified(tag, last_modified, cache_control=PRIVATE_REVALIDATE)
+        if cached is not None:
+            return cached
         
         # Get order details with product information
-        query = """
-        SELECT o.order_id, o.order_status, o.total_price, o.payment_status, o.created_at as date,
-               o.delivery_type, o.delivery_address, o.map_link,
-               oi.product_id, p.name AS product_name, p.status AS product_status, p.image_url,
-               oi.quantity, oi.price as item_price
-        FROM orders o
-        LEFT JOIN order_items oi ON o.order_id = oi.order_id
-        LEFT JOIN products p ON oi.product_id = p.product_id
-        WHERE o.order_id = %s
-        """
-        cursor.execute(query, (order_id,))
+        cursor.execute(repository.ORDER_DETAILS_SQL, (order_id,))
         order_details = cursor.fetchall()
 
         if not order_details:
             # If no products found, return basic order info
-            return jsonify({
+            response = jsonify({
                 "order_id": order["order_id"],
                 "order_status": order["order_status"],
-                "total_price": float(order["total_price"]),
+                "total_price": order["total_price"],
                 "payment_status": order["payment_status"],
-                "date": order["created_at"].strftime('%Y-%m-%d %H:%M:%S'),
+                "date": order["created_at"],
                 "delivery_type": order["delivery_type"],
                 "delivery_address": order["delivery_address"],
                 "map_link": order["map_link"],
                 "products": []
-            }), 200
+            })
+            return with_validators(response, tag, last_modified, PRIVATE_REVALIDATE), 200
 
         # Format the order with all product details
         order_info = {
             "order_id": order_details[0]["order_id"],
             "order_status": order_details[0]["order_status"],
-            "total_price": float(order_details[0]["total_price"]),
+            "total_price": order_details[0]["total_price"],
             "payment_status": order_details[0]["payment_status"],
-            "date": order_details[0]["date"].strftime('%Y-%m-%d %H:%M:%S'),
+            "date": order_details[0]["date"],
             "delivery_type": order_details[0]["delivery_type"],
             "delivery_address": order_details[0]["delivery_address"],
             "map_link": order_details[0]["map_link"],
@@ -458,13 +848,13 @@ def fetch_order_details(order_id):
                     "product_status": row['product_status'],
                     "image_url": row['image_url'],
                     "quantity": row['quantity'],
-                    "price": float(row['item_price'])
+                    "price": row['item_price']
                 })
 
-        return jsonify(order_info), 200
+        return with_validators(jsonify(order_info), tag, last_modified, PRIVATE_REVALIDATE), 200
 
     except Exception as e:
-        print(f"Error fetching order details: {str(e)}")
+        log.exception("Error fetching order details")
         return jsonify({"error": str(e)}), 500
     finally:
         cursor.close()
@@ -472,10 +862,32 @@ def fetch_order_details(order_id):
 
 
 
+def create_app():
+    """The storefront app, ready to serve; the entry point for wsgi.py and ``python app.py``."""
+    if 'lifecycle' not in app.extensions:
+        inventory_sweeper.start()
+        try:
+            product_search.build()
+        except (Error, PoolTimeout) as e:
+            # The first search builds it instead
+            log.warning("Product search index not built at startup", extra={'error': str(e)})
+        # Closers run in reverse, so the pool closes after everything using it
+        lifecycle = install_lifecycle(app, drain_timeout=float(os.environ.get('SHUTDOWN_DRAIN_TIMEOUT', 5)))
+        lifecycle.on_shutdown('db pool', db_pool.close_all)
+        lifecycle.on_shutdown('image store', image_store.shutdown)
+        lifecycle.on_shutdown('password hasher', password_hasher.shutdown)
+        lifecycle.on_shutdown('inventory sweeper', inventory_sweeper.stop)
+        if slow_query_log is not None:
+            lifecycle.on_shutdown('slow query log', slow_query_log.shutdown)
+    return app
+
+
 if __name__ == '__main__':
-    print("Starting Flask server on port 5000...")
-    # For development, we'll use HTTP to avoid certificate issues
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    options = dev_server_options(5000, default_host='0.0.0.0')
+    log.info("Starting Flask development server", extra={'port': options['port']})
+    # For development, we'll use HTTP to avoid certificate issues; production
+    # runs gunicorn (see gunicorn.conf.py)
+    create_app().run(**options)
     
     # Uncomment this to use HTTPS once you have proper certificates
     # cert_path = 'flask_certs/cert.pem'
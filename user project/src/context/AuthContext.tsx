@@ -1,7 +1,7 @@
 
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import { AuthUser, LoginCredentials, RegistrationData } from '../utils/types';
-import { login, registerUser } from '../utils/api';
+import { clearSessionToken, login, registerUser } from '../utils/api';
 import { useToast } from '../hooks/use-toast';
 
 interface AuthContextType {
@@ -120,6 +120,7 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
   const handleLogout = () => {
     setUser(null);
     localStorage.removeItem('user');
+    clearSessionToken();
     toast({
       title: "Logged out",
       description: "You have been successfully logged out",
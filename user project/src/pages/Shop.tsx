@@ -7,7 +7,8 @@ import ProductCard from '../components/ProductCard';
 import { categories } from '../utils/data';
 import { Product } from '../utils/types';
 import { useSearchParams } from 'react-router-dom';
-import { fetchProducts } from '../utils/api';
+import { fetchProducts, searchProducts } from '../utils/api';
+import { Input } from '@/components/ui/input';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 
 const Shop = () => {
@@ -23,23 +24,57 @@ const Shop = () => {
     }
   }, [categoryParam]);
   
-  const { data: products = [], isLoading, error } = useQuery({
+  const [query, setQuery] = useState(searchParams.get('q') || '');
+  const [searchTerm, setSearchTerm] = useState(query.trim());
+
+  // Search once typing pauses rather than on every keystroke
+  useEffect(() => {
+    const timer = setTimeout(() => setSearchTerm(query.trim()), 200);
+    return () => clearTimeout(timer);
+  }, [query]);
+
+  const { data: allProducts = [], isLoading: isLoadingProducts, error: productsError } = useQuery({
     queryKey: ['products'],
     queryFn: fetchProducts
   });
-  
-  // Filter products by the active category
-  const filteredProducts = activeCategory === 'all' 
+
+  // Searches run on the server, which ranks the matches and counts them per category
+  const isSearching = searchTerm.length > 0;
+  const { data: searchResult, isLoading: isLoadingSearch, error: searchError } = useQuery({
+    queryKey: ['product-search', searchTerm, activeCategory],
+    queryFn: () => searchProducts(searchTerm, activeCategory),
+    enabled: isSearching,
+    placeholderData: previous => previous
+  });
+
+  const products = isSearching ? searchResult?.products ?? [] : allProducts;
+  const isLoading = isSearching ? isLoadingSearch : isLoadingProducts;
+  const error = isSearching ? searchError : productsError;
+
+  // Filter products by the active category (search results already are)
+  const filteredProducts = activeCategory === 'all' || isSearching
     ? products 
     : products.filter(product => product.category === activeCategory);
   
   // Get unique categories from products
-  const uniqueCategories = ['all', ...new Set(products.map(product => product.category))];
+  const uniqueCategories = ['all', ...new Set(allProducts.map(product => product.category))];
+
+  // Match counts on the tabs while searching
+  const categoryLabel = (category: string) => {
+    const label = category === 'all' ? 'All Products' : category;
+    if (!isSearching || !searchResult) {
+      return label;
+    }
+    const count = category === 'all'
+      ? Object.values(searchResult.facets).reduce((sum, n) => sum + n, 0)
+      : searchResult.facets[category] ?? 0;
+    return `${label} (${count})`;
+  };
   
   // Function to handle category change
   const handleCategoryChange = (category: string) => {
     setActiveCategory(category);
-    setSearchParams({ category });
+    setSearchParams(searchTerm ? { category, q: searchTerm } : { category });
   };
 
   return (
@@ -54,6 +89,15 @@ const Shop = () => {
           </p>
         </div>
         
+        <div className="max-w-md mx-auto mb-8">
+          <Input
+            type="search"
+            placeholder="Search cakes, breads, pastries..."
+            value={query}
+            onChange={(event) => setQuery(event.target.value)}
+          />
+        </div>
+
         {/* Category tabs using shadcn UI Tabs component */}
         <div className="mb-10">
           <Tabs defaultValue={activeCategory} onValueChange={handleCategoryChange}>
@@ -64,7 +108,7 @@ const Shop = () => {
                   value={category}
                   className="text-sm md:text-base px-4 py-2"
                 >
-                  {category === 'all' ? 'All Products' : category}
+                  {categoryLabel(category)}
                 </TabsTrigger>
               ))}
             </TabsList>
@@ -81,7 +125,7 @@ const Shop = () => {
                   <div className="text-center py-12">
                     <p className="text-muted-foreground">Error loading products. Please try again later.</p>
                   </div>
-                ) : category === 'all' ? (
+                ) : category === 'all' && !isSearching ? (
                   <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
                     {products.map((product) => (
                       <ProductCard key={product.id} product={product} />
@@ -95,7 +139,9 @@ const Shop = () => {
                       ))
                     ) : (
                       <div className="text-center py-12 col-span-full">
-                        <p className="text-muted-foreground">No products found in this category.</p>
+                        <p className="text-muted-foreground">
+                          {isSearching ? `No products match "${searchTerm}".` : 'No products found in this category.'}
+                        </p>
                       </div>
                     )}
                   </div>
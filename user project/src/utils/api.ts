@@ -3,6 +3,14 @@ import { Product, Order, Customer, RegistrationData, LoginCredentials, AuthUser
 // Use HTTP in development to avoid certificate issues
 const API_URL = 'http://localhost:5000';
 
+// Session token issued by /login; sent so the server can skip the user lookup
+const SESSION_TOKEN_KEY = 'session_token';
+
+// Forget the session token, so later requests go out unauthenticated
+export const clearSessionToken = () => {
+  localStorage.removeItem(SESSION_TOKEN_KEY);
+};
+
 // Helper function to handle fetch with proper error handling
 const fetchWithErrorHandling = async (url: string, options?: RequestInit) => {
   try {
@@ -18,6 +26,18 @@ const fetchWithErrorHandling = async (url: string, options?: RequestInit) => {
   }
 };
 
+// For the endpoints that read the session token (/orders*, /changes,
+// /reservations). Public catalog reads stay without it: an Authorization
+// header makes a cross-origin GET wait for a CORS preflight
+const fetchWithSession = (url: string, options?: RequestInit) => {
+  const token = localStorage.getItem(SESSION_TOKEN_KEY);
+  const headers = new Headers(options?.headers);
+  if (token && !headers.has('Authorization')) {
+    headers.set('Authorization', `Bearer ${token}`);
+  }
+  return fetchWithErrorHandling(url, { ...options, headers });
+};
+
 // Authentication-related API calls
 export const login = async (credentials: LoginCredentials): Promise<{ message: string; user?: AuthUser }> => {
   try {
@@ -30,6 +50,9 @@ export const login = async (credentials: LoginCredentials): Promise<{ message: s
     });
 
     const data = await response.json();
+    if (data.token) {
+      localStorage.setItem(SESSION_TOKEN_KEY, data.token);
+    }
     return {
       message: data.message,
       user: {
@@ -47,6 +70,21 @@ export const login = async (credentials: LoginCredentials): Promise<{ message: s
 };
 
 // Product-related API calls
+// Maps a product row from the API to the shop's Product shape
+const toProduct = (product: any): Product => ({
+  id: product.product_id.toString(),
+  name: product.name,
+  description: product.description || '',
+  longDescription: product.description || '',
+  price: parseFloat(product.price),
+  category: product.category,
+  image: product.image_url || "https://images.unsplash.com/photo-1608198093002-ad4e005484ec?ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D&auto=format&fit=crop&w=2532&q=80",
+  quantity: product.quantity,
+  inStock: product.status === 'in_stock',
+  ingredients: [],
+  allergens: []
+});
+
 export const fetchProducts = async (): Promise<Product[]> => {
   try {
     const response = await fetchWithErrorHandling(`${API_URL}/products`);
@@ -56,25 +94,34 @@ export const fetchProducts = async (): Promise<Product[]> => {
       throw new Error('Failed to fetch products');
     }
     
-    return data.map((product: any) => ({
-      id: product.product_id.toString(),
-      name: product.name,
-      description: product.description || '',
-      longDescription: product.description || '',
-      price: parseFloat(product.price),
-      category: product.category,
-      image: product.image_url || "https://images.unsplash.com/photo-1608198093002-ad4e005484ec?ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D&auto=format&fit=crop&w=2532&q=80",
-      quantity: product.quantity,
-      inStock: product.status === 'in_stock',
-      ingredients: [],
-      allergens: []
-    }));
+    return data.map(toProduct);
   } catch (error) {
     console.error('Error fetching products:', error);
     return [];
   }
 };
 
+export interface ProductSearchResult {
+  products: Product[];
+  total: number;
+  facets: Record<string, number>; // Matches per category, before the category filter
+}
+
+// Server-side search: ranked, typo tolerant and matching partial words
+export const searchProducts = async (query: string, category?: string, limit = 100): Promise<ProductSearchResult> => {
+  const params = new URLSearchParams({ q: query, limit: String(limit) });
+  if (category && category !== 'all') {
+    params.set('category', category);
+  }
+  const response = await fetchWithErrorHandling(`${API_URL}/products/search?${params}`);
+  const data = await response.json();
+  return {
+    products: data.results.map(toProduct),
+    total: data.total,
+    facets: data.facets.category,
+  };
+};
+
 export const addProduct = async (product: Omit<Product, 'id'>): Promise<Product> => {
   try {
     const response = await fetchWithErrorHandling(`${API_URL}/products`, {
@@ -142,7 +189,7 @@ export const placeOrder = async (orderData: {
       price: item.price
     }));
 
-    const response = await fetchWithErrorHandling(`${API_URL}/orders`, {
+    const response = await fetchWithSession(`${API_URL}/orders`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -173,7 +220,7 @@ export const placeOrder = async (orderData: {
 // Fetch order details by ID
 export const fetchOrderDetails = async (orderId: number): Promise<any> => {
   try {
-    const response = await fetchWithErrorHandling(`${API_URL}/orders/details/${orderId}`, {
+    const response = await fetchWithSession(`${API_URL}/orders/details/${orderId}`, {
       method: 'GET',
       headers: {
         'Content-Type': 'application/json',
@@ -192,28 +239,34 @@ export const fetchOrderDetails = async (orderId: number): Promise<any> => {
   }
 };
 
-// Fetch all orders for a user by email
+// Largest page the history endpoint serves
+const ORDER_HISTORY_PAGE_LIMIT = 100;
+
+// Fetch all orders for a user by email, newest first. The endpoint pages by
+// date, so this follows X-Next-Cursor until the oldest order
 export const fetchUserOrders = async (userEmail: string): Promise<any[]> => {
   try {
-    console.log('Fetching orders for user:', userEmail);
-    
-    // Use the new email-based endpoint
-    const ordersResponse = await fetchWithErrorHandling(`${API_URL}/orders/user/email/${encodeURIComponent(userEmail)}`, {
-      method: 'GET',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-    });
-    
-    const ordersData = await ordersResponse.json();
-    if (ordersData.error) {
-      throw new Error(ordersData.error || 'Failed to fetch user orders');
-    }
-    
-    console.log('Fetched real orders data:', ordersData);
-    
-    // The backend now returns data in the correct format
-    return ordersData;
+    const orders: any[] = [];
+    let after: string | null = null;
+    do {
+      const params = new URLSearchParams({ limit: String(ORDER_HISTORY_PAGE_LIMIT) });
+      if (after) {
+        params.set('after', after);
+      }
+      const ordersResponse = await fetchWithSession(
+        `${API_URL}/orders/user/email/${encodeURIComponent(userEmail)}?${params}`,
+        { method: 'GET' },
+      );
+
+      const ordersData = await ordersResponse.json();
+      if (!Array.isArray(ordersData)) {
+        throw new Error(ordersData.error || 'Failed to fetch user orders');
+      }
+      orders.push(...ordersData);
+      after = ordersResponse.headers.get('X-Next-Cursor');
+    } while (after);
+
+    return orders;
   } catch (error) {
     console.error(`Error fetching orders for user ${userEmail}:`, error);
     
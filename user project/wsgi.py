@@ -0,0 +1,4 @@
+# WSGI entry point for the storefront app; see gunicorn.conf.py for how to run it
+from app import create_app
+
+app = create_app()